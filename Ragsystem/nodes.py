@@ -9,7 +9,7 @@ from utils import (
     extract_words_from_docs,
     extract_grammar_with_grade,
 )
-from config import LLM_CONFIG
+from config import LLM_CONFIG, QUERY_ANALYSIS_CONFIG
 from agents import QueryAnalysisAgent, QualityCheckAgent
 
 
@@ -49,7 +49,7 @@ class AgenticKoreanLearningNodes(KoreanLearningNodes):
     def __init__(self, vocabulary_retriever, grammar_retriever, kpop_retriever, llm=None):
         super().__init__(vocabulary_retriever, grammar_retriever, kpop_retriever, llm)
         # kpop_retriever를 QueryAnalysisAgent에 전달하여 임베딩 기반 매칭 활성화
-        self.query_agent = QueryAnalysisAgent(llm, kpop_retriever=kpop_retriever)
+        self.query_agent = QueryAnalysisAgent(llm, kpop_retriever=kpop_retriever, **QUERY_ANALYSIS_CONFIG)
         self.quality_agent = QualityCheckAgent(llm)
 
     # Agents Nodes
@@ -8,7 +8,7 @@ import re
 from Ragsystem.schema import GraphState
 from Ragsystem.nodes import AgenticKoreanLearningNodes
 from Ragsystem.router import IntelligentRouter, format_routing_summary, RetrieverType
-from utils import get_group_type
+from Retriever.kpop_filter import mask_has
 
 
 class RouterIntegratedNodes(AgenticKoreanLearningNodes):
@@ -22,7 +22,7 @@ class RouterIntegratedNodes(AgenticKoreanLearningNodes):
         super().__init__(vocabulary_retriever, grammar_retriever, kpop_retriever, llm)
         
         # Add intelligent router
-        self.router = IntelligentRouter(llm=llm)
+        self.router = IntelligentRouter(llm=llm, gazetteer=getattr(kpop_retriever, 'gazetteer', None))
         print("✅ [Router] IntelligentRouter initialized (DB only mode)")
     
     def routing_node(self, state: GraphState) -> GraphState:
@@ -161,150 +161,41 @@ class RouterIntegratedNodes(AgenticKoreanLearningNodes):
             kpop_filters.get('group_type')
         ])
         
+        # 메타데이터 비트맵 필터 엔진 (필드 간 AND, 필드 내 OR)
+        filter_engine = self.kpop_retriever.filter_engine
+        
         # 필터링 조건이 있으면 그룹명을 직접 사용하여 검색 (더 정확)
         if has_filters and kpop_filters.get('groups'):
             # 그룹명이 있으면 해당 그룹 문서만 직접 가져오기
             specified_groups = [g.strip() for g in kpop_filters['groups'] if g]
-            specified_groups_lower = {g.lower() for g in specified_groups}
             print(f"   🔍 필터링 조건 감지: 그룹 {specified_groups}")
             
-            # 모든 K-pop 데이터에서 지정된 그룹만 필터링 (대소문자 무시)
-            all_kpop_docs = self.kpop_retriever.kpop_data if hasattr(self.kpop_retriever, 'kpop_data') else []
-            kpop_db_docs = []
-            for doc in all_kpop_docs:
-                doc_group = (doc.metadata.get('group', '') or '').strip()
-                doc_group_lower = doc_group.lower()
-                # 정확 일치 확인 (대소문자 무시)
-                if doc_group in specified_groups or doc_group_lower in specified_groups_lower:
-                    kpop_db_docs.append(doc)
-            
+            group_mask = 0
+            for g in specified_groups:
+                group_mask |= filter_engine.lookup('group', g)
+            kpop_db_docs = self.kpop_retriever.docs_for(group_mask)
             print(f"   ✅ 그룹 필터링 결과: {len(kpop_db_docs)}개 문서 (그룹: {specified_groups})")
+        elif has_filters:
+            # 그룹 외 필터만 있으면 조건을 만족하는 문서 안에서만 벡터 검색 (후처리 필터로 인한 누락 방지)
+            kpop_db_docs = self.kpop_retriever.invoke(strategy.query, level, filters=kpop_filters)
         else:
-            # 필터링 조건이 없거나 그룹명이 없으면 일반 검색
+            # 필터링 조건이 없으면 일반 검색
             kpop_db_docs = self.kpop_retriever.invoke(strategy.query, level)
         
         filtered = []
         filter_reasons = []
         
         if has_filters:
-            for d in kpop_db_docs:
-                match = True
-                doc_reasons = []
-                
-                # 1. 그룹 필터링 (대소문자 무시, 공백 제거)
-                if kpop_filters.get('groups'):
-                    doc_group = (d.metadata.get('group', '') or '').strip()
-                    doc_group_lower = doc_group.lower()
-                    specified_groups = [g.strip() for g in kpop_filters['groups'] if g]
-                    specified_groups_lower = {g.lower() for g in specified_groups}
-                    
-                    # 정확 일치 또는 부분 일치 확인
-                    if doc_group_lower in specified_groups_lower or doc_group in specified_groups:
-                        doc_reasons.append(f"그룹: {doc_group}")
-                    else:
-                        match = False
-                        continue
-                
-                # 2. 멤버 필터링
-                if match and kpop_filters.get('members'):
-                    doc_member_names = [m.lower() for m in (d.metadata.get('member_names', []) or [])]
-                    specified_members = [m.lower() for m in kpop_filters['members']]
-                    member_match = any(sm in doc_member_names for sm in specified_members)
-                    if member_match:
-                        matched_members = [sm for sm in specified_members if sm in doc_member_names]
-                        doc_reasons.append(f"멤버: {', '.join(matched_members)}")
-                    else:
-                        match = False
-                        continue
-                
-                # 2-1. 멤버 role 필터링 (래퍼, 보컬, 댄서, 리더 등)
-                if match and kpop_filters.get('member_roles'):
-                    doc_members = d.metadata.get('members', [])
-                    doc_roles = [m.get('role', '').lower() for m in doc_members if isinstance(m, dict) and m.get('role')]
-                    specified_roles = [r.lower() for r in kpop_filters['member_roles']]
-                    role_match = any(sr in doc_roles for sr in specified_roles)
-                    if role_match:
-                        matched_roles = [sr for sr in specified_roles if sr in doc_roles]
-                        doc_reasons.append(f"역할: {', '.join(matched_roles)}")
-                    else:
-                        match = False
-                        continue
-                
-                # 3. 소속사 필터링
-                if match and kpop_filters.get('agencies'):
-                    doc_agency = (d.metadata.get('agency', '') or '').lower()
-                    specified_agencies = [a.lower() for a in kpop_filters['agencies']]
-                    agency_match = any(sa in doc_agency for sa in specified_agencies)
-                    if agency_match:
-                        matched_agency = [sa for sa in specified_agencies if sa in doc_agency][0]
-                        doc_reasons.append(f"소속사: {d.metadata.get('agency')}")
-                    else:
-                        match = False
-                        continue
-                
-                # 4. 팬덤 필터링
-                if match and kpop_filters.get('fandoms'):
-                    doc_fandom = (d.metadata.get('fandom', '') or '').lower()
-                    specified_fandoms = [f.lower() for f in kpop_filters['fandoms']]
-                    fandom_match = any(sf in doc_fandom for sf in specified_fandoms)
-                    if fandom_match:
-                        matched_fandom = [sf for sf in specified_fandoms if sf in doc_fandom][0]
-                        doc_reasons.append(f"팬덤: {d.metadata.get('fandom')}")
-                    else:
-                        match = False
-                        continue
-                
-                # 5. 컨셉 필터링
-                if match and kpop_filters.get('concepts'):
-                    doc_concepts = [c.lower() for c in (d.metadata.get('concepts', []) or []) if isinstance(c, str)]
-                    specified_concepts = [c.lower() for c in kpop_filters['concepts']]
-                    concept_match = any(sc in doc_concepts for sc in specified_concepts)
-                    if concept_match:
-                        matched_concepts = [sc for sc in specified_concepts if sc in doc_concepts]
-                        doc_reasons.append(f"컨셉: {', '.join(matched_concepts)}")
-                    else:
-                        match = False
-                        continue
-                
-                # 6. 데뷔 연도 필터링
-                if match and kpop_filters.get('debut_year'):
-                    members = d.metadata.get('members', [])
-                    doc_debut_years = set()
-                    for m in members:
-                        debut = m.get('debut', '')
-                        if debut and len(debut) >= 4:
-                            try:
-                                year = int(debut[:4])
-                                doc_debut_years.add(year)
-                            except ValueError:
-                                pass
-                    
-                    if kpop_filters['debut_year'] in doc_debut_years:
-                        doc_reasons.append(f"데뷔: {kpop_filters['debut_year']}년")
-                    else:
-                        match = False
-                        continue
-                
-                # 7. 그룹 타입 필터링 (걸그룹/보이그룹)
-                if match and kpop_filters.get('group_type'):
-                    group_name = d.metadata.get('group', '')
-                    doc_group_type = get_group_type(group_name, self.kpop_retriever)
-                    
-                    if doc_group_type == kpop_filters['group_type']:
-                        doc_reasons.append(f"타입: {kpop_filters['group_type']}")
-                    else:
-                        match = False
-                        continue
-                
-                if match:
-                    filtered.append(d)
-                    if doc_reasons:
-                        filter_reasons.extend(doc_reasons)
+            # 후보 문서 범위 안에서 한 번에 평가 → 매칭 문서 + 필드별 매칭 사유
+            candidate_mask = filter_engine.mask_of(d.metadata.get('doc_id') for d in kpop_db_docs)
+            filter_result = self.kpop_retriever.filter_docs(kpop_filters, within=candidate_mask)
+            filtered = [d for d in kpop_db_docs if d.metadata.get('doc_id') in filter_result]
             
             if filtered:
+                filter_reasons = filter_result.reason_strings()
                 kpop_db_docs = filtered
                 if filter_reasons:
-                    print(f"   🔍 필터링 적용: {', '.join(set(filter_reasons))}")
+                    print(f"   🔍 필터링 적용: {', '.join(filter_reasons)}")
                 print(f"   ✅ 필터링 결과: {len(kpop_db_docs)}개 문서")
             else:
                 # 필터링 조건에 맞는 문서가 없으면 디버깅 정보 출력
@@ -371,89 +262,45 @@ class RouterIntegratedNodes(AgenticKoreanLearningNodes):
         # 최종적으로 최대 5개만 반환
         kpop_db_docs = kpop_db_docs[:db_limit]
         
-        # 검증: 반환되는 문서 정보 확인 및 그룹 필터 검증
+        # 검증: 반환되는 문서 정보 확인 및 그룹 필터 검증 (필터 엔진 비트맵으로 요약)
         if has_filters:
-            returned_groups = set()
-            returned_members = set()
-            returned_roles = set()
-            returned_agencies = set()
-            returned_fandoms = set()
-            returned_concepts = set()
-            returned_years = set()
-            returned_types = set()
-            
-            for d in kpop_db_docs:
-                g = d.metadata.get('group', '')
-                if g:
-                    returned_groups.add(g)
-                
-                # 멤버 role 추출
-                members = d.metadata.get('members', [])
-                for m in members:
-                    if isinstance(m, dict):
-                        role = m.get('role', '')
-                        if role:
-                            returned_roles.add(role.lower())
-                        debut = m.get('debut', '')
-                        if debut and len(debut) >= 4:
-                            try:
-                                returned_years.add(int(debut[:4]))
-                            except ValueError:
-                                pass
-                
-                agency = d.metadata.get('agency', '')
-                if agency:
-                    returned_agencies.add(agency)
-                
-                fandom = d.metadata.get('fandom', '')
-                if fandom:
-                    returned_fandoms.add(fandom)
-                
-                concepts = d.metadata.get('concepts', [])
-                returned_concepts.update([c.lower() for c in concepts if isinstance(c, str)])
-                
-                # 그룹 타입 추론
-                group_type = get_group_type(g, self.kpop_retriever)
-                if group_type:
-                    returned_types.add(group_type)
+            returned_mask = filter_engine.mask_of(d.metadata.get('doc_id') for d in kpop_db_docs)
             
             # 그룹 필터가 있으면 반환된 그룹이 모두 필터 조건에 맞는지 검증
             if kpop_filters.get('groups'):
-                specified_groups = [g.strip() for g in kpop_filters['groups'] if g]
-                specified_groups_lower = {g.lower() for g in specified_groups}
-                invalid_groups = []
-                for returned_group in returned_groups:
-                    returned_group_lower = returned_group.lower()
-                    if returned_group not in specified_groups and returned_group_lower not in specified_groups_lower:
-                        invalid_groups.append(returned_group)
-                
-                if invalid_groups:
+                allowed_mask = 0
+                for g in kpop_filters['groups']:
+                    if g:
+                        allowed_mask |= filter_engine.lookup('group', g)
+                invalid_mask = returned_mask & ~allowed_mask
+                if invalid_mask:
+                    invalid_groups = sorted(filter_engine.describe(invalid_mask)['group'])
                     print(f"   ⚠️ 경고: 필터 조건에 맞지 않는 그룹이 포함됨: {invalid_groups}")
                     # 필터 조건에 맞지 않는 그룹 제거
-                    kpop_db_docs = [d for d in kpop_db_docs 
-                                   if (d.metadata.get('group', '') in specified_groups or 
-                                       d.metadata.get('group', '').lower() in specified_groups_lower)]
-                    returned_groups = {g for g in returned_groups 
-                                     if (g in specified_groups or g.lower() in specified_groups_lower)}
-                    print(f"   ✅ 필터링 재적용: {len(kpop_db_docs)}개 문서만 반환 (그룹: {list(returned_groups)})")
+                    kpop_db_docs = [d for d in kpop_db_docs
+                                    if mask_has(allowed_mask, d.metadata.get('doc_id'))]
+                    returned_mask &= allowed_mask
+                    print(f"   ✅ 필터링 재적용: {len(kpop_db_docs)}개 문서만 반환 "
+                          f"(그룹: {sorted(filter_engine.describe(returned_mask)['group'])})")
             
+            returned = filter_engine.describe(returned_mask)
             print(f"   ✅ DB 검색 완료: {len(kpop_db_docs)}개 K-pop 문장")
-            if returned_groups:
-                print(f"   📋 반환된 그룹: {list(returned_groups)}")
-            if returned_members:
-                print(f"   📋 반환된 멤버: {list(returned_members)[:5]}")
-            if returned_roles:
-                print(f"   📋 반환된 역할: {list(returned_roles)}")
-            if returned_agencies:
-                print(f"   📋 반환된 소속사: {list(returned_agencies)}")
-            if returned_fandoms:
-                print(f"   📋 반환된 팬덤: {list(returned_fandoms)}")
-            if returned_concepts:
-                print(f"   📋 반환된 컨셉: {list(returned_concepts)}")
-            if returned_years:
-                print(f"   📋 반환된 데뷔 연도: {sorted(list(returned_years))}")
-            if returned_types:
-                print(f"   📋 반환된 그룹 타입: {list(returned_types)}")
+            if returned['group']:
+                print(f"   📋 반환된 그룹: {sorted(returned['group'])}")
+            if returned['member']:
+                print(f"   📋 반환된 멤버: {sorted(returned['member'])[:5]}")
+            if returned['role']:
+                print(f"   📋 반환된 역할: {sorted(returned['role'])}")
+            if returned['agency']:
+                print(f"   📋 반환된 소속사: {sorted(returned['agency'])}")
+            if returned['fandom']:
+                print(f"   📋 반환된 팬덤: {sorted(returned['fandom'])}")
+            if returned['concept']:
+                print(f"   📋 반환된 컨셉: {sorted(returned['concept'])}")
+            if returned['debut_year']:
+                print(f"   📋 반환된 데뷔 연도: {sorted(returned['debut_year'])}")
+            if returned['group_type']:
+                print(f"   📋 반환된 그룹 타입: {sorted(returned['group_type'])}")
         else:
             print(f"   ✅ DB 검색 완료: {len(kpop_db_docs)}개 K-pop 문장")
         
@@ -7,6 +7,7 @@ from typing import Dict, List, Set, Optional, Any
 from dataclasses import dataclass
 from enum import Enum
 from langchain_openai import ChatOpenAI
+from Retriever.gazetteer import AhoCorasick, NAMED_ENTITY_TYPES
 
 
 class RetrieverType(Enum):
@@ -85,8 +86,15 @@ class IntelligentRouter:
         "세븐틴", "스트레이키즈", "엑소", "레드벨벳", "걸그룹", "보이그룹"
     }
     
-    def __init__(self, llm=None):
+    def __init__(self, llm=None, gazetteer=None):
         self.llm = llm or ChatOpenAI(model="gpt-4o-mini", temperature=0.3)
+        # K-pop 개체 사전 (KpopSentenceRetriever.gazetteer) - DB의 모든 그룹/멤버/별칭 탐지
+        self.gazetteer = gazetteer
+        # 트리거 키워드를 오토마톤 하나로 컴파일 (한 번의 스캔, 영문 키워드는 단어 경계 확인)
+        self._kpop_trigger_matcher = AhoCorasick()
+        for kw in self.KPOP_TRIGGERS:
+            self._kpop_trigger_matcher.add(kw.lower(), kw)
+        self._kpop_trigger_matcher.build()
     
     def route(
         self,
@@ -139,7 +147,7 @@ class IntelligentRouter:
        
         # K-pop 관련 내용이 쿼리에 있을 때만 활성화
         # query_analysis의 needs_kpop도 확인
-        if self._should_activate_kpop(query_lower, topic_lower, query_analysis):
+        if self._should_activate_kpop(query, topic, query_analysis):  # 개체 사전은 원문 대소문자로 매칭
             kpop_query = self._extract_kpop_query(query, topic, query_analysis)
             strategies.append(SearchStrategy(
                 retriever_type=RetrieverType.KPOP,
@@ -181,6 +189,20 @@ class IntelligentRouter:
             return True
         return False
     
+    @staticmethod
+    def _is_word_char(ch: str) -> bool:
+        return ch.isascii() and ch.isalnum()
+    
+    def _has_kpop_trigger(self, text: str) -> bool:
+        """K-pop 트리거 키워드 포함 여부 (영문 키워드는 단어 경계 확인: "river"의 "ive" 제외)"""
+        for start, end, pattern, _ in self._kpop_trigger_matcher.iter_matches(text):
+            if self._is_word_char(pattern[0]) and start > 0 and self._is_word_char(text[start - 1]):
+                continue
+            if self._is_word_char(pattern[-1]) and end < len(text) and self._is_word_char(text[end]):
+                continue
+            return True
+        return False
+    
     def _should_activate_kpop(self, query: str, topic: str, query_analysis: Optional[Dict] = None) -> bool:
         """
         K-pop 리트리버 활성화 여부 확인
@@ -202,10 +224,17 @@ class IntelligentRouter:
         query_lower = query.lower()
         topic_lower = topic.lower()
         
-        if any(kw in query_lower for kw in self.KPOP_TRIGGERS):
-            return True
-        if any(kw in topic_lower for kw in self.KPOP_TRIGGERS):
-            return True
+        for text in (query_lower, topic_lower):
+            if self._has_kpop_trigger(text):
+                return True
+        
+        # 3. DB 개체 사전 매칭 (그룹/멤버/소속사/팬덤 한글·영문 별칭, 원문 대소문자 기준)
+        # 컨셉만 걸린 경우와 영문 멤버명만 걸린 경우("Joy", "Han river")는 제외 - 일반 단어와 겹침
+        if self.gazetteer is not None:
+            for text in (query, topic):
+                if any(m.entity_type in NAMED_ENTITY_TYPES and not m.is_latin_member
+                       for m in self.gazetteer.find_all(text)):
+                    return True
         
         return False
     
@@ -0,0 +1,119 @@
+"""
+검색 번들 (retrieval bundle) 입출력
+오프라인에서 한 번 빌드한 벡터 인덱스, BM25 통계, 그룹명 인덱스를
+버전이 붙은 하나의 디렉토리로 저장하고 서빙 노드에서 임베딩 호출 없이 로드
+
+디렉토리 구조:
+    <bundle_dir>/
+        manifest.json
+        vocabulary/<level>/index.faiss, index.pkl, bm25.pkl
+        grammar/<level>/index.faiss, index.pkl, bm25.pkl
+        kpop/index.faiss, index.pkl, group_names.json, group_name_vectors.npy, group_row_ids.npy
+"""
+import os
+import json
+import pickle
+from typing import Any, Dict, List, Optional
+from langchain.schema import Document
+from langchain.vectorstores import FAISS
+from Retriever.index_cache import embedding_model_name
+
+BUNDLE_FORMAT_VERSION = 2
+MANIFEST_FILE = "manifest.json"
+
+
+def component_dir(bundle_dir: str, *parts: str) -> str:
+    """번들 내 컴포넌트 디렉토리 경로 (없으면 생성하지 않음)"""
+    return os.path.join(bundle_dir, *parts)
+
+
+def save_faiss(vectorstore: FAISS, path: str):
+    os.makedirs(path, exist_ok=True)
+    vectorstore.save_local(path)
+
+
+def load_faiss(path: str, embeddings) -> FAISS:
+    # 번들은 직접 빌드한 신뢰 가능한 산출물이므로 pickle 역직렬화 허용
+    return FAISS.load_local(path, embeddings, allow_dangerous_deserialization=True)
+
+
+def save_pickle(obj: Any, path: str):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        pickle.dump(obj, f)
+
+
+def load_pickle(path: str) -> Any:
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+class BundleMismatchError(ValueError):
+    """번들 manifest의 임베딩 정보와 로드한 인덱스/쿼리 임베딩이 맞지 않음"""
+
+
+def embedding_info(embeddings, vectorstore: Optional[FAISS]) -> Dict[str, Any]:
+    """manifest에 기록할 임베딩 정보 (모델명, 요청 차원, 인덱스 벡터 차원)"""
+    info = {
+        "embedding_model": embedding_model_name(embeddings),
+        "embedding_dimensions": getattr(embeddings, "dimensions", 0) or 0,
+    }
+    if vectorstore is not None:
+        info["index_dimension"] = int(vectorstore.index.d)
+    return info
+
+
+def check_embeddings(info: Dict[str, Any], embeddings, vectorstore: FAISS, where: str):
+    """
+    manifest 임베딩 정보 ↔ 실제로 만든 쿼리 임베딩 / 로드한 인덱스 비교
+    다른 모델·차원으로 검색하면 오류 없이 엉뚱한 결과가 나오므로 불일치 시 BundleMismatchError
+    (index_dimension이 없는 이전 번들은 모델명만 확인)
+    """
+    model = getattr(embeddings, "model", None)
+    if model != info["embedding_model"]:
+        raise BundleMismatchError(
+            f"{where}: 번들 임베딩 모델 '{info['embedding_model']}'과 생성된 임베딩 모델 '{model}'이 다릅니다."
+        )
+    index_dim = int(vectorstore.index.d)
+    expected = info.get("index_dimension")
+    if expected is not None and index_dim != expected:
+        raise BundleMismatchError(f"{where}: 인덱스 차원 {index_dim} ≠ manifest 기록 {expected} (번들 손상)")
+    query_dim = embeddings.output_dimension() if hasattr(embeddings, "output_dimension") else None
+    if query_dim is not None and query_dim != index_dim:
+        raise BundleMismatchError(
+            f"{where}: 쿼리 임베딩 차원 {query_dim} ≠ 인덱스 차원 {index_dim} (모델 '{model}')"
+        )
+
+
+def documents_from_faiss(vectorstore: FAISS) -> List[Document]:
+    """FAISS 인덱스 순서대로 docstore의 문서 복원"""
+    ids = [vectorstore.index_to_docstore_id[i] for i in range(len(vectorstore.index_to_docstore_id))]
+    return [vectorstore.docstore.search(doc_id) for doc_id in ids]
+
+
+def write_manifest(bundle_dir: str, manifest: Dict[str, Any]):
+    manifest = dict(manifest)
+    manifest.setdefault("format_version", BUNDLE_FORMAT_VERSION)
+    with open(os.path.join(bundle_dir, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+
+def read_manifest(bundle_dir: str) -> Dict[str, Any]:
+    path = os.path.join(bundle_dir, MANIFEST_FILE)
+    with open(path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("format_version") != BUNDLE_FORMAT_VERSION:
+        raise ValueError(
+            f"지원하지 않는 번들 포맷 버전: {manifest.get('format_version')} "
+            f"(필요: {BUNDLE_FORMAT_VERSION})"
+        )
+    return manifest
+
+
+def read_component_manifest(bundle_dir: str, component: str) -> Dict[str, Any]:
+    """manifest에서 특정 컴포넌트(vocabulary/grammar/kpop) 항목 반환"""
+    manifest = read_manifest(bundle_dir)
+    components = manifest.get("components", {})
+    if component not in components:
+        raise ValueError(f"번들에 '{component}' 컴포넌트가 없습니다: {bundle_dir}")
+    return components[component]
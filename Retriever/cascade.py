@@ -0,0 +1,64 @@
+"""
+2단계 캐스케이드 재정렬
+1단계: 앙상블(BM25 + 벡터) 순위와 질의-문서 글자 bigram 겹침을 섞은 경량 점수로 후보를 상위 N개로 줄임
+2단계: 남은 N개만 cross-encoder(bge-reranker)로 재정렬
+
+앙상블 순위는 이미 BM25와 벡터 점수를 융합한 결과이므로 그대로 사전 점수로 쓰고,
+조사/어미가 붙은 한국어 질의에도 맞도록 토큰 대신 글자 bigram 겹침을 보조 신호로 더한다.
+"""
+import unicodedata
+from functools import lru_cache
+from typing import Dict, List, Optional
+from langchain.schema import Document
+
+
+@lru_cache(maxsize=65536)
+def char_bigrams(text: str) -> frozenset:
+    """공백 단위 토큰 안의 글자 bigram 집합 (한 글자 토큰은 그대로)"""
+    grams = set()
+    for token in unicodedata.normalize("NFC", text or "").lower().split():
+        if len(token) == 1:
+            grams.add(token)
+        else:
+            grams.update(token[i:i + 2] for i in range(len(token) - 1))
+    return frozenset(grams)
+
+
+def first_stage_order(query: str, texts: List[str], rank_weight: float = 0.7) -> List[int]:
+    """
+    경량 1단계 점수 내림차순 인덱스
+    texts는 앙상블이 반환한 순서 그대로라고 가정 (앞쪽일수록 높은 순위 점수)
+    점수 = rank_weight * (1 - 순위/후보 수) + (1 - rank_weight) * (질의 bigram 중 문서에 있는 비율)
+    """
+    n = len(texts)
+    if n == 0:
+        return []
+    query_grams = char_bigrams(query)
+    scores = []
+    for rank, text in enumerate(texts):
+        lexical = len(query_grams & char_bigrams(text)) / len(query_grams) if query_grams else 0.0
+        scores.append(rank_weight * (1.0 - rank / n) + (1.0 - rank_weight) * lexical)
+    return sorted(range(n), key=lambda i: scores[i], reverse=True)
+
+
+def cascade_rerank(reranker, query: str, docs: List[Document], top_k: int,
+                   keep: Optional[int] = None, rank_weight: float = 0.7,
+                   stats: Optional[Dict] = None) -> List[Document]:
+    """
+    1단계로 상위 keep개만 남긴 뒤 reranker로 재정렬해 top_k 반환
+    keep이 없거나 후보 수 이하이면 1단계 없이 전부 재정렬
+    stats: requests / candidates / heavy_pairs 누적 (요청당 cross-encoder 쌍 수 측정용)
+    """
+    if not docs:
+        return []
+    if keep and len(docs) > keep:
+        order = first_stage_order(query, [d.page_content for d in docs], rank_weight)[:keep]
+        # 1단계에서 남은 후보는 원래 앙상블 순서 유지 (reranker 실패 시 폴백 순서)
+        pruned = [docs[i] for i in sorted(order)]
+    else:
+        pruned = docs
+    if stats is not None:
+        stats["requests"] = stats.get("requests", 0) + 1
+        stats["candidates"] = stats.get("candidates", 0) + len(docs)
+        stats["heavy_pairs"] = stats.get("heavy_pairs", 0) + len(pruned)
+    return reranker.rerank(query, pruned, top_k=top_k)
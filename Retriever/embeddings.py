@@ -0,0 +1,330 @@
+"""
+임베딩 백엔드 + 캐시 모듈
+(모델명, 차원, 텍스트 sha256)을 키로 임베딩 벡터를 로컬 sqlite 파일에 저장하고
+모든 리트리버가 같은 캐시 계층을 거쳐 임베딩을 요청한다.
+같은 텍스트는 재시작/재요청/인덱스 재빌드 시에도 네트워크 호출 없이 재사용
+
+백엔드 (config.EMBEDDING_CONFIG['backend']로 선택, 인덱스 빌드/쿼리 시 공통):
+- openai: OpenAI 임베딩 API (기본값)
+- sentence_transformers: CPU 로컬 다국어 sentence-transformer
+- hashed: 결정적 해시 문자 n-gram 임베딩 (외부 의존성/네트워크 없음)
+"""
+import os
+import zlib
+import sqlite3
+import hashlib
+import threading
+import unicodedata
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_openai import OpenAIEmbeddings
+
+DEFAULT_EMBEDDING_MODEL = "text-embedding-ada-002"
+DEFAULT_SENTENCE_TRANSFORMER_MODEL = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+HASHED_MODEL_PREFIX = "hashed-char-ngram-d"
+OPENAI_MODEL_PREFIX = "text-embedding-"
+EMBEDDING_BACKENDS = ("openai", "sentence_transformers", "hashed")
+# dimensions 미지정 시 OpenAI 모델 기본 출력 차원
+OPENAI_MODEL_DIMENSIONS = {
+    "text-embedding-ada-002": 1536,
+    "text-embedding-3-small": 1536,
+    "text-embedding-3-large": 3072,
+}
+
+
+class HashedCharNgramEmbeddings(Embeddings):
+    """
+    해시 문자 n-gram 임베딩 (feature hashing)
+    단어 경계를 포함한 1~3글자 n-gram을 crc32로 차원에 사상하고 부호를 붙여 누적 후 L2 정규화
+    같은 입력이면 항상 같은 벡터 (프로세스/머신 무관)
+    """
+    def __init__(self, dimensions: int = 512, ngram_range: Tuple[int, int] = (1, 3)):
+        self.dimensions = dimensions
+        self.ngram_range = ngram_range
+        self.model = f"{HASHED_MODEL_PREFIX}{dimensions}"
+
+    def _embed(self, text: str) -> List[float]:
+        vec = np.zeros(self.dimensions, dtype=np.float32)
+        text = unicodedata.normalize("NFC", text or "").lower()
+        lo, hi = self.ngram_range
+        for token in text.split():
+            padded = f" {token} "
+            for n in range(lo, hi + 1):
+                for i in range(len(padded) - n + 1):
+                    gram = padded[i:i + n]
+                    if gram.isspace():
+                        continue
+                    h = zlib.crc32(gram.encode("utf-8"))
+                    vec[h % self.dimensions] += 1.0 if (h >> 31) & 1 else -1.0
+        norm = np.linalg.norm(vec)
+        if norm > 0:
+            vec /= norm
+        return vec.tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(t) for t in texts]
+
+    def output_dimension(self) -> int:
+        return self.dimensions
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+
+class SentenceTransformerEmbeddings(Embeddings):
+    """CPU 로컬 sentence-transformer 임베딩 (모델은 첫 호출 시 로드)"""
+    def __init__(self, model: str = DEFAULT_SENTENCE_TRANSFORMER_MODEL, batch_size: int = 64):
+        self.model = model
+        self.batch_size = batch_size
+        self._encoder = None
+        self._lock = threading.Lock()
+
+    def _get_encoder(self):
+        if self._encoder is None:
+            with self._lock:
+                if self._encoder is None:
+                    from sentence_transformers import SentenceTransformer
+                    self._encoder = SentenceTransformer(self.model, device="cpu")
+        return self._encoder
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors = self._get_encoder().encode(
+            list(texts), batch_size=self.batch_size, normalize_embeddings=True, show_progress_bar=False
+        )
+        return vectors.astype(np.float32).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    def output_dimension(self) -> int:
+        return int(self._get_encoder().get_sentence_embedding_dimension())
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class SQLiteEmbeddingStore:
+    """임베딩 벡터 저장소 (float32 blob, 스레드 안전)"""
+    def __init__(self, path: str = ":memory:"):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " model TEXT NOT NULL, dimensions INTEGER NOT NULL, text_sha TEXT NOT NULL,"
+            " vector BLOB NOT NULL, PRIMARY KEY (model, dimensions, text_sha))"
+        )
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    def get_many(self, model: str, dimensions: int, shas: List[str]) -> Dict[str, List[float]]:
+        found = {}
+        if not shas:
+            return found
+        with self._lock:
+            # sqlite 변수 개수 제한을 피하기 위해 나눠서 조회
+            for i in range(0, len(shas), 500):
+                chunk = shas[i:i + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT text_sha, vector FROM embeddings WHERE model=? AND dimensions=? "
+                    f"AND text_sha IN ({placeholders})",
+                    [model, dimensions, *chunk],
+                ).fetchall()
+                for sha, blob in rows:
+                    found[sha] = np.frombuffer(blob, dtype=np.float32).tolist()
+        return found
+
+    def put_many(self, model: str, dimensions: int, items: Dict[str, List[float]]):
+        if not items:
+            return
+        rows = [
+            (model, dimensions, sha, np.asarray(vec, dtype=np.float32).tobytes())
+            for sha, vec in items.items()
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, dimensions, text_sha, vector) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    임베딩 캐시 래퍼
+    캐시에 없는 텍스트만 묶어서 실제 임베딩 모델에 한 번 요청
+    """
+    def __init__(self, underlying: Embeddings, model: str, dimensions: Optional[int] = None,
+                 store: Optional[SQLiteEmbeddingStore] = None):
+        self.underlying = underlying
+        self.model = model
+        self.dimensions = dimensions or 0  # 0 = 모델 기본 차원
+        self.store = store or SQLiteEmbeddingStore()
+        self._stats_lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0}
+
+    def output_dimension(self) -> Optional[int]:
+        """임베딩 호출 없이 알 수 있는 출력 차원 (알 수 없으면 None)"""
+        if self.dimensions:
+            return self.dimensions
+        if hasattr(self.underlying, "output_dimension"):
+            return self.underlying.output_dimension()
+        return OPENAI_MODEL_DIMENSIONS.get(self.model)
+
+    def _count(self, hits: int, misses: int):
+        with self._stats_lock:
+            self.stats["hits"] += hits
+            self.stats["misses"] += misses
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        shas = [text_hash(t) for t in texts]
+        cached = self.store.get_many(self.model, self.dimensions, list(set(shas)))
+
+        # 캐시 미스 텍스트만 중복 제거 후 한 번에 임베딩
+        missing: Dict[str, str] = {}
+        for sha, text in zip(shas, texts):
+            if sha not in cached and sha not in missing:
+                missing[sha] = text
+        if missing:
+            vectors = self.underlying.embed_documents(list(missing.values()))
+            new_items = dict(zip(missing.keys(), vectors))
+            self.store.put_many(self.model, self.dimensions, new_items)
+            cached.update(new_items)
+
+        self._count(hits=len(texts) - len(missing), misses=len(missing))
+        return [cached[sha] for sha in shas]
+
+    def embed_query(self, text: str) -> List[float]:
+        sha = text_hash(text)
+        cached = self.store.get_many(self.model, self.dimensions, [sha])
+        if sha in cached:
+            self._count(hits=1, misses=0)
+            return cached[sha]
+        vector = self.underlying.embed_query(text)
+        self.store.put_many(self.model, self.dimensions, {sha: vector})
+        self._count(hits=0, misses=1)
+        return vector
+
+    def hit_rate(self) -> float:
+        total = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / total if total else 0.0
+
+
+_registry: Dict[tuple, CachedEmbeddings] = {}
+_registry_lock = threading.Lock()
+_config = {
+    "backend": "openai",
+    "model": None,        # 로컬 백엔드 모델명 (None이면 기본값)
+    "dimensions": 512,    # hashed 백엔드 벡터 차원
+    "cache_path": ":memory:",
+}
+_store: Optional[SQLiteEmbeddingStore] = None
+
+
+def configure_embeddings(backend: str = "openai", model: Optional[str] = None,
+                         dimensions: Optional[int] = None, cache_path: Optional[str] = None):
+    """
+    임베딩 백엔드와 캐시 파일 경로 설정 (리트리버 생성 전에 호출)
+    cache_path가 None이면 메모리 캐시
+    """
+    global _store
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(f"지원하지 않는 임베딩 백엔드: {backend} (가능: {', '.join(EMBEDDING_BACKENDS)})")
+    with _registry_lock:
+        _config.update({
+            "backend": backend,
+            "model": model,
+            "dimensions": dimensions or 512,
+            "cache_path": cache_path or ":memory:",
+        })
+        _store = None
+        _registry.clear()
+
+
+def _get_store() -> SQLiteEmbeddingStore:
+    global _store
+    if _store is None:
+        _store = SQLiteEmbeddingStore(_config["cache_path"])
+    return _store
+
+
+def backend_for_model(model: str) -> str:
+    """모델명으로 백엔드 판별 (해시 접두사 / OpenAI "text-embedding-" / 그 외는 sentence-transformer)"""
+    if model.startswith(HASHED_MODEL_PREFIX):
+        return "hashed"
+    if model.startswith(OPENAI_MODEL_PREFIX):
+        return "openai"
+    return "sentence_transformers"
+
+
+def _resolve(model: Optional[str], dimensions: Optional[int], exact: bool = False) -> Tuple[str, str, int]:
+    """
+    요청 모델명 → (백엔드, 실제 모델명, 차원)
+    - exact=True (번들 manifest 등 인덱스를 만든 모델): 설정과 무관하게 모델명의 백엔드로 그대로 해석
+      (다른 모델로 바꾸면 인덱스와 벡터 공간/차원이 달라짐)
+    - exact=False: 로컬 백엔드가 설정된 경우 OpenAI 모델명 요청(코드 기본값)만 설정된 로컬 모델로 대체,
+      해시/sentence-transformer 모델명은 어느 설정에서든 해당 백엔드로 해석
+    """
+    backend = _config["backend"]
+    named = backend_for_model(model) if model else None
+    if exact and model:
+        if named != backend:
+            print(f"   ⚠️ 인덱스 임베딩 모델 '{model}'이 설정된 백엔드({backend})와 달라 '{named}' 백엔드로 로드합니다.")
+        return _resolved(named, model, dimensions)
+    if named in ("hashed", "sentence_transformers"):
+        return _resolved(named, model, dimensions)
+    if backend == "hashed":
+        dims = _config["dimensions"]
+        return "hashed", f"{HASHED_MODEL_PREFIX}{dims}", dims
+    if backend == "sentence_transformers":
+        return backend, _config["model"] or DEFAULT_SENTENCE_TRANSFORMER_MODEL, 0
+    return "openai", model or DEFAULT_EMBEDDING_MODEL, dimensions or 0
+
+
+def _resolved(backend: str, model: str, dimensions: Optional[int]) -> Tuple[str, str, int]:
+    """모델명 그대로의 (백엔드, 모델명, 차원) - 해시 모델은 이름의 차원, sentence-transformer는 모델 기본 차원"""
+    if backend == "hashed":
+        return backend, model, int(model[len(HASHED_MODEL_PREFIX):])
+    if backend == "sentence_transformers":
+        return backend, model, 0
+    return backend, model, dimensions or 0
+
+
+def _create_backend(backend: str, model: str, dimensions: int) -> Embeddings:
+    if backend == "hashed":
+        return HashedCharNgramEmbeddings(dimensions)
+    if backend == "sentence_transformers":
+        return SentenceTransformerEmbeddings(model)
+    kwargs = {"model": model}
+    if dimensions:
+        kwargs["dimensions"] = dimensions
+    return OpenAIEmbeddings(**kwargs)
+
+
+def get_embeddings(model: Optional[str] = None, dimensions: Optional[int] = None,
+                   exact: bool = False) -> CachedEmbeddings:
+    """
+    모델/차원별 공유 캐시 임베딩 객체 반환 (프로젝트의 모든 임베딩 호출은 이 객체를 거친다)
+    exact: 이미 만든 인덱스의 모델을 그대로 사용 (번들 로드 시, 설정된 로컬 모델로 대체하지 않음)
+    """
+    backend, model, dimensions = _resolve(model, dimensions, exact)
+    key = (model, dimensions)
+    embeddings = _registry.get(key)
+    if embeddings is not None:
+        return embeddings
+    with _registry_lock:
+        if key not in _registry:
+            _registry[key] = CachedEmbeddings(
+                _create_backend(backend, model, dimensions), model, dimensions, store=_get_store()
+            )
+        return _registry[key]
+
+
+def embedding_cache_stats() -> Dict[str, Dict[str, int]]:
+    """모델별 캐시 적중/미스 횟수"""
+    return {f"{model}:{dims}" if dims else model: dict(e.stats) for (model, dims), e in _registry.items()}
@@ -0,0 +1,291 @@
+"""
+K-pop 개체 사전 (gazetteer) + Aho-Corasick 다중 패턴 매처
+kpop_db.json의 그룹/멤버/소속사/팬덤/컨셉과 한글/영문 별칭을 한 번만 오토마톤으로 컴파일하고
+질의 안의 모든 개체 언급을 한 번의 선형 스캔으로 찾는다 (하드코딩된 그룹 목록 불필요)
+"""
+import unicodedata
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Tuple
+from langchain.schema import Document
+
+ENTITY_TYPES = ("group", "member", "agency", "fandom", "concept")
+# K-pop 고유 개체 (컨셉은 "밝은", "에너지" 같은 일반 형용사/명사라 단독으로 K-pop 질의 근거가 되지 않음)
+NAMED_ENTITY_TYPES = ("group", "member", "agency", "fandom")
+
+# DB에 영문으로만 있는 컨셉의 한국어 표현 (DB에 해당 컨셉이 있을 때만 등록)
+CONCEPT_ALIASES = {
+    "걸크러시": "girl crush",
+    "걸크러쉬": "girl crush",
+    "힙합": "hip-hop",
+    "자신감": "confidence",
+    "자기애": "self-love",
+    "청춘": "youth",
+    "스토리텔링": "storytelling",
+    "귀여운": "cute",
+    "큐트": "cute",
+    "밝은": "bright",
+    "에너지": "energetic",
+    "퍼포먼스": "performance",
+    "자체 제작": "self-producing",
+    "우아한": "elegance",
+}
+
+
+# 한글 별칭 뒤에 붙어도 같은 개체로 보는 조사/접미사 (최대 두 개 연속, 예: "블랙핑크의", "방탄소년단에서는")
+PARTICLES = frozenset({
+    "이", "가", "은", "는", "을", "를", "의", "에", "에서", "에게", "께", "한테", "와", "과",
+    "랑", "이랑", "하고", "도", "만", "로", "으로", "처럼", "같이", "보다", "까지", "부터",
+    "나", "이나", "든", "이든", "야", "아", "이야", "요", "이요", "예요", "이에요", "에요",
+    "님", "씨", "들", "표", "풍",
+})
+MAX_PARTICLE_LEN = max(len(p) for p in PARTICLES)
+
+
+def normalize_text(text: str) -> str:
+    """매칭용 정규화: NFC + 소문자 (길이 보존 → 원문 위치 그대로 사용 가능)"""
+    return unicodedata.normalize("NFC", text or "").lower()
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isascii() and ch.isalnum()
+
+
+def _is_hangul(ch: str) -> bool:
+    return "\uac00" <= ch <= "\ud7a3" or "\u3131" <= ch <= "\u318e"
+
+
+def _is_particle_run(run: str, depth: int = 2) -> bool:
+    """run 전체가 조사/접미사 최대 depth개의 연속인지"""
+    if not run:
+        return True
+    if depth == 0:
+        return False
+    return any(run[:n] in PARTICLES and _is_particle_run(run[n:], depth - 1)
+               for n in range(1, min(len(run), MAX_PARTICLE_LEN) + 1))
+
+
+def hangul_boundary(text: str, start: int, end: int) -> bool:
+    """
+    한글 별칭의 어절 경계 확인
+    - 앞: 한글이 아니어야 함 ("둘이서"의 "이서" 제외)
+    - 뒤: 끝/공백/문장부호, 또는 조사만 이어진 뒤 경계 ("공부하니까", "미나리" 제외, "블랙핑크의" 허용)
+    """
+    if start > 0 and _is_hangul(text[start - 1]):
+        return False
+    stop = end
+    while stop < len(text) and _is_hangul(text[stop]):
+        stop += 1
+    return _is_particle_run(text[end:stop])
+
+
+class AhoCorasick:
+    """
+    Aho-Corasick 오토마톤
+    패턴 집합을 trie + 실패 링크로 컴파일하여 텍스트 길이에 선형인 시간에 모든 출현 위치 탐색
+    """
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+        self._patterns: List[Tuple[str, object]] = []  # (패턴, payload)
+        self._built = False
+
+    def add(self, pattern: str, payload: object = None):
+        if not pattern:
+            return
+        node = 0
+        for ch in pattern:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        self._out[node].append(len(self._patterns))
+        self._patterns.append((pattern, payload))
+        self._built = False
+
+    def build(self):
+        """BFS로 실패 링크 계산, 출력 목록을 실패 체인을 따라 병합"""
+        queue = deque()
+        for nxt in self._goto[0].values():
+            self._fail[nxt] = 0
+            queue.append(nxt)
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                f = self._fail[node]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+        self._built = True
+        return self
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int, str, object]]:
+        """(시작, 끝, 패턴, payload) 생성 - 끝 위치 순"""
+        if not self._built:
+            self.build()
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(ch, 0)
+            for pid in self._out[node]:
+                pattern, payload = self._patterns[pid]
+                yield i - len(pattern) + 1, i + 1, pattern, payload
+
+    def __len__(self) -> int:
+        return len(self._patterns)
+
+
+@dataclass(frozen=True)
+class GazetteerEntry:
+    entity_type: str            # group / member / agency / fandom / concept
+    canonical: str              # DB 표기 (예: "BLACKPINK", "Jisoo", "YG Entertainment")
+    groups: Tuple[str, ...]     # 이 개체가 속한 그룹들
+    case_sensitive: bool = False
+
+
+@dataclass(frozen=True)
+class EntityMention:
+    entity_type: str
+    canonical: str
+    groups: Tuple[str, ...]
+    surface: str                # 질의에 실제로 나온 표현
+    start: int
+    end: int
+    is_alias: bool = False      # DB 표기가 아닌 별칭으로 매칭 (예: "하니" → Hanni, 일반 단어와 겹칠 수 있음)
+
+    @property
+    def is_latin_member(self) -> bool:
+        """영문 표기 멤버명 ("Joy", "Han", "Wendy"처럼 일반 영단어/이름과 겹칠 수 있음)"""
+        return self.entity_type == "member" and not any(_is_hangul(ch) for ch in self.surface)
+
+    @property
+    def is_weak(self) -> bool:
+        """단독으로는 K-pop 근거가 약한 언급 (별칭 또는 영문 멤버명)"""
+        return self.is_alias or self.is_latin_member
+
+
+class KpopGazetteer:
+    """
+    K-pop 개체 사전
+    - 라틴 문자 별칭은 단어 경계가 맞을 때만 매칭 ("IVE"가 "give"에 걸리지 않도록)
+    - 한글 별칭은 어절 단위로만 매칭: 뒤에 조사만 붙은 경우 허용 ("블랙핑크의"),
+      더 긴 단어의 일부면 제외 ("공부하니까", "미나리"), 한 글자 별칭은 오탐 방지를 위해 제외
+    - 전부 대문자인 영문 팬덤명(ARMY, ONCE 등)과 영문 멤버명(Joy, Kai 등)은 대소문자를 구분 (일반 영단어와 구별)
+    """
+    def __init__(self):
+        self._automaton = AhoCorasick()
+        self.entries: Dict[Tuple[str, str], GazetteerEntry] = {}
+        self.surfaces: Dict[Tuple[str, str], List[str]] = {}  # (유형, 표기) -> 등록된 표면형
+
+    @classmethod
+    def from_documents(cls, docs: Iterable[Document]) -> "KpopGazetteer":
+        """KpopSentenceRetriever.kpop_data 문서 메타데이터로 사전 구축"""
+        gazetteer = cls()
+        agencies: Dict[str, List[str]] = {}
+        fandoms: Dict[str, List[str]] = {}
+        concepts: Dict[str, List[str]] = {}
+        agency_aliases: Dict[str, set] = {}
+        fandom_aliases: Dict[str, set] = {}
+
+        for doc in docs:
+            meta = doc.metadata
+            group = meta.get("group", "")
+            if not group:
+                continue
+            gazetteer._add("group", group, (group,), [group, *meta.get("aliases", [])])
+            for m in meta.get("members", []):
+                if isinstance(m, dict) and m.get("name"):
+                    names = [m["name"], *m.get("aliases", [])]
+                    hangul = [n for n in names if any(_is_hangul(ch) for ch in n)]
+                    latin = [n for n in names if n not in hangul]
+                    gazetteer._add("member", m["name"], (group,), latin, case_sensitive=True)
+                    gazetteer._add("member", m["name"], (group,), hangul)
+            if meta.get("agency"):
+                agencies.setdefault(meta["agency"], []).append(group)
+                agency_aliases.setdefault(meta["agency"], set()).update(meta.get("agency_aliases", []))
+            if meta.get("fandom"):
+                fandoms.setdefault(meta["fandom"], []).append(group)
+                fandom_aliases.setdefault(meta["fandom"], set()).update(meta.get("fandom_aliases", []))
+            for c in meta.get("concepts", []) or []:
+                if isinstance(c, str) and c:
+                    concepts.setdefault(c, []).append(group)
+
+        for agency, groups in agencies.items():
+            gazetteer._add("agency", agency, tuple(groups), [agency, *sorted(agency_aliases[agency])])
+        for fandom, groups in fandoms.items():
+            case_sensitive = fandom.isascii() and fandom.isupper()
+            gazetteer._add("fandom", fandom, tuple(groups), [fandom], case_sensitive=case_sensitive)
+            gazetteer._add("fandom", fandom, tuple(groups), sorted(fandom_aliases[fandom]))
+        for concept, groups in concepts.items():
+            aliases = [k for k, v in CONCEPT_ALIASES.items() if v == concept.lower()]
+            gazetteer._add("concept", concept, tuple(groups), [concept, *aliases])
+
+        gazetteer._automaton.build()
+        return gazetteer
+
+    def _add(self, entity_type: str, canonical: str, groups: Tuple[str, ...],
+             surfaces: Iterable[str], case_sensitive: bool = False):
+        entry = GazetteerEntry(entity_type, canonical, groups, case_sensitive)
+        self.entries[(entity_type, canonical)] = entry
+        for surface in surfaces:
+            surface = unicodedata.normalize("NFC", surface or "").strip()
+            if not surface:
+                continue
+            if len(surface) < 2:
+                continue  # "V", "진" 같은 한 글자 별칭은 오탐이 많아 제외
+            self._automaton.add(surface.lower(), (entry, surface))
+            self.surfaces.setdefault((entity_type, canonical), []).append(surface)
+
+    def find_all(self, text: str) -> List[EntityMention]:
+        """
+        질의의 모든 개체 언급 (겹치면 더 긴 매칭 우선, 왼쪽부터)
+        스캔 자체는 한 번의 선형 패스
+        """
+        if not text or not len(self._automaton):
+            return []
+        normalized = normalize_text(text)
+        raw = unicodedata.normalize("NFC", text)
+        candidates = []
+        for start, end, pattern, (entry, surface) in self._automaton.iter_matches(normalized):
+            if entry.case_sensitive and raw[start:end] != surface:
+                continue
+            # 라틴 문자로 시작/끝나는 패턴은 단어 경계 확인
+            if _is_word_char(pattern[0]) and start > 0 and _is_word_char(normalized[start - 1]):
+                continue
+            if _is_word_char(pattern[-1]) and end < len(normalized) and _is_word_char(normalized[end]):
+                continue
+            # 한글로 시작/끝나는 패턴은 어절 경계 + 조사 확인
+            if (_is_hangul(pattern[0]) or _is_hangul(pattern[-1])) and not hangul_boundary(normalized, start, end):
+                continue
+            candidates.append((start, end, entry, normalize_text(surface) != normalize_text(entry.canonical)))
+
+        candidates.sort(key=lambda x: (x[0], -(x[1] - x[0])))
+        mentions, last_end = [], -1
+        for start, end, entry, is_alias in candidates:
+            if start < last_end:
+                continue
+            mentions.append(EntityMention(entry.entity_type, entry.canonical, entry.groups,
+                                          raw[start:end], start, end, is_alias))
+            last_end = end
+        return mentions
+
+    def find_groups(self, text: str) -> List[str]:
+        """질의에 직접 언급된 그룹명 (DB 표기, 언급 순서, 중복 제거)"""
+        seen, groups = set(), []
+        for m in self.find_all(text):
+            if m.entity_type == "group" and m.canonical not in seen:
+                seen.add(m.canonical)
+                groups.append(m.canonical)
+        return groups
+
+    def aliases_of(self, entity_type: str, canonical: str) -> List[str]:
+        """등록된 표면형 목록 (그룹명 임베딩 인덱스의 별칭 행 구성용)"""
+        return list(self.surfaces.get((entity_type, canonical), []))
@@ -1,71 +1,61 @@
 """
 문법 Retriever (BM25 + Reranker 개선)
 """
+import os
 import json
-from typing import List, Dict
+from typing import List, Dict, Optional
 from langchain_core.documents import Document
 from langchain_community.vectorstores import FAISS
-from langchain_openai import OpenAIEmbeddings
 from langchain.retrievers.ensemble import EnsembleRetriever
 from langchain_community.retrievers import BM25Retriever
-import random
-
-# BGE Reranker 공유 (vocabulary_retriever와 동일)
-try:
-    import torch
-    from transformers import AutoModelForSequenceClassification, AutoTokenizer
-    
-    class BGEReranker:
-        """BGE-reranker-v2-m3 기반 reranker"""
-        def __init__(self):
-            self.tokenizer = AutoTokenizer.from_pretrained('BAAI/bge-reranker-v2-m3')
-            self.model = AutoModelForSequenceClassification.from_pretrained('BAAI/bge-reranker-v2-m3')
-            self.model.eval()
-            if torch.cuda.is_available():
-                self.model = self.model.cuda()
-        
-        def rerank(self, query: str, docs: List[Document], top_k: int = 10) -> List[Document]:
-            if not docs:
-                return []
-            
-            pairs = [[query, d.page_content] for d in docs]
-            with torch.no_grad():
-                inputs = self.tokenizer(pairs, padding=True, truncation=True, 
-                                       return_tensors='pt', max_length=512)
-                if torch.cuda.is_available():
-                    inputs = {k: v.cuda() for k, v in inputs.items()}
-                
-                scores = self.model(**inputs, return_dict=True).logits.view(-1).float().cpu()
-            
-            ranked_idx = scores.argsort(descending=True)[:top_k]
-            return [docs[i] for i in ranked_idx]
-    
-    _BGE_RERANKER_AVAILABLE = True
-except ImportError:
-    _BGE_RERANKER_AVAILABLE = False
-    BGEReranker = None
+from Retriever.reranker import get_reranker, reranker_available
+from Retriever.cascade import cascade_rerank
+from Retriever.sampling import request_rng
+from Retriever.recency_store import RecencyStore, InMemoryRecencyStore, BoundedCounter
+from Retriever.embeddings import get_embeddings
+from Retriever.index_cache import compute_data_hash, embedding_model_name
+from Retriever.bundle import (
+    component_dir, save_faiss, load_faiss, save_pickle, load_pickle, read_component_manifest,
+    embedding_info, check_embeddings,
+)
 
 class GrammarRetriever:
     """문법 JSON 파일 기반 Retriever (BM25 + Reranker 개선)"""
+
+    RECENT_QUERY_SIZE = 50  # 쿼리별 최근 문법 보관 수
     
-    def __init__(self, json_paths: Dict[str, str], use_reranker: bool = True):
+    def __init__(self, json_paths: Dict[str, str], use_reranker: bool = True,
+                 bundle_dir: Optional[str] = None, cascade: Optional[Dict] = None,
+                 max_tracked_queries: int = 10000, recency_store: Optional[RecencyStore] = None):
         self.json_paths = json_paths
+        self.bundle_dir = bundle_dir  # 오프라인 빌드 번들 (있으면 임베딩 호출 없이 로드)
         self.grammar_data = {}
         self.retrievers = {}
-        self.use_reranker = use_reranker and _BGE_RERANKER_AVAILABLE
+        self.vectorstores = {}
+        self.bm25_retrievers = {}
+        self.embeddings = None
+        self.use_reranker = use_reranker and reranker_available()
         self.reranker = None
-        from collections import deque
-        self.query_recent_grammar = {}  # 쿼리별 최근 문법 캐시 (쿼리별 중복 방지)
-        self.query_call_count = {}  # 쿼리별 실행 횟수 (매번 다른 결과 보장)
+        # 2단계 캐스케이드: {'keep': {레벨: N}, 'rank_weight': float} (None이면 후보 전부 재정렬)
+        self.cascade = cascade or {}
+        self.cascade_stats = {"requests": 0, "candidates": 0, "heavy_pairs": 0}
+        # 쿼리별 최근 문법 (기본은 프로세스 메모리, 여러 워커가 공유하려면 sqlite/kv 저장소 주입)
+        # 추적 쿼리 수는 LRU로 제한 → 메모리 일정
+        self.recency_store = recency_store or InMemoryRecencyStore(max_keys=max_tracked_queries)
+        self.query_call_count = BoundedCounter(max_keys=max_tracked_queries)  # 쿼리별 실행 횟수
         if self.use_reranker:
             try:
-                self.reranker = BGEReranker()
-                print("   ✅ Grammar Retriever: BGE Reranker 초기화 완료")
+                # vocabulary_retriever와 같은 인스턴스 공유 (모델은 첫 재정렬 시 로드)
+                self.reranker = get_reranker()
+                print("   ✅ Grammar Retriever: BGE Reranker 연결 완료")
             except Exception as e:
                 print(f"   ⚠️ Grammar Retriever: Reranker 초기화 실패: {e}")
                 self.use_reranker = False
-        self._load_grammar()
-        self._create_retrievers()
+        if bundle_dir:
+            self._load_from_bundle(bundle_dir)
+        else:
+            self._load_grammar()
+            self._create_retrievers()
     
     def _load_grammar(self):
         """JSON 파일들을 레벨별로 로드"""
@@ -106,49 +96,86 @@ class GrammarRetriever:
     
     def _create_retrievers(self):
         """레벨별 retriever 생성: BM25 + Vector 앙상블"""
-        embeddings = OpenAIEmbeddings()
+        embeddings = self.embeddings = get_embeddings()
         
         for level, documents in self.grammar_data.items():
             if documents:
                 # Vector search
                 vectorstore = FAISS.from_documents(documents, embeddings)
-                vector_retriever = vectorstore.as_retriever(
-                    search_kwargs={"k": 50}  # 넓게 가져와서 reranker에게 위임
-                )
-                
                 # BM25 추가 (키워드 검색 강화)
                 bm25_retriever = BM25Retriever.from_documents(documents)
-                bm25_retriever.k = 50
-                
-                # 앙상블: 의미(임베딩) 0.6, 키워드 0.4
-                ensemble_retriever = EnsembleRetriever(
-                    retrievers=[vector_retriever, bm25_retriever],
-                    weights=[0.6, 0.4]
-                )
-                self.retrievers[level] = ensemble_retriever
+                self._register_level(level, vectorstore, bm25_retriever)
     
+    def _register_level(self, level: str, vectorstore, bm25_retriever):
+        """벡터 인덱스 + BM25로 레벨별 앙상블 retriever 구성"""
+        self.vectorstores[level] = vectorstore
+        self.bm25_retrievers[level] = bm25_retriever
+        
+        vector_retriever = vectorstore.as_retriever(
+            search_kwargs={"k": 50}  # 넓게 가져와서 reranker에게 위임
+        )
+        bm25_retriever.k = 50
+        
+        # 앙상블: 의미(임베딩) 0.6, 키워드 0.4
+        ensemble_retriever = EnsembleRetriever(
+            retrievers=[vector_retriever, bm25_retriever],
+            weights=[0.6, 0.4]
+        )
+        self.retrievers[level] = ensemble_retriever
+    
+    def export_to_bundle(self, bundle_dir: str) -> Dict:
+        """레벨별 FAISS 인덱스와 BM25 통계를 번들에 저장하고 manifest 항목 반환"""
+        levels = {}
+        for level, vectorstore in self.vectorstores.items():
+            level_dir = component_dir(bundle_dir, "grammar", level)
+            save_faiss(vectorstore, level_dir)
+            save_pickle(self.bm25_retrievers[level], os.path.join(level_dir, "bm25.pkl"))
+            levels[level] = len(self.grammar_data.get(level, []))
+        
+        model = embedding_model_name(self.embeddings)
+        return {
+            **embedding_info(self.embeddings, next(iter(self.vectorstores.values()), None)),
+            "data_hash": compute_data_hash(self.json_paths.values(), model),
+            "levels": levels,
+        }
+    
+    def _load_from_bundle(self, bundle_dir: str):
+        """번들에서 인덱스/BM25/문서 로드 (임베딩 호출 없음)"""
+        info = read_component_manifest(bundle_dir, "grammar")
+        embeddings = self.embeddings = get_embeddings(
+            info["embedding_model"], info.get("embedding_dimensions"), exact=True
+        )
+        for level in info.get("levels", {}):
+            level_dir = component_dir(bundle_dir, "grammar", level)
+            vectorstore = load_faiss(level_dir, embeddings)
+            check_embeddings(info, embeddings, vectorstore, f"grammar/{level}")
+            bm25_retriever = load_pickle(os.path.join(level_dir, "bm25.pkl"))
+            self.grammar_data[level] = list(bm25_retriever.docs)
+            self._register_level(level, vectorstore, bm25_retriever)
     
+    
+    def _rerank(self, query: str, docs: List[Document], level: str) -> List[Document]:
+        """캐스케이드 재정렬 (1단계로 레벨별 상위 N개만 남긴 뒤 cross-encoder)"""
+        return cascade_rerank(
+            self.reranker, query, docs, top_k=30,
+            keep=self.cascade.get("keep", {}).get(level),
+            rank_weight=self.cascade.get("rank_weight", 0.7),
+            stats=self.cascade_stats,
+        )
+
     def invoke(self, query: str, level: str, k: int = 10) -> List[Document]:
         """
         개선된 문법 검색 파이프라인 (쿼리별 중복 방지)
         1. BM25 + Vector 앙상블로 넓게 후보 수집
-        2. Reranker로 재정렬 (선택적)
+        2. 경량 1단계 점수로 레벨별 N개로 축소 → Reranker로 재정렬 (선택적)
         3. 쿼리별 최근 문법 제외
         4. grade 정렬 후 실행 횟수 기반 랜덤 샘플링 (매번 다른 결과)
         """
         if level not in self.retrievers:
             return []
         
-        # 쿼리별 실행 횟수 추적
-        if query not in self.query_call_count:
-            self.query_call_count[query] = 0
-        self.query_call_count[query] += 1
-        
-        # 실행 횟수 기반 시드 생성 (매번 다른 결과)
-        import hashlib
-        seed_key = f"{query}:{self.query_call_count[query]}"
-        seed = int(hashlib.md5(seed_key.encode()).hexdigest(), 16) & 0xFFFFFFFF
-        random.seed(seed)
+        # 쿼리별 실행 횟수 기반 시드의 요청 전용 RNG (매번 다른 결과, 병렬 브랜치와 상태 공유 없음)
+        rng = request_rng(query, self.query_call_count.increment(query))
         
         # 1단계: 앙상블로 넓게 후보 수집
         docs = self.retrievers[level].get_relevant_documents(query)
@@ -158,22 +185,20 @@ class GrammarRetriever:
         
         # 2단계: Reranker로 재정렬 (선택적, 쿼리-문법 관련성 향상)
         if self.use_reranker and self.reranker and len(docs) > 20:
-            docs = self.reranker.rerank(query, docs, top_k=30)
+            docs = self._rerank(query, docs, level)
         
         # 3단계: 쿼리별 최근 문법 제외 (중복 방지)
-        from collections import deque
-        if query not in self.query_recent_grammar:
-            self.query_recent_grammar[query] = deque(maxlen=50)  # 쿼리별 최근 50개
-        
-        recent_grammar = set(self.query_recent_grammar[query])  # 빠른 검색을 위해 set 변환
+        recent_key = f"grammar:q:{query}"
+        session = self.recency_store.session([recent_key])  # 요청당 읽기 1회
+        recent_grammar = session.recent(recent_key)  # 쿼리별 최근 50개
         docs = [d for d in docs if d.metadata.get('grammar', '') not in recent_grammar]
         
         if not docs:
             # 최근 문법이 너무 많으면 캐시 초기화
-            self.query_recent_grammar[query] = deque(maxlen=50)
+            session.clear(recent_key)
             docs = self.retrievers[level].get_relevant_documents(query)
             if self.use_reranker and self.reranker and len(docs) > 20:
-                docs = self.reranker.rerank(query, docs, top_k=30)
+                docs = self._rerank(query, docs, level)
         
         # 4단계: grade로 정렬
         docs.sort(key=lambda x: x.metadata.get('grade', 999))
@@ -181,12 +206,11 @@ class GrammarRetriever:
         # 5단계: 상위 후보 중 실행 횟수 기반 랜덤 샘플링 (매번 다른 결과)
         top_candidates = docs[:50]
         sample_size = min(k, len(top_candidates))
-        picked = random.sample(top_candidates, sample_size) if len(top_candidates) >= sample_size else top_candidates
+        picked = rng.sample(top_candidates, sample_size) if len(top_candidates) >= sample_size else top_candidates
         
         # 쿼리별 최근 문법 캐시 업데이트
-        for d in picked:
-            grammar = d.metadata.get('grammar', '')
-            if grammar:
-                self.query_recent_grammar[query].append(grammar)  # deque는 자동으로 maxlen 처리
+        grammars = [d.metadata.get('grammar', '') for d in picked if d.metadata.get('grammar', '')]
+        session.add(recent_key, grammars, self.RECENT_QUERY_SIZE)  # 오래된 항목은 보관 수 초과 시 자동 제거
+        session.commit()  # 초기화 + 추가를 한 번에 기록
         
         return picked
\ No newline at end of file
@@ -0,0 +1,60 @@
+"""
+FAISS 인덱스 디스크 캐시
+데이터 파일 내용 해시 + 임베딩 모델명으로 캐시 키를 만들고,
+키가 같으면 저장된 인덱스를 그대로 로드 (재임베딩 없음)
+"""
+import os
+import hashlib
+from typing import Iterable, List, Optional
+from langchain.schema import Document
+from langchain.vectorstores import FAISS
+
+
+def compute_data_hash(paths: Iterable[str], embedding_model: str = "") -> str:
+    """
+    데이터 파일 내용과 임베딩 모델명으로 캐시 키 생성
+    파일 경로가 아니라 내용 기준이므로 데이터가 바뀔 때만 키가 바뀐다.
+    """
+    h = hashlib.sha256()
+    h.update(f"model={embedding_model}\n".encode("utf-8"))
+    for path in sorted(paths):
+        h.update(f"file={os.path.basename(path)}\n".encode("utf-8"))
+        try:
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    h.update(chunk)
+        except OSError:
+            h.update(b"<missing>")
+    return h.hexdigest()[:16]
+
+
+def embedding_model_name(embeddings) -> str:
+    """임베딩 객체에서 모델명 추출 (캐시 키용)"""
+    return getattr(embeddings, "model", "") or getattr(embeddings, "model_name", "") or type(embeddings).__name__
+
+
+def load_or_build_faiss(documents: List[Document], embeddings, cache_path: Optional[str]) -> FAISS:
+    """
+    캐시 경로에 인덱스가 있으면 로드, 없으면 새로 임베딩하여 생성 후 저장
+    cache_path가 None이면 캐시 없이 매번 생성
+    """
+    if cache_path and os.path.exists(os.path.join(cache_path, "index.faiss")):
+        try:
+            vectorstore = FAISS.load_local(
+                cache_path, embeddings, allow_dangerous_deserialization=True
+            )
+            # 문서 수가 다르면 손상된 캐시로 보고 재생성
+            if vectorstore.index.ntotal == len(documents):
+                return vectorstore
+            print(f"   ⚠️ 인덱스 캐시 문서 수 불일치, 재생성: {cache_path}")
+        except Exception as e:
+            print(f"   ⚠️ 인덱스 캐시 로드 실패, 재생성: {e}")
+
+    vectorstore = FAISS.from_documents(documents, embeddings)
+    if cache_path:
+        try:
+            os.makedirs(cache_path, exist_ok=True)
+            vectorstore.save_local(cache_path)
+        except Exception as e:
+            print(f"   ⚠️ 인덱스 캐시 저장 실패: {e}")
+    return vectorstore
@@ -0,0 +1,191 @@
+"""
+K-pop 메타데이터 비트맵 필터 엔진
+문서 id(= kpop_data 위치)를 비트 위치로 하는 파이썬 정수 비트셋으로 필드 값마다 posting을 만들어 두고
+kpop_filters 조합을 비트 연산(필드 내 OR, 필드 간 AND)으로 평가한다.
+매칭 문서와 필드별 매칭 사유를 한 번에 반환하므로 문서별 재검증/사유 재계산이 필요 없다.
+"""
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Set
+from langchain.schema import Document
+
+# kpop_filters 키 → 필드명
+FILTER_FIELDS = {
+    "groups": "group",
+    "members": "member",
+    "member_roles": "role",
+    "agencies": "agency",
+    "fandoms": "fandom",
+    "concepts": "concept",
+    "debut_year": "debut_year",
+    "group_type": "group_type",
+}
+
+# 로그 출력용 필드 라벨
+FIELD_LABELS = {
+    "group": "그룹",
+    "member": "멤버",
+    "role": "역할",
+    "agency": "소속사",
+    "fandom": "팬덤",
+    "concept": "컨셉",
+    "debut_year": "데뷔",
+    "group_type": "타입",
+}
+
+# 부분 문자열로 매칭하는 필드 (예: "YG" → "YG Entertainment")
+SUBSTRING_FIELDS = {"agency", "fandom"}
+
+
+def parse_debut_year(debut: str) -> Optional[int]:
+    if debut and len(debut) >= 4:
+        try:
+            return int(debut[:4])
+        except ValueError:
+            return None
+    return None
+
+
+def iter_bits(mask: int) -> Iterable[int]:
+    """비트셋의 켜진 위치 (오름차순)"""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def mask_has(mask: int, doc_id: Optional[int]) -> bool:
+    """비트셋에 문서 id 포함 여부 (doc_id가 없거나 음수인 문서는 항상 제외)"""
+    return isinstance(doc_id, int) and doc_id >= 0 and bool(mask >> doc_id & 1)
+
+
+@dataclass
+class FilterResult:
+    """필터 평가 결과: 매칭 문서 비트셋 + 필드별 매칭된 필터 값"""
+    mask: int
+    reasons: Dict[str, List[str]] = field(default_factory=dict)  # 필드 → 매칭 문서와 겹친 값 (DB 표기)
+
+    def ids(self) -> List[int]:
+        return list(iter_bits(self.mask))
+
+    def __contains__(self, doc_id: int) -> bool:
+        return mask_has(self.mask, doc_id)
+
+    def __bool__(self) -> bool:
+        return self.mask != 0
+
+    def __len__(self) -> int:
+        return bin(self.mask).count("1")
+
+    def reason_strings(self) -> List[str]:
+        """"그룹: BLACKPINK" 형태의 로그 문자열"""
+        out = []
+        for f, values in self.reasons.items():
+            for v in values:
+                out.append(f"{FIELD_LABELS[f]}: {v}년" if f == "debut_year" else f"{FIELD_LABELS[f]}: {v}")
+        return out
+
+
+class KpopFilterEngine:
+    """
+    필드별 posting 비트맵
+    - 키: 정규화된 값 (소문자, 데뷔 연도는 int)
+    - 값: 해당 값을 가진 문서 id 비트셋
+    """
+    def __init__(self, docs: List[Document]):
+        self.num_docs = len(docs)
+        self.universe = (1 << self.num_docs) - 1
+        self.postings: Dict[str, Dict[Any, int]] = {f: {} for f in FILTER_FIELDS.values()}
+        self.display: Dict[str, Dict[Any, str]] = {f: {} for f in FILTER_FIELDS.values()}  # 키 → DB 표기
+        for doc_id, doc in enumerate(docs):
+            self._index_document(doc_id, doc.metadata)
+
+    def _add(self, f: str, value, doc_id: int):
+        if value is None or value == "":
+            return
+        key = value if isinstance(value, int) else str(value).strip().lower()
+        self.postings[f][key] = self.postings[f].get(key, 0) | (1 << doc_id)
+        self.display[f].setdefault(key, str(value).strip())
+
+    def _index_document(self, doc_id: int, meta: Dict):
+        self._add("group", meta.get("group", ""), doc_id)
+        for m in meta.get("members", []) or []:
+            if not isinstance(m, dict):
+                continue
+            self._add("member", m.get("name", ""), doc_id)
+            self._add("role", m.get("role", ""), doc_id)
+            self._add("debut_year", parse_debut_year(m.get("debut", "")), doc_id)
+        self._add("agency", meta.get("agency", ""), doc_id)
+        self._add("fandom", meta.get("fandom", ""), doc_id)
+        for c in meta.get("concepts", []) or []:
+            if isinstance(c, str):
+                self._add("concept", c, doc_id)
+        self._add("group_type", meta.get("group_type"), doc_id)
+
+    def value_mask(self, f: str, value) -> Dict[Any, int]:
+        """필터 값 하나에 매칭되는 posting 키 → 비트셋 (부분 문자열 필드는 여러 키 가능)"""
+        postings = self.postings.get(f, {})
+        if f == "debut_year":
+            try:
+                key = int(value)
+            except (TypeError, ValueError):
+                return {}
+            return {key: postings[key]} if key in postings else {}
+        key = str(value).strip().lower()
+        if not key:
+            return {}
+        if f in SUBSTRING_FIELDS:
+            return {k: bits for k, bits in postings.items() if key in k}
+        return {key: postings[key]} if key in postings else {}
+
+    def lookup(self, f: str, value) -> int:
+        mask = 0
+        for bits in self.value_mask(f, value).values():
+            mask |= bits
+        return mask
+
+    def evaluate(self, kpop_filters: Dict, within: Optional[int] = None) -> Optional[FilterResult]:
+        """
+        kpop_filters 평가 (필드 간 AND, 필드 내 값 OR)
+        within: 후보 문서 비트셋 (검색 결과 등)으로 범위 제한
+        활성 필터가 없으면 None
+        """
+        mask = self.universe if within is None else within & self.universe
+        matched_keys: Dict[str, Dict[Any, int]] = {}
+        for spec_key, f in FILTER_FIELDS.items():
+            values = (kpop_filters or {}).get(spec_key)
+            if not values:
+                continue
+            if not isinstance(values, (list, tuple, set)):
+                values = [values]
+            keys: Dict[Any, int] = {}
+            for v in values:
+                if v:
+                    keys.update(self.value_mask(f, v))
+            field_mask = 0
+            for bits in keys.values():
+                field_mask |= bits
+            mask &= field_mask
+            matched_keys[f] = keys
+        if not matched_keys:
+            return None
+
+        # 최종 매칭 문서와 겹치는 키만 사유로 남김 (문서 재검증 없이 posting 비트 연산)
+        reasons = {
+            f: [self.display[f][k] for k, bits in keys.items() if bits & mask]
+            for f, keys in matched_keys.items()
+        }
+        return FilterResult(mask, {f: v for f, v in reasons.items() if v})
+
+    def mask_of(self, doc_ids: Iterable[int]) -> int:
+        mask = 0
+        for i in doc_ids:
+            if i is not None and 0 <= i < self.num_docs:
+                mask |= 1 << i
+        return mask
+
+    def describe(self, mask: int) -> Dict[str, Set[str]]:
+        """비트셋에 포함된 문서들의 필드별 값 (반환 결과 요약 로그용, 서로 다른 값 수에 비례)"""
+        return {
+            f: {self.display[f][k] for k, bits in postings.items() if bits & mask}
+            for f, postings in self.postings.items()
+        }
@@ -1,29 +1,70 @@
+import os
+import json
+import random
+import hashlib
 from typing import List, Dict, Tuple, Optional
 import numpy as np
-from langchain.embeddings import OpenAIEmbeddings
 from langchain.schema import Document
 from langchain.vectorstores import FAISS
+from Retriever.embeddings import get_embeddings
+from Retriever.lru_cache import LRUCache
+from Retriever.gazetteer import KpopGazetteer
+from Retriever.kpop_filter import KpopFilterEngine, FilterResult, iter_bits, mask_has
+from Retriever.index_cache import compute_data_hash, embedding_model_name
+from utils import normalize_group_type
+from Retriever.bundle import (
+    component_dir, save_faiss, load_faiss, documents_from_faiss, read_component_manifest,
+    embedding_info, check_embeddings, BundleMismatchError,
+)
 
 class KpopSentenceRetriever:
     """
     - 멀티링구얼 임베딩 사용
-    - 그룹명 전용 인덱스(group_name_index)로 타깃 그룹 선별
+    - 그룹명 전용 인덱스(정규화된 float32 행렬)로 타깃 그룹 선별
+    - 개체 사전(gazetteer)으로 질의 속 그룹/멤버/소속사/팬덤/컨셉 언급을 한 번에 탐지
+    - 메타데이터 비트맵 필터 엔진으로 kpop_filters를 비트 연산으로 평가
     """
     def __init__(self, json_path: str, embedding_model: str = "text-embedding-3-large",
-                 group_match_topk: int = 1, group_match_threshold: float = 0.75):
+                 group_match_topk: int = 1, group_match_threshold: float = 0.75,
+                 bundle_dir: Optional[str] = None,
+                 query_cache_size: int = 2048, query_cache_ttl: Optional[float] = 3600):
         self.json_path = json_path
+        self.bundle_dir = bundle_dir  # 오프라인 빌드 번들 (있으면 임베딩 호출 없이 로드)
         self.kpop_data: List[Document] = []
         self.retriever = None
-
-        # 임베딩 객체
-        self.embeddings = OpenAIEmbeddings(model=embedding_model)
-        self._load_data()
-        self._create_retriever()
+        self.vectorstore = None
+        self.embedding_model = embedding_model
 
         # 그룹명 전용 임베딩 인덱스 
-        self.group_name_index: Dict[str, np.ndarray] = {}
+        # 행 = 그룹명(별칭 포함 가능), 열 = 임베딩 차원, 각 행은 L2 정규화
+        self.group_names: List[str] = []  # 그룹 인덱스 → 그룹명
+        self.group_name_matrix = np.zeros((0, 0), dtype=np.float32)
+        self.group_row_ids = np.zeros(0, dtype=np.int64)  # 행 → 그룹 인덱스
         self.group_match_topk = group_match_topk
         self.group_match_threshold = group_match_threshold
+        self.gazetteer = KpopGazetteer()
+        self.data_fingerprint = ""  # 로드된 K-pop 데이터 내용 해시 (분석 결과 캐시 무효화용)
+        # 메타데이터 필터 엔진 (문서 id = kpop_data 위치 = FAISS 인덱스 순서)
+        self.filter_engine = KpopFilterEngine([])
+        self.group_types: Dict[str, Optional[str]] = {}  # 소문자 그룹명 → girl_group / boy_group
+        # 필터 검색용 문서 벡터 행렬 (FAISS 인덱스에서 복원, 행마다 L2 정규화)
+        self.doc_matrix: Optional[np.ndarray] = None
+
+        # 쿼리 텍스트 → 임베딩 벡터 LRU (한 요청 안의 반복 임베딩 + 인기 쿼리 재사용)
+        self.query_embedding_cache = LRUCache(maxsize=query_cache_size, ttl_seconds=query_cache_ttl)
+
+        if bundle_dir:
+            self._load_from_bundle(bundle_dir)
+            return
+
+        # 임베딩 객체
+        self.embeddings = get_embeddings(embedding_model)
+        self._load_data()
+        self.gazetteer = KpopGazetteer.from_documents(self.kpop_data)
+        self._build_filter_engine()
+        self._build_group_types()
+        self.data_fingerprint = self._compute_data_fingerprint()
+        self._create_retriever()
         self._build_group_name_index()
 
     def _load_data(self):
@@ -38,6 +79,7 @@ class KpopSentenceRetriever:
                 group = item.get("group", "")
                 if not group:
                     continue
+                group_type = normalize_group_type(item.get("group_type"))
                 agency  = item.get("agency", "")
                 fandom  = item.get("fandom", "")
                 concepts = item.get("concepts", [])
@@ -47,7 +89,8 @@ class KpopSentenceRetriever:
                 member_info_list = [{
                     "name": m.get("name",""),
                     "role": m.get("role",""),
-                    "debut": m.get("debut","")
+                    "debut": m.get("debut",""),
+                    "aliases": m.get("aliases", [])
                 } for m in members]
                 member_names = [m["name"] for m in member_info_list]
 
@@ -73,13 +116,18 @@ class KpopSentenceRetriever:
                     page_content="\n".join(content),
                     metadata={
                         "source": self.json_path,
+                        "doc_id": len(self.kpop_data),
                         "group": group,
+                        "group_type": group_type,
                         "agency": agency,
                         "fandom": fandom,
                         "concepts": concepts,
                         "debut": debut,
                         "members": member_info_list,
                         "member_names": member_names,
+                        "aliases": item.get("aliases", []),
+                        "agency_aliases": item.get("agency_aliases", []),
+                        "fandom_aliases": item.get("fandom_aliases", []),
                     }
                 )
                 self.kpop_data.append(doc)
@@ -88,91 +136,263 @@ class KpopSentenceRetriever:
             print(f"   ❌ K-pop 데이터 로드 실패 ({self.json_path}): {e}")
             self.kpop_data = []
 
+    def _build_filter_engine(self):
+        """
+        로드 시 한 번 메타데이터 비트맵 구축
+        필터링 시 문서마다 소문자 변환/데뷔 연도 파싱을 반복하지 않고 비트 연산만 수행
+        """
+        for doc_id, doc in enumerate(self.kpop_data):
+            doc.metadata.setdefault("doc_id", doc_id)  # 이전 번들 호환
+        self.filter_engine = KpopFilterEngine(self.kpop_data)
+
+    def _build_group_types(self):
+        """
+        그룹명 → 그룹 타입 맵 (원본 JSON 로드/번들 로드 공통)
+        group_type 메타데이터가 없는 이전 번들 문서는 원본 kpop_db.json 값으로 보충
+        """
+        self.group_types = {
+            (d.metadata.get("group", "") or "").strip().lower(): normalize_group_type(d.metadata.get("group_type"))
+            for d in self.kpop_data
+        }
+        missing = [g for g, t in self.group_types.items() if t is None]
+        if not missing or not self.json_path or not os.path.exists(self.json_path):
+            return
+        try:
+            with open(self.json_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            for item in data if isinstance(data, list) else [data]:
+                group = (item.get("group", "") or "").strip().lower()
+                if group in missing:
+                    self.group_types[group] = normalize_group_type(item.get("group_type"))
+        except Exception as e:
+            print(f"   ⚠️ 그룹 타입 보충 실패 ({self.json_path}): {e}")
+
+    def get_group_type(self, group_name: str) -> Optional[str]:
+        """그룹 타입 조회 (girl_group / boy_group / None), 대소문자 무관"""
+        return self.group_types.get((group_name or "").strip().lower())
+
+    def filter_docs(self, kpop_filters: Dict, within: Optional[int] = None) -> Optional[FilterResult]:
+        """kpop_filters 평가 결과 (매칭 문서 비트셋 + 필드별 사유), 활성 필터가 없으면 None"""
+        return self.filter_engine.evaluate(kpop_filters, within=within)
+
+    def docs_for(self, mask: int) -> List[Document]:
+        """비트셋의 문서들 (문서 id 순)"""
+        return [self.kpop_data[i] for i in iter_bits(mask)]
+
+    def _compute_data_fingerprint(self) -> str:
+        """문서 내용 + 메타데이터 해시 (원본 JSON 로드/번들 로드 모두 같은 값)"""
+        h = hashlib.sha256()
+        for doc in self.kpop_data:
+            meta = {k: v for k, v in doc.metadata.items() if k != "source"}
+            h.update(doc.page_content.encode("utf-8"))
+            h.update(json.dumps(meta, ensure_ascii=False, sort_keys=True).encode("utf-8"))
+        return h.hexdigest()[:16]
+
     def _create_retriever(self):
         if not self.kpop_data:
             print("   ⚠️ K-pop 데이터가 없어 retriever를 생성할 수 없습니다.")
             return
         try:
-            vectorstore = FAISS.from_documents(self.kpop_data, self.embeddings)
-            self.retriever = vectorstore.as_retriever(search_kwargs={"k": 30})
+            self.vectorstore = FAISS.from_documents(self.kpop_data, self.embeddings)
+            self.retriever = self.vectorstore.as_retriever(search_kwargs={"k": 30})
+            self._build_doc_matrix()
             print("   ✅ K-pop retriever 생성 완료")
         except Exception as e:
             print(f"   ❌ K-pop retriever 생성 실패: {e}")
             self.retriever = None
 
+    def _build_doc_matrix(self):
+        """
+        FAISS 인덱스의 문서 벡터를 그대로 복원해 정규화 행렬로 보관 (추가 임베딩 호출 없음)
+        필터가 있는 검색은 허용된 행만 골라 내적 한 번으로 점수 계산
+        """
+        try:
+            index = self.vectorstore.index
+            vectors = index.reconstruct_n(0, index.ntotal).astype(np.float32)
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            self.doc_matrix = np.ascontiguousarray(vectors / norms)
+        except Exception as e:
+            # 복원 불가 인덱스 → 필터 검색은 전체 순위 검색 후 필터링으로 대체
+            print(f"   ⚠️ K-pop 문서 벡터 복원 실패 (필터 검색은 전체 검색으로 대체): {e}")
+            self.doc_matrix = None
+
     def _build_group_name_index(self):
         """
-        각 그룹명(영문)만 따로 임베딩해두는 소형 인덱스.
-        한국어 질의도 같은 임베딩 공간에서 유사도 비교가 가능하므로
-        별칭/하드코딩 없이 매칭된다.
+        각 그룹명(영문)과 별칭(한글 등)을 따로 임베딩해두는 소형 인덱스.
+        별칭은 같은 그룹 인덱스를 가리키는 추가 행으로 들어가므로
+        사전에 없는 표기(오타, 띄어쓰기 차이)도 임베딩 유사도로 매칭된다.
         """
         try:
             names = [d.metadata["group"] for d in self.kpop_data]
-            vecs = self.embeddings.embed_documents(names)  # List[List[float]]
-            self.group_name_index = {
-                name: np.array(vec, dtype=np.float32) for name, vec in zip(names, vecs)
-            }
-            print(f"   ✅ 그룹명 인덱스 구축 완료: {len(self.group_name_index)}개")
+            rows, row_ids = [], []
+            for gid, name in enumerate(names):
+                for surface in dict.fromkeys([name, *self.gazetteer.aliases_of("group", name)]):
+                    rows.append(surface)
+                    row_ids.append(gid)
+            vecs = self.embeddings.embed_documents(rows)  # List[List[float]]
+            self._set_group_name_index(names, np.asarray(vecs, dtype=np.float32), np.asarray(row_ids))
+            print(f"   ✅ 그룹명 인덱스 구축 완료: {len(self.group_names)}개")
         except Exception as e:
             print(f"   ❌ 그룹명 인덱스 구축 실패: {e}")
-            self.group_name_index = {}
+            self._set_group_name_index([], np.zeros((0, 0), dtype=np.float32), np.zeros(0, dtype=np.int64))
+
+    def _set_group_name_index(self, names: List[str], vectors: np.ndarray, row_ids: np.ndarray):
+        """그룹명 행렬 설정: 행마다 미리 L2 정규화해 두어 매칭 시 내적 한 번으로 코사인 유사도 계산"""
+        if len(vectors):
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            vectors = vectors / norms
+        self.group_names = list(names)
+        self.group_name_matrix = np.ascontiguousarray(vectors, dtype=np.float32)
+        self.group_row_ids = np.asarray(row_ids, dtype=np.int64)
+
+    def export_to_bundle(self, bundle_dir: str) -> Dict:
+        """K-pop FAISS 인덱스와 그룹명 인덱스를 번들에 저장하고 manifest 항목 반환"""
+        kpop_dir = component_dir(bundle_dir, "kpop")
+        if self.vectorstore is not None:
+            save_faiss(self.vectorstore, kpop_dir)
+        os.makedirs(kpop_dir, exist_ok=True)
+        with open(os.path.join(kpop_dir, "group_names.json"), "w", encoding="utf-8") as f:
+            json.dump(self.group_names, f, ensure_ascii=False)
+        np.save(os.path.join(kpop_dir, "group_name_vectors.npy"), self.group_name_matrix)
+        np.save(os.path.join(kpop_dir, "group_row_ids.npy"), self.group_row_ids)
+        model = embedding_model_name(self.embeddings)
+        return {
+            **embedding_info(self.embeddings, self.vectorstore),
+            "data_hash": compute_data_hash([self.json_path], model),
+            "num_documents": len(self.kpop_data),
+            "num_group_names": len(self.group_names),
+        }
+
+    def _load_from_bundle(self, bundle_dir: str):
+        """번들에서 K-pop 문서/인덱스/그룹명 인덱스 로드 (임베딩 호출 없음)"""
+        info = read_component_manifest(bundle_dir, "kpop")
+        self.embedding_model = info["embedding_model"]
+        self.embeddings = get_embeddings(self.embedding_model, info.get("embedding_dimensions"), exact=True)
+        kpop_dir = component_dir(bundle_dir, "kpop")
+        try:
+            self.vectorstore = load_faiss(kpop_dir, self.embeddings)
+            check_embeddings(info, self.embeddings, self.vectorstore, "kpop")
+            self.retriever = self.vectorstore.as_retriever(search_kwargs={"k": 30})
+            self.kpop_data = documents_from_faiss(self.vectorstore)
+            self._build_filter_engine()  # 비트맵은 번들에 저장하지 않고 복원한 문서로 재구축
+            self._build_group_types()
+            self.data_fingerprint = self._compute_data_fingerprint()
+            self._build_doc_matrix()
+            self.gazetteer = KpopGazetteer.from_documents(self.kpop_data)
+
+            with open(os.path.join(kpop_dir, "group_names.json"), "r", encoding="utf-8") as f:
+                names = json.load(f)
+            vectors = np.load(os.path.join(kpop_dir, "group_name_vectors.npy"))
+            if vectors.size and vectors.shape[1] != self.vectorstore.index.d:
+                raise BundleMismatchError(
+                    f"kpop: 그룹명 벡터 차원 {vectors.shape[1]} ≠ 인덱스 차원 {self.vectorstore.index.d}"
+                )
+            row_ids = np.load(os.path.join(kpop_dir, "group_row_ids.npy"))
+            self._set_group_name_index(names, vectors, row_ids)
+            print(f"   ✅ K-pop 번들 로드 완료: {len(self.kpop_data)}개 그룹")
+        except BundleMismatchError:
+            raise  # 모델/차원 불일치는 빈 리트리버로 조용히 넘기지 않음
+        except Exception as e:
+            print(f"   ❌ K-pop 번들 로드 실패 ({bundle_dir}): {e}")
+            self.kpop_data = []
+            self.retriever = None
+            self._build_filter_engine()
+            self._build_group_types()
+            self._set_group_name_index([], np.zeros((0, 0), dtype=np.float32), np.zeros(0, dtype=np.int64))
 
-    def _cosine_sim(self, a: np.ndarray, b: np.ndarray) -> float:
-        denom = (np.linalg.norm(a) * np.linalg.norm(b))
-        if denom == 0:
-            return 0.0
-        return float(np.dot(a, b) / denom)
+    def match_groups(self, query_vector: np.ndarray, top_k: int = 5) -> Tuple[List[str], np.ndarray]:
+        """
+        질의 벡터와 모든 그룹명 행의 코사인 유사도를 행렬-벡터 곱 한 번으로 계산
+        별칭 행은 그룹별 최대값으로 합친 뒤 argpartition으로 상위 k개만 정렬
+        Returns: (그룹명 리스트, 유사도 배열) - 유사도 내림차순
+        """
+        if not self.group_names:
+            return [], np.zeros(0, dtype=np.float32)
+        qv = np.asarray(query_vector, dtype=np.float32)
+        norm = np.linalg.norm(qv)
+        if norm == 0:
+            return [], np.zeros(0, dtype=np.float32)
+        row_scores = self.group_name_matrix @ (qv / norm)
+
+        group_scores = np.full(len(self.group_names), -np.inf, dtype=np.float32)
+        np.maximum.at(group_scores, self.group_row_ids, row_scores)
+
+        k = min(top_k, len(group_scores))
+        top = np.argpartition(-group_scores, k - 1)[:k]
+        top = top[np.argsort(-group_scores[top])]
+        return [self.group_names[i] for i in top], group_scores[top]
 
-    def _match_groups_by_query(self, query: str) -> List[Tuple[str, float]]:
+    def _embed_query(self, text: str) -> np.ndarray:
+        """쿼리 임베딩 (메모리 LRU 우선, 없으면 임베딩 후 저장)"""
+        return self.query_embedding_cache.get_or_compute(
+            text, lambda: np.asarray(self.embeddings.embed_query(text), dtype=np.float32)
+        )
+
+    def _match_groups_by_query(self, query: str, top_k: int = 5) -> List[Tuple[str, float]]:
         """
-        질의 임베딩과 그룹명 임베딩을 비교해 유사도 순으로 정렬 반환
-        한글 그룹명도 더 잘 인식하도록 개선
+        질의에서 타깃 그룹 후보를 유사도 순으로 상위 top_k개 반환
+        1) 개체 사전에 그룹명/별칭이 그대로 있으면 점수 1.0으로 확정 (임베딩 호출 없음)
+        2) 없으면 질의 임베딩과 그룹명 임베딩을 비교
         """
-        if not self.group_name_index:
+        if not self.group_names:
             return []
         try:
-            # 쿼리에서 그룹명 관련 부분만 추출 시도
-            query_for_matching = query
-            
-            # 한글 그룹명 패턴 감지 (방탄소년단, 블랙핑크, 트와이스 등)
-            import re
-            korean_group_patterns = [
-                r'방탄소년단', r'블랙핑크', r'트와이스', r'아이브', r'뉴진스',
-                r'르세라핌', r'에스파', r'세븐틴', r'스트레이키즈', r'엑소',
-                r'레드벨벳', r'아이들', r'있지', r'에이핑크', r'마마무'
-            ]
-            
-            for pattern in korean_group_patterns:
-                if re.search(pattern, query):
-                    # 패턴이 발견되면 해당 부분만 사용
-                    match = re.search(pattern, query)
-                    if match:
-                        query_for_matching = match.group(0)
-                        break
-            
-            qv = np.array(self.embeddings.embed_query(query_for_matching), dtype=np.float32)
-            scored = []
-            for name, vec in self.group_name_index.items():
-                sim = self._cosine_sim(qv, vec)
-                scored.append((name, sim))
-            scored.sort(key=lambda x: x[1], reverse=True)
-            return scored
+            exact = self.gazetteer.find_groups(query)
+            if exact:
+                return [(name, 1.0) for name in exact[:top_k]]
+
+            qv = self._embed_query(query)
+            names, scores = self.match_groups(qv, top_k=top_k)
+            return [(name, float(score)) for name, score in zip(names, scores)]
         except Exception:
             return []
 
-    def invoke(self, query: str, level: str = None) -> List[Document]:
+    def search_within(self, query: str, mask: int, k: int = 30) -> List[Document]:
+        """
+        허용된 문서(비트셋)만 대상으로 벡터 검색 (필터 pushdown)
+        허용 행만 골라 코사인 유사도를 계산하므로 상위 k 창 밖의 유효 문서를 잃지 않는다.
+        """
+        ids = np.fromiter(iter_bits(mask), dtype=np.int64)
+        if not len(ids):
+            return []
+        qv = self._embed_query(query)
+        if self.doc_matrix is None or len(self.doc_matrix) != len(self.kpop_data):
+            # 행렬이 없으면 전체 문서를 순위 매긴 뒤 허용 문서만 남김
+            results = self.vectorstore.similarity_search_by_vector(qv.tolist(), k=len(self.kpop_data))
+            return [d for d in results if mask_has(mask, d.metadata.get("doc_id"))][:k]
+        norm = np.linalg.norm(qv)
+        scores = self.doc_matrix[ids] @ (qv / norm if norm else qv)
+        k = min(k, len(ids))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [self.kpop_data[i] for i in ids[top]]
+
+    def invoke(self, query: str, level: str = None, filters: Optional[Dict] = None,
+               seed: Optional[int] = None) -> List[Document]:
         """
         질의 -> 그룹명 임베딩 매칭으로 타깃 그룹 선별
         임계치 이상이면 해당 그룹 문서만 반환
         실패시 일반 FAISS 검색 + 상위 20 랜덤 10 
+        filters(kpop_filters)가 있으면 조건을 만족하는 문서만 점수 계산 후 같은 방식으로 샘플링
+        seed: 샘플링 시드 (지정하면 재현 가능, 없으면 매번 다름) - 전역 random 상태는 사용하지 않음
         """
-        import random
+        rng = random.Random(seed)
 
         if not self.retriever:
             print("   ⚠️ Retriever가 초기화되지 않았습니다.")
             return []
 
         try:
+            # 필터 pushdown: 허용 문서 집합을 먼저 구하고 그 안에서만 검색
+            filter_result = self.filter_docs(filters) if filters else None
+            if filter_result is not None:
+                results = self.search_within(query, filter_result.mask, k=30)
+                if len(results) > 10:
+                    return rng.sample(results[:20], 10)
+                return results
+
             # 그룹명 매칭 시도
             ranked = self._match_groups_by_query(query)
             selected_groups = []
@@ -189,15 +409,15 @@ class KpopSentenceRetriever:
             # 타깃 그룹이 있으면 그 문서만 반환
             if selected_groups:
                 filtered = [d for d in self.kpop_data if d.metadata.get("group") in selected_groups]
-                random.shuffle(filtered)
+                rng.shuffle(filtered)
                 return filtered[:10]
 
             # 매칭 실패 → 일반 벡터 검색 폴백(상위 20 중 랜덤 10)
-            results = self.retriever.get_relevant_documents(query)
+            results = self.vectorstore.similarity_search_by_vector(self._embed_query(query).tolist(), k=30)
             if len(results) > 10:
-                return random.sample(results[:20], 10)
+                return rng.sample(results[:20], 10)
             return results
 
         except Exception as e:
             print(f"   ❌ K-pop 검색 실패: {e}")
-            return []
\ No newline at end of file
+            return []
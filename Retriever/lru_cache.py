@@ -0,0 +1,91 @@
+"""
+스레드 안전 LRU 캐시 (크기 제한 + TTL + 적중률 통계)
+쿼리 임베딩, 분석 결과, reranker 점수 등 반복 계산 결과 캐싱에 공통 사용
+"""
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+_MISSING = object()
+
+
+class LRUCache:
+    """
+    크기 제한 LRU 캐시
+    - maxsize: 최대 항목 수 (초과 시 가장 오래 사용하지 않은 항목 제거)
+    - ttl_seconds: 항목 유효 시간 (None 또는 0이면 만료 없음)
+    """
+    def __init__(self, maxsize: int = 1024, ttl_seconds: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds or None
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()  # key -> (value, 저장 시각)
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is _MISSING:
+                self.stats["misses"] += 1
+                return default
+            value, stored_at = item
+            if self.ttl_seconds and time.monotonic() - stored_at > self.ttl_seconds:
+                del self._data[key]
+                self.stats["expirations"] += 1
+                self.stats["misses"] += 1
+                return default
+            self._data.move_to_end(key)
+            self.stats["hits"] += 1
+            return value
+
+    def put(self, key: Hashable, value: Any, age_seconds: float = 0.0):
+        """age_seconds: 이미 지난 시간 (파일에서 복원한 항목이 원래 저장 시각 기준으로 만료되도록)"""
+        with self._lock:
+            self._data[key] = (value, time.monotonic() - age_seconds)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """캐시에 없으면 compute() 결과를 저장 후 반환 (compute는 락 밖에서 실행)"""
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        value = compute()
+        self.put(key, value)
+        return value
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.pop(key, _MISSING)
+        return default if item is _MISSING else item[0]
+
+    def items(self) -> List[Tuple[Hashable, Any]]:
+        """만료되지 않은 (key, value) 목록 - 오래된 것부터 (통계/순서 변경 없음)"""
+        now = time.monotonic()
+        with self._lock:
+            return [
+                (key, value) for key, (value, stored_at) in self._data.items()
+                if not self.ttl_seconds or now - stored_at <= self.ttl_seconds
+            ]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def hit_rate(self) -> float:
+        total = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / total if total else 0.0
+
+    def snapshot_stats(self) -> Dict[str, Any]:
+        """현재 통계 + 크기 + 적중률"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats["size"] = len(self._data)
+        stats["hit_rate"] = self.hit_rate()
+        return stats
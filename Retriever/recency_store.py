@@ -0,0 +1,384 @@
+"""
+최근 항목 저장소 (중복 방지용, 스레드 안전)
+키(쿼리)별로 최근 N개 항목을 보관해 검색 결과에서 최근에 나온 단어/문법을 제외한다.
+
+백엔드 (config.RECENCY_CONFIG['backend']):
+- memory: 프로세스 메모리 (링 버퍼 + 개수 카운터로 O(1) 포함 확인, 추적 키 수 LRU 제한)
+- sqlite: 로컬 sqlite 파일 (WAL) - 같은 머신의 여러 워커가 공유, 재시작 후에도 유지
+- kv: 키-값 서버 어댑터 (KeyValueClient 구현을 주입, 로컬 대체로 DictKeyValueClient)
+
+요청마다 session(keys)로 필요한 키를 한 번에 읽고, 변경 사항은 commit()으로 한 번에 기록
+→ 외부 백엔드도 요청당 읽기 1회 + 쓰기 1회
+"""
+import os
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict, deque
+from typing import Dict, FrozenSet, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+RECENCY_BACKENDS = ("memory", "sqlite", "kv")
+
+Additions = Dict[str, Tuple[List[str], int]]  # 키 → (추가 항목, 키별 최대 보관 수)
+
+
+def _merge(current: Sequence[str], items: Sequence[str], capacity: int) -> List[str]:
+    """기존 항목 뒤에 새 항목을 붙이고 최근 capacity개만 유지 (오래된 것부터)"""
+    merged = list(current) + list(items)
+    return merged[-capacity:] if capacity > 0 else merged
+
+
+class RecentWindow:
+    """
+    최근 capacity개 항목 (링 버퍼 + 항목별 개수)
+    같은 항목이 버퍼에 여러 번 있을 수 있으므로 set 대신 개수로 관리
+    (단독으로는 스레드 안전하지 않음 - InMemoryRecencyStore의 락 안에서 사용)
+    """
+    __slots__ = ("_ring", "_counts")
+
+    def __init__(self, capacity: int):
+        self._ring = deque(maxlen=max(1, capacity))
+        self._counts: Dict[Hashable, int] = {}
+
+    def add(self, item: Hashable):
+        ring = self._ring
+        if len(ring) == ring.maxlen:
+            oldest = ring[0]
+            remaining = self._counts[oldest] - 1
+            if remaining:
+                self._counts[oldest] = remaining
+            else:
+                del self._counts[oldest]
+        ring.append(item)
+        self._counts[item] = self._counts.get(item, 0) + 1
+
+    def __contains__(self, item: Hashable) -> bool:
+        return item in self._counts
+
+    def __len__(self) -> int:
+        return len(self._ring)
+
+    def items(self) -> List[Hashable]:
+        """오래된 것부터"""
+        return list(self._ring)
+
+
+class RecencySession:
+    """
+    요청 하나 동안의 최근 항목 뷰
+    생성 시 키들을 한 번에 읽고, add/clear는 모아 두었다가 commit()에서 한 번에 기록
+    """
+    def __init__(self, store: "RecencyStore", keys: Iterable[str]):
+        self._store = store
+        self._state: Dict[str, List[str]] = store.get_many(list(dict.fromkeys(keys)))
+        self._additions: Additions = {}
+        self._clears: List[str] = []
+
+    def recent(self, key: str) -> FrozenSet[str]:
+        """키의 최근 항목 집합 (이번 세션에서 추가/초기화한 내용 반영)"""
+        items = [] if key in self._clears else self._state.get(key, [])
+        added = self._additions.get(key)
+        return frozenset(items) | frozenset(added[0]) if added else frozenset(items)
+
+    def add(self, key: str, items: Iterable[str], capacity: int):
+        items = [i for i in items if i]
+        if not items:
+            return
+        pending, _ = self._additions.get(key, ([], capacity))
+        self._additions[key] = (pending + items, capacity)
+
+    def clear(self, key: str):
+        """키의 기록 초기화 (이미 추가 예정인 항목도 버림)"""
+        self._clears.append(key)
+        self._additions.pop(key, None)
+
+    def commit(self):
+        if self._additions or self._clears:
+            self._store.apply(self._additions, self._clears, base=self._state)
+            self._additions, self._clears = {}, []
+
+
+class RecencyStore:
+    """
+    최근 항목 저장소 인터페이스
+    - get_many(keys): 키 → 최근 항목 목록 (오래된 것부터, 없는 키는 생략)
+    - apply(additions, clears, base): clears 키 초기화 후 additions 항목 추가 (키별 capacity로 자름)
+      base는 같은 요청에서 get_many로 읽은 값 (원격 백엔드가 다시 읽지 않도록 전달)
+    """
+    def get_many(self, keys: List[str]) -> Dict[str, List[str]]:
+        raise NotImplementedError
+
+    def apply(self, additions: Additions, clears: Iterable[str] = (),
+              base: Optional[Dict[str, List[str]]] = None):
+        raise NotImplementedError
+
+    def session(self, keys: Iterable[str]) -> RecencySession:
+        return RecencySession(self, keys)
+
+    def snapshot(self, key: str) -> FrozenSet[str]:
+        return frozenset(self.get_many([key]).get(key, []))
+
+    def add(self, key: str, items: Iterable[str], capacity: int):
+        self.apply({key: (list(items), capacity)})
+
+    def clear(self, key: str):
+        self.apply({}, [key])
+
+
+class InMemoryRecencyStore(RecencyStore):
+    """
+    프로세스 메모리 저장소
+    - max_keys: 추적할 최대 키 수 (초과 시 가장 오래 사용하지 않은 키의 기록 제거)
+    LangGraph 병렬 검색 브랜치에서 동시에 갱신되므로 모든 연산은 락 안에서 수행
+    """
+    def __init__(self, max_keys: int = 10000):
+        self.max_keys = max(1, max_keys)
+        self._windows: "OrderedDict[str, RecentWindow]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"evicted_keys": 0}
+
+    def get_many(self, keys: List[str]) -> Dict[str, List[str]]:
+        found = {}
+        with self._lock:
+            for key in keys:
+                window = self._windows.get(key)
+                if window is not None:
+                    self._windows.move_to_end(key)
+                    found[key] = window.items()
+        return found
+
+    def contains(self, key: str, item: str) -> bool:
+        with self._lock:
+            window = self._windows.get(key)
+            return window is not None and item in window
+
+    def apply(self, additions: Additions, clears: Iterable[str] = (),
+              base: Optional[Dict[str, List[str]]] = None):
+        with self._lock:
+            for key in clears:
+                self._windows.pop(key, None)
+            for key, (items, capacity) in additions.items():
+                window = self._windows.get(key)
+                if window is None:
+                    window = self._windows[key] = RecentWindow(capacity)
+                else:
+                    self._windows.move_to_end(key)
+                for item in items:
+                    window.add(item)
+            while len(self._windows) > self.max_keys:
+                self._windows.popitem(last=False)
+                self.stats["evicted_keys"] += 1
+
+    def __len__(self) -> int:
+        return len(self._windows)
+
+
+class SQLiteRecencyStore(RecencyStore):
+    """
+    로컬 sqlite 파일 저장소 (WAL 모드, 같은 파일을 여러 워커 프로세스가 공유)
+    키별 항목 목록을 JSON 한 행으로 저장, apply는 한 트랜잭션에서 읽기-병합-쓰기
+    max_keys를 넘으면 가장 오래 갱신되지 않은 키부터 삭제 (prune_every번 기록마다 한 번 확인)
+    """
+    def __init__(self, path: str = ":memory:", max_keys: int = 10000, prune_every: int = 100):
+        self.path = path
+        self.max_keys = max(1, max_keys)
+        self.prune_every = max(1, prune_every)
+        self._writes = 0
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # 트랜잭션은 직접 관리 (BEGIN IMMEDIATE로 다른 프로세스와 쓰기 직렬화)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS recency ("
+            " key TEXT PRIMARY KEY, items TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS recency_updated ON recency (updated_at)")
+        self._lock = threading.Lock()
+
+    def _select(self, keys: List[str]) -> Dict[str, List[str]]:
+        found = {}
+        # sqlite 변수 개수 제한을 피하기 위해 나눠서 조회
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self._conn.execute(
+                f"SELECT key, items FROM recency WHERE key IN ({placeholders})", chunk
+            ).fetchall()
+            for key, items in rows:
+                found[key] = json.loads(items)
+        return found
+
+    def get_many(self, keys: List[str]) -> Dict[str, List[str]]:
+        if not keys:
+            return {}
+        with self._lock:
+            return self._select(keys)
+
+    def apply(self, additions: Additions, clears: Iterable[str] = (),
+              base: Optional[Dict[str, List[str]]] = None):
+        clears = list(clears)
+        if not additions and not clears:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                if clears:
+                    self._conn.executemany("DELETE FROM recency WHERE key = ?", [(k,) for k in clears])
+                # 다른 워커가 그사이 기록했을 수 있으므로 base 대신 트랜잭션 안에서 다시 읽어 병합
+                current = self._select(list(additions))
+                rows = [
+                    (key, json.dumps(_merge(current.get(key, []), items, capacity), ensure_ascii=False), now)
+                    for key, (items, capacity) in additions.items()
+                ]
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO recency (key, items, updated_at) VALUES (?, ?, ?)", rows
+                )
+                self._writes += 1
+                if self._writes % self.prune_every == 0:
+                    self._conn.execute(
+                        "DELETE FROM recency WHERE key IN ("
+                        " SELECT key FROM recency ORDER BY updated_at DESC LIMIT -1 OFFSET ?)",
+                        (self.max_keys,),
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM recency").fetchone()[0]
+
+
+class KeyValueClient:
+    """
+    키-값 서버 어댑터 인터페이스 (Redis 등 실제 클라이언트를 감싸 구현)
+    세 메서드 모두 한 번의 왕복으로 처리되도록 구현 (예: MGET / 파이프라인 SET EX / DEL)
+    """
+    def get_many(self, keys: List[str]) -> List[Optional[str]]:
+        raise NotImplementedError
+
+    def set_many(self, mapping: Dict[str, str], ttl_seconds: Optional[float] = None):
+        raise NotImplementedError
+
+    def delete_many(self, keys: List[str]):
+        raise NotImplementedError
+
+
+class DictKeyValueClient(KeyValueClient):
+    """프로세스 내 dict 기반 KeyValueClient (로컬 실행/테스트용 대체 서버)"""
+    def __init__(self):
+        self._data: Dict[str, Tuple[str, Optional[float]]] = {}  # key -> (값, 만료 시각)
+        self._lock = threading.Lock()
+        self.round_trips = 0
+
+    def get_many(self, keys: List[str]) -> List[Optional[str]]:
+        now = time.monotonic()
+        with self._lock:
+            self.round_trips += 1
+            values = []
+            for key in keys:
+                item = self._data.get(key)
+                if item is not None and item[1] is not None and item[1] < now:
+                    del self._data[key]
+                    item = None
+                values.append(item[0] if item is not None else None)
+            return values
+
+    def set_many(self, mapping: Dict[str, str], ttl_seconds: Optional[float] = None):
+        expires = time.monotonic() + ttl_seconds if ttl_seconds else None
+        with self._lock:
+            self.round_trips += 1
+            for key, value in mapping.items():
+                self._data[key] = (value, expires)
+
+    def delete_many(self, keys: List[str]):
+        with self._lock:
+            self.round_trips += 1
+            for key in keys:
+                self._data.pop(key, None)
+
+
+class KeyValueRecencyStore(RecencyStore):
+    """
+    키-값 서버 저장소 (여러 머신의 워커가 공유)
+    키별 항목 목록을 JSON 문자열 하나로 저장하고, 키 수 제한은 서버 TTL에 맡긴다
+    apply는 같은 요청의 get_many 결과(base)에 병합해 쓰므로 추가 읽기 없음
+    (동시에 같은 키를 갱신하면 마지막 쓰기가 남음 - 중복 방지 용도로는 허용)
+    """
+    def __init__(self, client: KeyValueClient, namespace: str = "recency",
+                 ttl_seconds: Optional[float] = 30 * 86400):
+        self.client = client
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds
+
+    def _full_key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    def get_many(self, keys: List[str]) -> Dict[str, List[str]]:
+        if not keys:
+            return {}
+        values = self.client.get_many([self._full_key(k) for k in keys])
+        return {key: json.loads(value) for key, value in zip(keys, values) if value is not None}
+
+    def apply(self, additions: Additions, clears: Iterable[str] = (),
+              base: Optional[Dict[str, List[str]]] = None):
+        cleared = set(clears)
+        # 초기화 후 다시 추가하는 키는 빈 목록 위에 덮어쓰므로 삭제 요청 불필요
+        deletes = [k for k in cleared if k not in additions]
+        if deletes:
+            self.client.delete_many([self._full_key(k) for k in deletes])
+        if not additions:
+            return
+        if base is None:
+            base = self.get_many([k for k in additions if k not in cleared])
+        mapping = {
+            self._full_key(key): json.dumps(
+                _merge([] if key in cleared else base.get(key, []), items, capacity), ensure_ascii=False
+            )
+            for key, (items, capacity) in additions.items()
+        }
+        self.client.set_many(mapping, self.ttl_seconds)
+
+
+def create_recency_store(backend: str = "memory", max_keys: int = 10000,
+                         sqlite_path: Optional[str] = None, kv_client: Optional[KeyValueClient] = None,
+                         kv_namespace: str = "recency", kv_ttl_seconds: Optional[float] = 30 * 86400) -> RecencyStore:
+    """설정값으로 저장소 생성 (kv 백엔드에 클라이언트가 없으면 프로세스 내 DictKeyValueClient 사용)"""
+    if backend not in RECENCY_BACKENDS:
+        raise ValueError(f"지원하지 않는 최근 항목 저장소 백엔드: {backend} (가능: {', '.join(RECENCY_BACKENDS)})")
+    if backend == "sqlite":
+        return SQLiteRecencyStore(sqlite_path or ":memory:", max_keys=max_keys)
+    if backend == "kv":
+        if kv_client is None:
+            print("   ⚠️ KV 클라이언트가 지정되지 않아 프로세스 내 DictKeyValueClient를 사용합니다.")
+            kv_client = DictKeyValueClient()
+        return KeyValueRecencyStore(kv_client, namespace=kv_namespace, ttl_seconds=kv_ttl_seconds)
+    return InMemoryRecencyStore(max_keys=max_keys)
+
+
+class BoundedCounter:
+    """키별 실행 횟수 (LRU로 키 수 제한, 제거된 키는 0부터 다시 셈)"""
+    def __init__(self, max_keys: int = 10000):
+        self.max_keys = max(1, max_keys)
+        self._counts: "OrderedDict[Hashable, int]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def increment(self, key: Hashable) -> int:
+        """1 증가시킨 뒤의 값"""
+        with self._lock:
+            count = self._counts.pop(key, 0) + 1
+            self._counts[key] = count
+            while len(self._counts) > self.max_keys:
+                self._counts.popitem(last=False)
+            return count
+
+    def get(self, key: Hashable) -> int:
+        with self._lock:
+            return self._counts.get(key, 0)
+
+    def __len__(self) -> int:
+        return len(self._counts)
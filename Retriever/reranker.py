@@ -0,0 +1,528 @@
+"""
+BGE Reranker 공유 모듈
+프로세스 전체에서 모델별로 하나의 reranker 인스턴스만 로드하고
+모든 리트리버가 레지스트리에서 빌려 쓴다 (메모리/로딩 시간 1회만 지불)
+
+모델 수명주기는 ManagedReranker가 관리:
+- 첫 rerank 호출 시 로드 (지연 로드)
+- 선택적으로 시작 직후 백그라운드 스레드에서 더미 배치로 워밍업
+- 설정한 유휴 시간 동안 사용이 없으면 언로드하여 메모리 반환
+
+백엔드 (config.RERANKER_CONFIG['backend']):
+- torch: PyTorch fp32 (GPU 있으면 GPU)
+- onnx_int8: ONNX 변환 + int8 동적 양자화 모델을 onnxruntime CPU로 실행 (optimum 필요)
+"""
+import os
+import time
+import hashlib
+import threading
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple
+from langchain.schema import Document
+from Retriever.lru_cache import LRUCache
+
+try:
+    import torch
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+    BGE_RERANKER_AVAILABLE = True
+except ImportError:
+    BGE_RERANKER_AVAILABLE = False
+
+try:
+    from transformers import AutoTokenizer
+    from optimum.onnxruntime import ORTModelForSequenceClassification, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+    ONNX_RERANKER_AVAILABLE = True
+except ImportError:
+    ONNX_RERANKER_AVAILABLE = False
+
+DEFAULT_RERANKER_MODEL = 'BAAI/bge-reranker-v2-m3'
+RERANKER_BACKENDS = ("torch", "onnx_int8")
+DEFAULT_ONNX_DIR = os.path.join("cache", "onnx")
+ONNX_QUANTIZED_FILE = "model_quantized.onnx"
+
+
+def _truncate_pair(query_ids: List[int], doc_ids: List[int], budget: int) -> Tuple[List[int], List[int]]:
+    """토크나이저의 truncation='longest_first'와 같은 규칙: 넘치는 만큼 더 긴 쪽(같으면 문서)에서 한 토큰씩 제거"""
+    q_len, d_len = len(query_ids), len(doc_ids)
+    for _ in range(q_len + d_len - budget):
+        if q_len > d_len:
+            q_len -= 1
+        else:
+            d_len -= 1
+    return query_ids[:q_len], doc_ids[:d_len]
+
+
+def stable_doc_id(doc: Document) -> str:
+    """문서 내용 기반 고정 id (인덱스 재빌드/번들 로드 후에도 동일)"""
+    return hashlib.sha1(doc.page_content.encode("utf-8")).hexdigest()
+
+
+class _BatchedPairScorer:
+    """
+    Cross-encoder 점수 계산 공통 로직 (스레드 안전)
+    (질의, 문서) 쌍을 토큰 길이순으로 정렬해 mini-batch로 나누고 배치마다 가장 긴 쌍 길이까지만 패딩
+    TOPIK 단어/문법 문서는 짧으므로 max_length를 낮게 잡아 패딩/연산량을 줄인다
+    코퍼스가 고정이므로 문서 토큰 id는 doc_token_cache에 한 번만 만들어 두고
+    매 호출에서는 질의만 토크나이즈한 뒤 특수 토큰을 붙여 쌍 입력을 조립한다
+    백엔드는 _forward(배치 features) → (점수 리스트, 패딩 길이)만 구현
+    """
+    backend = ""
+
+    def __init__(self, model_name: str, batch_size: int = 16, max_length: int = 256,
+                 doc_token_cache: Optional[LRUCache] = None):
+        self.model_name = model_name
+        self.batch_size = max(1, batch_size)
+        self.max_length = max_length
+        self.tokenizer = None
+        # 문서 텍스트 → 특수 토큰 없는 토큰 id (모델 언로드 후에도 재사용하도록 외부에서 주입 가능)
+        self.doc_token_cache = doc_token_cache if doc_token_cache is not None else LRUCache(maxsize=100000)
+        self.last_tokenize_seconds = 0.0
+        # LangGraph 병렬 검색 브랜치에서 동시에 호출되므로
+        # 토크나이저(fast tokenizer는 동시 사용 불가)와 forward를 직렬화
+        self._lock = threading.Lock()
+        self.last_batch_timings: List[Dict] = []  # 마지막 호출의 배치별 (크기, 패딩 길이, 소요 시간)
+
+    def _forward(self, features: List[Dict]) -> Tuple[List[float], int]:
+        raise NotImplementedError
+
+    def _doc_token_ids(self, texts: List[str]) -> List[Tuple[int, ...]]:
+        """문서 토큰 id (캐시에 없는 텍스트만 한 번에 토크나이즈)"""
+        ids: List[Optional[Tuple[int, ...]]] = [self.doc_token_cache.get(t) for t in texts]
+        missing: Dict[str, List[int]] = {}
+        for i, (text, cached) in enumerate(zip(texts, ids)):
+            if cached is None:
+                missing.setdefault(text, []).append(i)
+        if missing:
+            # 쌍 길이 예산은 max_length보다 작으므로 문서 단독으로도 max_length까지만 보관
+            encoded = self.tokenizer(list(missing), add_special_tokens=False, truncation=True,
+                                     max_length=self.max_length)["input_ids"]
+            for (text, positions), token_ids in zip(missing.items(), encoded):
+                token_ids = tuple(token_ids)
+                self.doc_token_cache.put(text, token_ids)
+                for i in positions:
+                    ids[i] = token_ids
+        return ids
+
+    def _encode_pairs(self, query: str, texts: List[str]) -> List[Dict]:
+        """질의만 토크나이즈하고 캐시된 문서 id와 특수 토큰으로 (질의, 문서) 쌍 입력 조립"""
+        tokenizer = self.tokenizer
+        query_ids = tokenizer(query, add_special_tokens=False)["input_ids"]
+        budget = self.max_length - tokenizer.num_special_tokens_to_add(pair=True)
+        with_token_types = "token_type_ids" in tokenizer.model_input_names
+        features = []
+        for doc_ids in self._doc_token_ids(texts):
+            q_ids, d_ids = _truncate_pair(query_ids, list(doc_ids), budget)
+            input_ids = tokenizer.build_inputs_with_special_tokens(q_ids, d_ids)
+            feature = {"input_ids": input_ids, "attention_mask": [1] * len(input_ids)}
+            if with_token_types:
+                feature["token_type_ids"] = tokenizer.create_token_type_ids_from_sequences(q_ids, d_ids)
+            features.append(feature)
+        return features
+
+    def pretokenize(self, texts: List[str]):
+        """문서 토큰 캐시 미리 채우기 (로드 직후 코퍼스 전체를 넣어 두면 첫 요청도 질의만 토크나이즈)"""
+        with self._lock:
+            for start in range(0, len(texts), 1024):
+                self._doc_token_ids(list(texts[start:start + 1024]))
+
+    def score(self, query: str, texts: List[str]) -> List[float]:
+        """(query, text) 쌍 점수 - 입력 순서 그대로 반환"""
+        if not texts:
+            return []
+        scores = [0.0] * len(texts)
+        timings = []
+        with self._lock:
+            # 패딩 없는 쌍 입력 조립 (문서 토큰은 캐시) → 길이 기준 정렬
+            t0 = time.perf_counter()
+            features = self._encode_pairs(query, list(texts))
+            self.last_tokenize_seconds = time.perf_counter() - t0
+            order = sorted(range(len(texts)), key=lambda i: len(features[i]["input_ids"]))
+
+            for start in range(0, len(order), self.batch_size):
+                batch_idx = order[start:start + self.batch_size]
+                t0 = time.perf_counter()
+                logits, padded_length = self._forward([features[i] for i in batch_idx])
+                for i, value in zip(batch_idx, logits):
+                    scores[i] = value
+                timings.append({
+                    "size": len(batch_idx),
+                    "padded_length": padded_length,
+                    "seconds": time.perf_counter() - t0,
+                })
+        self.last_batch_timings = timings
+        return scores
+
+    def rerank(self, query: str, docs: List[Document], top_k: int = 10) -> List[Document]:
+        if not docs:
+            return []
+        scores = self.score(query, [d.page_content for d in docs])
+        ranked_idx = sorted(range(len(docs)), key=lambda i: scores[i], reverse=True)[:top_k]
+        return [docs[i] for i in ranked_idx]
+
+
+class BGEReranker(_BatchedPairScorer):
+    """BGE-reranker-v2-m3 PyTorch fp32 백엔드"""
+    backend = "torch"
+
+    def __init__(self, model_name: str = DEFAULT_RERANKER_MODEL, batch_size: int = 16, max_length: int = 256,
+                 doc_token_cache: Optional[LRUCache] = None):
+        super().__init__(model_name, batch_size, max_length, doc_token_cache)
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        self.model = AutoModelForSequenceClassification.from_pretrained(model_name)
+        self.model.eval()
+        if torch.cuda.is_available():
+            self.model = self.model.cuda()
+
+    def _forward(self, features: List[Dict]) -> Tuple[List[float], int]:
+        with torch.no_grad():
+            # 배치 안에서 가장 긴 쌍 길이까지만 동적 패딩
+            inputs = self.tokenizer.pad(features, return_tensors='pt')
+            if torch.cuda.is_available():
+                inputs = {k: v.cuda() for k, v in inputs.items()}
+            logits = self.model(**inputs, return_dict=True).logits.view(-1).float().cpu().tolist()
+        return logits, int(inputs["input_ids"].shape[1])
+
+
+class OnnxInt8Reranker(_BatchedPairScorer):
+    """
+    ONNX + int8 동적 양자화 CPU 백엔드 (onnxruntime)
+    처음 한 번 모델을 ONNX로 변환하고 가중치를 int8로 동적 양자화해 onnx_dir에 저장,
+    이후에는 저장된 양자화 모델만 로드한다.
+    quantization: AutoQuantizationConfig 프리셋 (avx2 / avx512 / avx512_vnni / arm64)
+    """
+    backend = "onnx_int8"
+
+    def __init__(self, model_name: str = DEFAULT_RERANKER_MODEL, batch_size: int = 16, max_length: int = 256,
+                 onnx_dir: Optional[str] = None, quantization: str = "avx2",
+                 doc_token_cache: Optional[LRUCache] = None):
+        super().__init__(model_name, batch_size, max_length, doc_token_cache)
+        self.onnx_dir = onnx_dir or DEFAULT_ONNX_DIR
+        self.quantization = quantization
+        model_dir = self._load_or_export()
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.model = ORTModelForSequenceClassification.from_pretrained(
+            model_dir, file_name=ONNX_QUANTIZED_FILE, provider="CPUExecutionProvider"
+        )
+
+    def _quantized_dir(self) -> str:
+        name = self.model_name.replace("/", "__")
+        return os.path.join(self.onnx_dir, f"{name}-int8-{self.quantization}")
+
+    def _load_or_export(self) -> str:
+        target = self._quantized_dir()
+        if os.path.exists(os.path.join(target, ONNX_QUANTIZED_FILE)):
+            return target
+        print(f"   🔧 Reranker ONNX 변환 + int8 양자화 중 (최초 1회): {self.model_name}")
+        start = time.perf_counter()
+        fp32_dir = target + "-fp32"
+        exported = ORTModelForSequenceClassification.from_pretrained(self.model_name, export=True)
+        exported.save_pretrained(fp32_dir)
+        quantizer = ORTQuantizer.from_pretrained(fp32_dir)
+        qconfig = getattr(AutoQuantizationConfig, self.quantization)(is_static=False, per_channel=False)
+        quantizer.quantize(save_dir=target, quantization_config=qconfig)
+        AutoTokenizer.from_pretrained(self.model_name).save_pretrained(target)
+        print(f"   ✅ 양자화 모델 저장: {target} ({time.perf_counter() - start:.0f}s)")
+        return target
+
+    def _forward(self, features: List[Dict]) -> Tuple[List[float], int]:
+        inputs = self.tokenizer.pad(features, return_tensors='np')
+        logits = self.model(**inputs).logits.reshape(-1).astype("float32").tolist()
+        return logits, int(inputs["input_ids"].shape[1])
+
+
+def reranker_available(backend: Optional[str] = None) -> bool:
+    """백엔드(기본: 설정값)를 실행할 패키지가 설치되어 있는지"""
+    backend = backend or _default_options.get("backend", "torch")
+    if backend == "onnx_int8":
+        return ONNX_RERANKER_AVAILABLE
+    return BGE_RERANKER_AVAILABLE
+
+
+def create_scorer(model_name: str, backend: str = "torch", batch_size: int = 16, max_length: int = 256,
+                  onnx_dir: Optional[str] = None, quantization: str = "avx2",
+                  doc_token_cache: Optional[LRUCache] = None) -> _BatchedPairScorer:
+    """백엔드별 점수 계산기 생성 (모델 즉시 로드)"""
+    if backend not in RERANKER_BACKENDS:
+        raise ValueError(f"지원하지 않는 reranker 백엔드: {backend} (가능: {', '.join(RERANKER_BACKENDS)})")
+    if backend == "onnx_int8":
+        return OnnxInt8Reranker(model_name, batch_size=batch_size, max_length=max_length,
+                                onnx_dir=onnx_dir, quantization=quantization, doc_token_cache=doc_token_cache)
+    return BGEReranker(model_name, batch_size=batch_size, max_length=max_length, doc_token_cache=doc_token_cache)
+
+
+class ManagedReranker:
+    """
+    BGEReranker 수명주기 관리자
+    리트리버는 이 객체를 reranker처럼 사용하고, 실제 모델 로드/언로드는 내부에서 처리
+    load / load_failed / warmup / idle_unload 이벤트를 리스너와 stats로 관찰 가능
+    (모델, 질의 해시, 문서 id)별 점수를 LRU에 캐싱해 캐시에 없는 쌍만 모델에 보낸다
+    문서 토큰 캐시는 여기서 소유하여 유휴 언로드 후 다시 로드해도 재사용
+    """
+    def __init__(self, model_name: str = DEFAULT_RERANKER_MODEL, idle_unload_seconds: float = 0,
+                 batch_size: int = 16, max_length: int = 256, score_cache_size: int = 50000,
+                 backend: str = "torch", onnx_dir: Optional[str] = None, quantization: str = "avx2",
+                 doc_token_cache_size: int = 100000):
+        if backend not in RERANKER_BACKENDS:
+            raise ValueError(f"지원하지 않는 reranker 백엔드: {backend} (가능: {', '.join(RERANKER_BACKENDS)})")
+        self.model_name = model_name
+        self.backend = backend
+        self.onnx_dir = onnx_dir
+        self.quantization = quantization
+        self.idle_unload_seconds = idle_unload_seconds  # 0 이하면 언로드하지 않음
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self._reranker: Optional[_BatchedPairScorer] = None
+        self._lock = threading.Lock()
+        self._last_used = 0.0
+        self._idle_timer: Optional[threading.Timer] = None
+        self._listeners: List[Callable[[str, Dict], None]] = []
+        self.score_cache = LRUCache(maxsize=score_cache_size) if score_cache_size else None
+        # 토크나이저는 모델명/백엔드별로 고정이므로 언로드와 무관하게 유지
+        self.doc_token_cache = LRUCache(maxsize=max(1, doc_token_cache_size))
+        self.events = deque(maxlen=100)  # 최근 이벤트 기록
+        self._stats_lock = threading.Lock()  # 병렬 브랜치의 동시 rerank 호출에서 누적값 유실 방지
+        self.stats = {
+            "loads": 0,
+            "load_failures": 0,
+            "warmups": 0,
+            "idle_unloads": 0,
+            "rerank_calls": 0,
+            "pairs_requested": 0,   # rerank로 들어온 (질의, 문서) 쌍 누적
+            "pairs_forwarded": 0,   # 점수 캐시 미스로 실제 모델에 보낸 쌍 누적
+            "last_load_seconds": None,
+            "last_warmup_seconds": None,
+            "last_rerank_seconds": None,
+            "last_tokenize_seconds": None,
+            "tokenize_seconds_total": 0.0,  # 토크나이저 누적 시간 (문서 토큰 캐시 적중 시 질의분만)
+            "last_batch_timings": [],
+        }
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._reranker is not None
+
+    def add_listener(self, callback: Callable[[str, Dict], None]):
+        """이벤트 리스너 등록: callback(event_name, info_dict)"""
+        self._listeners.append(callback)
+
+    def _count(self, **deltas):
+        """누적 통계 증가 (인스턴스 락 보유)"""
+        with self._stats_lock:
+            for key, value in deltas.items():
+                self.stats[key] += value
+
+    def _record(self, **values):
+        """최근 값 통계 기록 (인스턴스 락 보유)"""
+        with self._stats_lock:
+            self.stats.update(values)
+
+    def _emit(self, event: str, **info):
+        info["model"] = self.model_name
+        info["time"] = time.time()
+        self.events.append((event, info))
+        for callback in self._listeners:
+            try:
+                callback(event, info)
+            except Exception as e:
+                print(f"   ⚠️ Reranker 이벤트 리스너 오류: {e}")
+
+    def _ensure_loaded(self) -> _BatchedPairScorer:
+        reranker = self._reranker
+        if reranker is not None:
+            return reranker
+        with self._lock:
+            if self._reranker is None:
+                start = time.perf_counter()
+                try:
+                    self._reranker = create_scorer(
+                        self.model_name, self.backend, batch_size=self.batch_size, max_length=self.max_length,
+                        onnx_dir=self.onnx_dir, quantization=self.quantization,
+                        doc_token_cache=self.doc_token_cache,
+                    )
+                except Exception as e:
+                    self._count(load_failures=1)
+                    self._emit("load_failed", error=str(e))
+                    raise
+                elapsed = time.perf_counter() - start
+                self._count(loads=1)
+                self._record(last_load_seconds=elapsed)
+                print(f"   ✅ Reranker 로드 완료: {self.model_name} [{self.backend}] ({elapsed:.1f}s)")
+                self._emit("load", seconds=elapsed)
+            return self._reranker
+
+    def rerank(self, query: str, docs: List[Document], top_k: int = 10) -> List[Document]:
+        if not docs:
+            return []
+        self._count(rerank_calls=1, pairs_requested=len(docs))
+        start = time.perf_counter()
+
+        # 캐시된 점수 먼저 채우고, 없는 (중복 제거된) 쌍만 모델로 계산
+        query_hash = hashlib.sha1(query.encode("utf-8")).hexdigest()
+        # 양자화 백엔드는 점수가 조금 다르므로 백엔드까지 키에 포함
+        model_key = f"{self.model_name}:{self.backend}"
+        keys = [(model_key, query_hash, stable_doc_id(d)) for d in docs]
+        scores: List[Optional[float]] = [None] * len(docs)
+        missing: Dict[tuple, List[int]] = {}
+        for i, key in enumerate(keys):
+            cached = self.score_cache.get(key) if self.score_cache is not None else None
+            if cached is not None:
+                scores[i] = cached
+            else:
+                missing.setdefault(key, []).append(i)
+
+        batch_timings, tokenize_seconds = [], 0.0
+        if missing:
+            try:
+                reranker = self._ensure_loaded()
+            except Exception as e:
+                # 모델을 쓸 수 없으면 원래 순서 유지 (검색 자체는 계속)
+                print(f"   ⚠️ Reranker 로드 실패, 재정렬 생략: {e}")
+                return docs[:top_k]
+            self._touch()
+            positions = list(missing.values())
+            self._count(pairs_forwarded=len(positions))
+            new_scores = reranker.score(query, [docs[idx[0]].page_content for idx in positions])
+            batch_timings = reranker.last_batch_timings
+            tokenize_seconds = reranker.last_tokenize_seconds
+            self._count(tokenize_seconds_total=tokenize_seconds)
+            self._record(last_tokenize_seconds=tokenize_seconds)
+            for key, idx, value in zip(missing.keys(), positions, new_scores):
+                if self.score_cache is not None:
+                    self.score_cache.put(key, value)
+                for i in idx:
+                    scores[i] = value
+
+        ranked_idx = sorted(range(len(docs)), key=lambda i: scores[i], reverse=True)[:top_k]
+        elapsed = time.perf_counter() - start
+        self._record(last_rerank_seconds=elapsed, last_batch_timings=batch_timings)
+        self._emit("rerank", pairs=len(docs), scored_pairs=len(missing), seconds=elapsed,
+                   tokenize_seconds=tokenize_seconds, batches=batch_timings)
+        return [docs[i] for i in ranked_idx]
+
+    def score_cache_stats(self) -> Dict:
+        """점수 캐시 적중/미스/제거 횟수 + 크기 + 적중률"""
+        return self.score_cache.snapshot_stats() if self.score_cache is not None else {}
+
+    def doc_token_cache_stats(self) -> Dict:
+        """문서 토큰 캐시 적중/미스 + 크기 + 적중률"""
+        return self.doc_token_cache.snapshot_stats()
+
+    def pretokenize(self, docs: List[Document]):
+        """코퍼스 문서 토큰을 미리 캐시 (모델이 없으면 로드)"""
+        texts = list(dict.fromkeys(d.page_content for d in docs))
+        if not texts:
+            return
+        start = time.perf_counter()
+        self._ensure_loaded().pretokenize(texts)
+        self._touch()
+        print(f"   ✅ Reranker 문서 토큰 캐시: {len(texts)}개 ({time.perf_counter() - start:.1f}s)")
+
+    def warmup(self, background: bool = True):
+        """모델 로드 + 더미 배치 1회 실행 (첫 요청의 콜드 스타트 제거)"""
+        def _run():
+            start = time.perf_counter()
+            try:
+                reranker = self._ensure_loaded()
+                reranker.rerank("워밍업", [Document(page_content="워밍업 문서")], top_k=1)
+            except Exception as e:
+                print(f"   ⚠️ Reranker 워밍업 실패: {e}")
+                return
+            elapsed = time.perf_counter() - start
+            self._count(warmups=1)
+            self._record(last_warmup_seconds=elapsed)
+            self._touch()
+            self._emit("warmup", seconds=elapsed)
+
+        if background:
+            thread = threading.Thread(target=_run, name="reranker-warmup", daemon=True)
+            thread.start()
+            return thread
+        _run()
+        return None
+
+    def unload(self):
+        """모델 해제 (진행 중인 호출은 기존 참조로 끝까지 실행됨)"""
+        with self._lock:
+            if self._reranker is None:
+                return
+            self._reranker = None
+            if self._idle_timer is not None:
+                self._idle_timer.cancel()
+                self._idle_timer = None
+        if BGE_RERANKER_AVAILABLE and torch.cuda.is_available():
+            torch.cuda.empty_cache()
+        self._emit("unload")
+
+    def _touch(self):
+        """마지막 사용 시각 갱신 + 유휴 언로드 타이머 예약 (동시 호출이 타이머를 중복 예약하지 않도록 락 보유)"""
+        with self._lock:
+            self._last_used = time.monotonic()
+            if self.idle_unload_seconds > 0 and self._idle_timer is None:
+                self._schedule_idle_check(self.idle_unload_seconds)
+
+    def _schedule_idle_check(self, delay: float):
+        """self._lock 보유 상태에서 호출"""
+        timer = threading.Timer(delay, self._idle_check)
+        timer.daemon = True
+        self._idle_timer = timer
+        timer.start()
+
+    def _idle_check(self):
+        with self._lock:
+            self._idle_timer = None
+            if self._reranker is None:
+                return
+            idle = time.monotonic() - self._last_used
+            if idle < self.idle_unload_seconds:
+                # 그사이 사용됨 → 남은 시간만큼 다시 대기
+                self._schedule_idle_check(self.idle_unload_seconds - idle)
+                return
+            self._reranker = None
+        self._count(idle_unloads=1)
+        if BGE_RERANKER_AVAILABLE and torch.cuda.is_available():
+            torch.cuda.empty_cache()
+        print(f"   💤 Reranker 유휴 언로드: {self.model_name} ({idle:.0f}s 미사용)")
+        self._emit("idle_unload", idle_seconds=idle)
+
+
+_registry: Dict[str, ManagedReranker] = {}
+_registry_lock = threading.Lock()
+_default_model = DEFAULT_RERANKER_MODEL
+_default_options: Dict = {}
+
+
+def configure_reranker(model_name: str = DEFAULT_RERANKER_MODEL, **options):
+    """
+    기본 reranker 모델과 수명주기/배치 옵션 설정 (리트리버 생성 전에 호출)
+    options: idle_unload_seconds, batch_size, max_length, score_cache_size, backend, onnx_dir, quantization,
+             doc_token_cache_size
+    이전 설정으로 만든 공유 reranker는 비우므로 이후 get_reranker는 새 옵션으로 생성
+    """
+    global _default_model, _default_options
+    with _registry_lock:
+        _default_model = model_name
+        _default_options = options
+        _registry.clear()
+
+
+def get_reranker(model_name: Optional[str] = None) -> ManagedReranker:
+    """
+    모델명별 공유 reranker 반환 (모델은 첫 rerank 호출 시 로드)
+    설정된 백엔드의 패키지(torch/transformers 또는 optimum/onnxruntime)가 없으면 ImportError
+    """
+    if not reranker_available():
+        raise ImportError(
+            f"reranker 백엔드 '{_default_options.get('backend', 'torch')}'에 필요한 패키지가 설치되지 않아 "
+            f"BGE Reranker를 사용할 수 없습니다."
+        )
+    model_name = model_name or _default_model
+    reranker = _registry.get(model_name)
+    if reranker is not None:
+        return reranker
+    with _registry_lock:
+        # 다른 스레드가 먼저 생성했을 수 있으므로 재확인
+        if model_name not in _registry:
+            options = _default_options if model_name == _default_model else {}
+            _registry[model_name] = ManagedReranker(model_name, **options)
+        return _registry[model_name]
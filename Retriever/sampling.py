@@ -0,0 +1,65 @@
+"""
+리트리버 샘플링 유틸
+전역 random 상태를 쓰지 않고 요청마다 시드를 정해 별도 RNG를 만든다
+(LangGraph 병렬 브랜치/동시 요청이 서로의 난수열을 건드리지 않아 요청 단위로 재현 가능)
+순위 가중 비복원 샘플링은 Gumbel-top-k로 한 번에 벡터 계산 (재추출 루프 없음)
+"""
+import random
+import hashlib
+from typing import List, Sequence, Union
+import numpy as np
+
+
+def stable_seed(*parts) -> int:
+    """파트들을 ':'로 이어 붙인 문자열의 md5 하위 32비트 (예: stable_seed(query, call_count))"""
+    key = ":".join(str(p) for p in parts)
+    return int(hashlib.md5(key.encode()).hexdigest(), 16) & 0xFFFFFFFF
+
+
+def request_rng(*parts) -> random.Random:
+    """stable_seed로 시드한 요청 전용 RNG"""
+    return random.Random(stable_seed(*parts))
+
+
+def rank_weights(n: int) -> np.ndarray:
+    """순위 기반 가중치 1/(rank+1) - 상위 후보일수록 높은 확률"""
+    return 1.0 / np.arange(1, n + 1, dtype=np.float64)
+
+
+def _gumbel_keys(n: int, seed: int) -> np.ndarray:
+    """log(1/(rank+1)) + Gumbel 잡음 (시드별 Generator로 생성 → 단건/배치 결과 동일)"""
+    return np.log(rank_weights(n)) + np.random.default_rng(seed).gumbel(size=n)
+
+
+def rank_weighted_sample(n: int, k: int, seed: int) -> List[int]:
+    """
+    1/(rank+1) 가중치 비복원 샘플링 (Gumbel-top-k)
+    각 후보에 log 가중치 + Gumbel 잡음을 더해 상위 k개를 한 번에 고르며,
+    키 내림차순은 가중치 비례로 하나씩 뽑는 순차 비복원 추출과 같은 분포를 따른다
+    반환: 뽑힌 순서대로의 후보 인덱스
+    """
+    k = min(k, n)
+    if k <= 0:
+        return []
+    keys = _gumbel_keys(n, seed)
+    top = np.argpartition(-keys, k - 1)[:k]
+    return top[np.argsort(-keys[top])].tolist()
+
+
+def batch_rank_weighted_sample(sizes: Sequence[int], ks: Union[int, Sequence[int]],
+                               seeds: Sequence[int]) -> List[List[int]]:
+    """
+    여러 질의를 한 번에 샘플링 (행마다 후보 수/k/시드가 다를 수 있음)
+    후보 수가 다른 행은 -inf로 패딩한 키 행렬에서 행 단위 top-k를 벡터 연산으로 계산
+    같은 (후보 수, k, 시드)면 rank_weighted_sample과 같은 결과
+    """
+    if not sizes:
+        return []
+    ks = [ks] * len(sizes) if isinstance(ks, int) else list(ks)
+    width = max(sizes)
+    keys = np.full((len(sizes), max(width, 1)), -np.inf)
+    for row, (n, seed) in enumerate(zip(sizes, seeds)):
+        if n:
+            keys[row, :n] = _gumbel_keys(n, seed)
+    order = np.argsort(-keys, axis=1, kind="stable")
+    return [order[row, :max(0, min(k, n))].tolist() for row, (n, k) in enumerate(zip(sizes, ks))]
@@ -1,42 +1,22 @@
 # -------------------------------------
 # TOPIK 단어 Retriever (BGE Reranker 적용)
 # -------------------------------------
-import time, random, hashlib
-from collections import deque
-from typing import List, Dict
+import os, time
+from typing import List, Dict, Optional, Tuple
 import pandas as pd
-import torch
-from transformers import AutoModelForSequenceClassification, AutoTokenizer
 from langchain.schema import Document
 from langchain.vectorstores import FAISS
-from langchain.embeddings import OpenAIEmbeddings
 from langchain.retrievers import EnsembleRetriever, BM25Retriever
-
-class BGEReranker:
-    """BGE-reranker-v2-m3 기반 reranker"""
-    def __init__(self):
-        self.tokenizer = AutoTokenizer.from_pretrained('BAAI/bge-reranker-v2-m3')
-        self.model = AutoModelForSequenceClassification.from_pretrained('BAAI/bge-reranker-v2-m3')
-        self.model.eval()
-        if torch.cuda.is_available():
-            self.model = self.model.cuda()
-    
-    def rerank(self, query: str, docs: List[Document], top_k: int = 10) -> List[Document]:
-        if not docs:
-            return []
-        
-        pairs = [[query, d.page_content] for d in docs]
-        with torch.no_grad():
-            inputs = self.tokenizer(pairs, padding=True, truncation=True, 
-                                   return_tensors='pt', max_length=512)
-            if torch.cuda.is_available():
-                inputs = {k: v.cuda() for k, v in inputs.items()}
-            
-            scores = self.model(**inputs, return_dict=True).logits.view(-1).float().cpu()
-        
-        ranked_idx = scores.argsort(descending=True)[:top_k]
-        return [docs[i] for i in ranked_idx]
-
+from Retriever.reranker import get_reranker
+from Retriever.cascade import cascade_rerank
+from Retriever.sampling import stable_seed, rank_weighted_sample
+from Retriever.recency_store import RecencyStore, RecencySession, InMemoryRecencyStore, BoundedCounter
+from Retriever.embeddings import get_embeddings
+from Retriever.index_cache import compute_data_hash, embedding_model_name, load_or_build_faiss
+from Retriever.bundle import (
+    component_dir, save_faiss, load_faiss, save_pickle, load_pickle, read_component_manifest,
+    embedding_info, check_embeddings,
+)
 
 class TOPIKVocabularyRetriever:
     """TOPIK 단어 CSV 파일 기반 Retriever (BGE Reranker + 난이도 준수)"""
@@ -48,17 +28,39 @@ class TOPIKVocabularyRetriever:
         "advanced":     ["advanced", "intermediate"]
     }
 
-    def __init__(self, csv_paths: Dict[str, List[str]]):
+    # 문서 포맷(page_content) 변경 시 올려서 기존 인덱스 캐시 무효화
+    INDEX_CACHE_VERSION = "topik_v1"
+
+    # 최근 단어 저장소 키 / 보관 수 (문법 retriever와 같은 저장소를 공유하므로 접두사로 구분)
+    RECENT_GLOBAL_KEY = "vocab:*"
+    RECENT_GLOBAL_SIZE = 200
+    RECENT_QUERY_SIZE = 50
+
+    def __init__(self, csv_paths: Dict[str, List[str]], cache_dir: Optional[str] = None,
+                 bundle_dir: Optional[str] = None, cascade: Optional[Dict] = None,
+                 max_tracked_queries: int = 10000, recency_store: Optional[RecencyStore] = None):
         self.csv_paths = csv_paths
+        self.cache_dir = cache_dir  # FAISS 인덱스 캐시 디렉토리 (None이면 캐시 미사용)
+        self.bundle_dir = bundle_dir  # 오프라인 빌드 번들 (있으면 임베딩 호출 없이 로드)
         self.vocabulary_data = {}
         self.retrievers = {}
         self.level_docs_flat = {}
-        self.recent_words = deque(maxlen=200)  # 전역 최근 단어 (모든 쿼리 공통)
-        self.query_recent_words = {}  # 쿼리별 최근 단어 캐시 (쿼리별 중복 방지)
-        self.query_call_count = {}  # 쿼리별 실행 횟수 (매번 다른 결과 보장)
-        self.reranker = BGEReranker()  # Reranker 초기화
-        self._load_vocabulary()
-        self._create_retrievers()
+        self.vectorstores = {}
+        self.bm25_retrievers = {}
+        self.embeddings = None
+        # 최근 단어 (전역 + 쿼리별) - 기본은 프로세스 메모리, 여러 워커가 공유하려면 sqlite/kv 저장소 주입
+        # 추적 쿼리 수는 LRU로 제한 → 고유 쿼리가 계속 들어와도 메모리 일정
+        self.recency_store = recency_store or InMemoryRecencyStore(max_keys=max_tracked_queries)
+        self.query_call_count = BoundedCounter(max_keys=max_tracked_queries)  # 쿼리별 실행 횟수
+        self.reranker = get_reranker()  # 공유 Reranker (첫 재정렬 시 1회 로드)
+        # 2단계 캐스케이드: {'keep': {레벨: N}, 'rank_weight': float} (None이면 후보 전부 재정렬)
+        self.cascade = cascade or {}
+        self.cascade_stats = {"requests": 0, "candidates": 0, "heavy_pairs": 0}
+        if bundle_dir:
+            self._load_from_bundle(bundle_dir)
+        else:
+            self._load_vocabulary()
+            self._create_retrievers()
     
     def _load_vocabulary(self):
         """CSV 파일들을 레벨별로 로드"""
@@ -96,29 +98,80 @@ class TOPIKVocabularyRetriever:
                     print(f"Error loading {path}: {e}")
             self.vocabulary_data[level] = level_documents
     
+    def _index_cache_root(self, embeddings) -> Optional[str]:
+        """CSV 내용 해시 + 임베딩 모델명 기반 캐시 디렉토리 (데이터/모델이 바뀔 때만 재생성)"""
+        if not self.cache_dir:
+            return None
+        all_paths = [p for paths in self.csv_paths.values() for p in paths]
+        data_hash = compute_data_hash(all_paths, embedding_model_name(embeddings))
+        return os.path.join(self.cache_dir, self.INDEX_CACHE_VERSION, data_hash)
+
     def _create_retrievers(self):
         """레벨별 retriever 생성: 일반 similarity search (reranker가 다양성 처리)"""
-        embeddings = OpenAIEmbeddings()
+        embeddings = self.embeddings = get_embeddings()
+        cache_root = self._index_cache_root(embeddings)
         for level, documents in self.vocabulary_data.items():
             if not documents:
                 continue
 
             self.level_docs_flat[level] = documents
 
-            vectorstore = FAISS.from_documents(documents, embeddings)
-            # MMR 제거, 일반 검색으로 변경 (reranker가 정렬)
-            vector_retriever = vectorstore.as_retriever(
-                search_kwargs={"k": 80}  # 넓게 가져와서 reranker에게 위임
-            )
+            # 캐시가 있으면 로드, 없으면 임베딩 후 저장
+            cache_path = os.path.join(cache_root, level) if cache_root else None
+            vectorstore = load_or_build_faiss(documents, embeddings, cache_path)
 
             bm25_retriever = BM25Retriever.from_documents(documents)
-            bm25_retriever.k = 80
+            self._register_level(level, vectorstore, bm25_retriever)
+
+    def _register_level(self, level: str, vectorstore, bm25_retriever):
+        """벡터 인덱스 + BM25로 레벨별 앙상블 retriever 구성"""
+        self.vectorstores[level] = vectorstore
+        self.bm25_retrievers[level] = bm25_retriever
+
+        # MMR 제거, 일반 검색으로 변경 (reranker가 정렬)
+        vector_retriever = vectorstore.as_retriever(
+            search_kwargs={"k": 80}  # 넓게 가져와서 reranker에게 위임
+        )
+        bm25_retriever.k = 80
+
+        ensemble_retriever = EnsembleRetriever(
+            retrievers=[vector_retriever, bm25_retriever],
+            weights=[0.6, 0.4]
+        )
+        self.retrievers[level] = ensemble_retriever
 
-            ensemble_retriever = EnsembleRetriever(
-                retrievers=[vector_retriever, bm25_retriever],
-                weights=[0.6, 0.4]
-            )
-            self.retrievers[level] = ensemble_retriever
+    def export_to_bundle(self, bundle_dir: str) -> Dict:
+        """레벨별 FAISS 인덱스와 BM25 통계를 번들에 저장하고 manifest 항목 반환"""
+        levels = {}
+        for level, vectorstore in self.vectorstores.items():
+            level_dir = component_dir(bundle_dir, "vocabulary", level)
+            save_faiss(vectorstore, level_dir)
+            save_pickle(self.bm25_retrievers[level], os.path.join(level_dir, "bm25.pkl"))
+            levels[level] = len(self.level_docs_flat.get(level, []))
+
+        all_paths = [p for paths in self.csv_paths.values() for p in paths]
+        model = embedding_model_name(self.embeddings)
+        return {
+            **embedding_info(self.embeddings, next(iter(self.vectorstores.values()), None)),
+            "data_hash": compute_data_hash(all_paths, model),
+            "levels": levels,
+        }
+
+    def _load_from_bundle(self, bundle_dir: str):
+        """번들에서 인덱스/BM25/문서 로드 (임베딩 호출 없음, 쿼리 임베딩 모델만 맞춰 생성)"""
+        info = read_component_manifest(bundle_dir, "vocabulary")
+        embeddings = self.embeddings = get_embeddings(
+            info["embedding_model"], info.get("embedding_dimensions"), exact=True
+        )
+        for level in info.get("levels", {}):
+            level_dir = component_dir(bundle_dir, "vocabulary", level)
+            vectorstore = load_faiss(level_dir, embeddings)
+            check_embeddings(info, embeddings, vectorstore, f"vocabulary/{level}")
+            bm25_retriever = load_pickle(os.path.join(level_dir, "bm25.pkl"))
+            documents = list(bm25_retriever.docs)
+            self.vocabulary_data[level] = documents
+            self.level_docs_flat[level] = documents
+            self._register_level(level, vectorstore, bm25_retriever)
 
 
     def _dedup_by_word(self, docs: List[Document]) -> List[Document]:
@@ -129,63 +182,47 @@ class TOPIKVocabularyRetriever:
                 seen.add(w); unique.append(d)
         return unique
 
-    def _filter_recent(self, docs: List[Document]) -> List[Document]:
+    def _recent_query_key(self, query: str) -> str:
+        return f"vocab:q:{query}"
+
+    def _filter_recent(self, docs: List[Document], session: RecencySession) -> List[Document]:
         """전역 최근 단어 필터링"""
-        return [d for d in docs if d.metadata.get('word', '').strip() not in self.recent_words]
+        recent = session.recent(self.RECENT_GLOBAL_KEY)
+        return [d for d in docs if d.metadata.get('word', '').strip() not in recent]
     
-    def _filter_recent_by_query(self, docs: List[Document], query: str) -> List[Document]:
+    def _filter_recent_by_query(self, docs: List[Document], query: str,
+                                session: RecencySession) -> List[Document]:
         """
         쿼리별 최근 단어 필터링
         같은 쿼리를 여러 번 실행해도 이전에 나온 단어 제외
         """
-        if query not in self.query_recent_words:
-            self.query_recent_words[query] = deque(maxlen=50)  # 쿼리별 최근 50개
-        
-        recent = self.query_recent_words[query]
+        recent = session.recent(self._recent_query_key(query))  # 쿼리별 최근 50개
         return [d for d in docs if d.metadata.get('word', '').strip() not in recent]
 
-    def _seed_from_query(self, query: str):
+    def _seeds_from_query(self, query: str) -> Tuple[int, int]:
         """
-        쿼리 + 실행 횟수 기반 시드 생성
+        쿼리 + 실행 횟수 기반 요청 전용 시드 (정확 레벨용, 근접 레벨용) - 전역 random 상태는 건드리지 않음
         같은 쿼리라도 실행 횟수가 다르면 다른 결과 보장
+        근접 레벨 추첨은 별도 시드 (같은 시드면 두 후보 목록에서 같은 순위 위치를 뽑게 됨)
         """
-        # 쿼리별 실행 횟수 추적
-        if query not in self.query_call_count:
-            self.query_call_count[query] = 0
-        self.query_call_count[query] += 1
-        
-        # 쿼리 + 실행 횟수로 시드 생성 (매번 다른 결과)
-        key = f"{query}:{self.query_call_count[query]}"
-        seed = int(hashlib.md5(key.encode()).hexdigest(), 16) & 0xFFFFFFFF
-        random.seed(seed)
+        # 쿼리별 실행 횟수 추적 + 시드 생성 (매번 다른 결과)
+        count = self.query_call_count.increment(query)
+        return stable_seed(query, count), stable_seed(query, count, "near")
     
-    def _query_hash_based_sample(self, candidates: List[Document], query: str, k: int) -> List[Document]:
+    def _query_hash_based_sample(self, candidates: List[Document], seed: int, k: int) -> List[Document]:
         """
-        쿼리 해시 기반 가중 랜덤 샘플링
-        - 같은 쿼리면 같은 단어 선택 (일관성)
-        - 다른 쿼리면 다른 단어 선택 (다양성 보장)
+        요청 시드 기반 가중 랜덤 샘플링
+        - 같은 (쿼리, 실행 횟수)면 같은 단어 선택 (재현 가능)
+        - 같은 쿼리를 반복하거나 다른 쿼리면 다른 단어 선택 (다양성 보장)
         - "블랙핑크 관련 중급" vs "스트레이키즈 관련 중급" → 다른 단어 선택
         """
         if not candidates:
             return []
         
-        # 쿼리 해시로 시드 생성 (쿼리별로 고유한 시드)
-        query_hash = int(hashlib.md5(query.encode()).hexdigest(), 16) & 0xFFFFFFFF
-        random.seed(query_hash)
-        
-        # 순위 기반 가중치 (상위 단어가 더 높은 확률, 하지만 랜덤성도 포함)
-        weights = [1/(i+1) for i in range(len(candidates))]
-        
-        picked = []
-        used_indices = set()
-        
-        while len(picked) < min(k, len(candidates)):
-            idx = random.choices(range(len(candidates)), weights=weights, k=1)[0]
-            if idx not in used_indices:
-                used_indices.add(idx)
-                picked.append(candidates[idx])
-        
-        return picked
+        # 순위 기반 가중치 1/(rank+1) Gumbel-top-k 비복원 샘플링 (재추출 없이 한 번에)
+        # 요청 시드 → 병렬 브랜치와 RNG 상태 공유 없음
+        picked_idx = rank_weighted_sample(len(candidates), k, seed)
+        return [candidates[i] for i in picked_idx]
 
     def _level_match(self, target_level: str, doc_level: str) -> bool:
         return target_level == doc_level
@@ -198,14 +235,14 @@ class TOPIKVocabularyRetriever:
         """
         BGE Reranker + 쿼리 해시 기반 다양성 보장 검색
         1. 앙상블로 80개 후보 수집
-        2. Reranker로 재정렬 (쿼리 관련성 고려)
+        2. 경량 1단계 점수로 레벨별 N개로 축소 → Reranker로 재정렬 (쿼리 관련성 고려)
         3. 난이도 필터링
-        4. 쿼리 해시 기반 가중 랜덤 샘플링 (쿼리별 다른 단어 보장)
+        4. 쿼리 + 실행 횟수 시드 기반 가중 랜덤 샘플링 (쿼리별/반복 실행마다 다른 단어 보장)
         
         예: "블랙핑크 관련 중급" vs "스트레이키즈 관련 중급" → 다른 단어 선택
         """
-        # 쿼리 해시로 시드 고정 (같은 쿼리면 같은 결과, 다른 쿼리면 다른 결과)
-        self._seed_from_query(query)
+        # 쿼리별 실행 횟수 갱신 + 샘플링 시드 (같은 쿼리도 실행마다 다른 결과, 전역 RNG 미사용)
+        seed, near_seed = self._seeds_from_query(query)
         
         retriever = self.retrievers.get(level)
         if not retriever:
@@ -214,14 +251,21 @@ class TOPIKVocabularyRetriever:
         # 1단계: 넓게 후보 수집
         docs = retriever.get_relevant_documents(query)
         docs = self._dedup_by_word(docs)[:80]
-        docs = self._filter_recent(docs)  # 전역 최근 단어 제외
-        docs = self._filter_recent_by_query(docs, query)  # 쿼리별 최근 단어 제외 (중복 방지)
+        # 전역 + 쿼리별 최근 단어를 한 번에 읽음 (외부 저장소도 요청당 읽기 1회)
+        session = self.recency_store.session([self.RECENT_GLOBAL_KEY, self._recent_query_key(query)])
+        docs = self._filter_recent(docs, session)  # 전역 최근 단어 제외
+        docs = self._filter_recent_by_query(docs, query, session)  # 쿼리별 최근 단어 제외 (중복 방지)
 
         if not docs:
             return []
 
-        # 2단계: BGE Reranker로 재정렬 (쿼리-단어 관련성 고려)
-        reranked = self.reranker.rerank(query, docs, top_k=30)
+        # 2단계: 경량 1단계 점수로 레벨별 상위 N개만 남기고 BGE Reranker로 재정렬
+        reranked = cascade_rerank(
+            self.reranker, query, docs, top_k=30,
+            keep=self.cascade.get("keep", {}).get(level),
+            rank_weight=self.cascade.get("rank_weight", 0.7),
+            stats=self.cascade_stats,
+        )
 
         # 3단계: 난이도 필터링
         exact = [d for d in reranked if self._level_match(level, d.metadata.get('difficulty_level', ''))]
@@ -231,19 +275,16 @@ class TOPIKVocabularyRetriever:
         picked = []
         if exact:
             # 실행 횟수 기반 샘플링 (같은 쿼리라도 매번 다른 단어)
-            picked += self._query_hash_based_sample(exact, query, k=5 - len(picked))
+            picked += self._query_hash_based_sample(exact, seed, k=5 - len(picked))
         if len(picked) < 5 and near:
-            picked += self._query_hash_based_sample(near, query, k=5 - len(picked))
+            picked += self._query_hash_based_sample(near, near_seed, k=5 - len(picked))
 
         picked = picked[:5]
 
-        # 최근 캐시 업데이트 (전역 + 쿼리별)
-        for d in picked:
-            w = d.metadata.get('word', '').strip()
-            if w:
-                self.recent_words.append(w)  # 전역 캐시
-                if query not in self.query_recent_words:
-                    self.query_recent_words[query] = deque(maxlen=50)
-                self.query_recent_words[query].append(w)  # 쿼리별 캐시
+        # 최근 캐시 업데이트 (전역 + 쿼리별, 한 번에 기록)
+        words = [w for w in (d.metadata.get('word', '').strip() for d in picked) if w]
+        session.add(self.RECENT_GLOBAL_KEY, words, self.RECENT_GLOBAL_SIZE)  # 전역 캐시
+        session.add(self._recent_query_key(query), words, self.RECENT_QUERY_SIZE)  # 쿼리별 캐시
+        session.commit()
 
         return picked
\ No newline at end of file
@@ -4,9 +4,325 @@ KFL-AQGen-AI Agentic RAG 에이전트
 K-pop 그룹 필터링 지원 추가
 """
 
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple
 from langchain_openai import ChatOpenAI
+import os
+import re
+import copy
 import json
+import time
+import atexit
+import threading
+import unicodedata
+from Retriever.gazetteer import AhoCorasick, CONCEPT_ALIASES, NAMED_ENTITY_TYPES, hangul_boundary
+from Retriever.lru_cache import LRUCache
+from utils import find_difficulty_keyword, normalize_group_type, DIFFICULTY_KEYWORDS
+
+
+class RuleBasedQueryAnalyzer:
+    """
+    규칙 기반 쿼리 분석기 (LLM 호출 없음)
+    난이도 키워드 + K-pop 개체 사전(gazetteer) + 역할/그룹 타입/데뷔 연도 규칙으로
+    QueryAnalysisAgent와 같은 구조의 결과를 만들고, 쿼리 토큰 중 규칙으로 설명된 비율을 신뢰도로 반환
+    - 별칭("하니", "정국")이나 영문 멤버명("Joy", "Han")으로만 잡힌 개체는 일반 단어일 수 있어
+      다른 K-pop 근거가 없으면 신뢰도를 낮춰 LLM으로 넘긴다
+    - 컨셉 표현("밝은", "에너지")은 다른 K-pop 근거가 있을 때만 필터로 사용
+    """
+    
+    KPOP_KEYWORDS = {
+        "케이팝", "kpop", "k-pop", "아이돌", "idol", "idols", "가사", "lyrics", "노래", "song", "songs",
+        "음악", "music", "가수", "singer", "그룹", "group", "groups", "멤버", "member", "members",
+        "소속사", "agency", "팬덤", "fandom", "컨셉", "concept", "concepts", "데뷔", "debut", "debuted",
+    }
+    ROLE_KEYWORDS = {
+        "래퍼": "rapper", "랩": "rapper", "rapper": "rapper", "rappers": "rapper",
+        "보컬": "vocal", "vocal": "vocal", "vocals": "vocal", "vocalist": "vocal",
+        "댄서": "dance", "댄스": "dance", "dancer": "dance", "dancers": "dance",
+    }
+    GROUP_TYPE_KEYWORDS = {
+        "걸그룹": "girl_group", "여자 아이돌": "girl_group", "girl group": "girl_group",
+        "보이그룹": "boy_group", "남자 아이돌": "boy_group", "boy group": "boy_group",
+    }
+    # 규칙 분석기에서만 쓰는 난이도 표현 (공용 DIFFICULTY_KEYWORDS보다 후순위)
+    EXTRA_DIFFICULTY_KEYWORDS = {"beginner": "basic", "middle": "intermediate"}
+    GRAMMAR_KEYWORDS = {"문법", "grammar", "패턴", "pattern", "표현"}
+    VOCABULARY_KEYWORDS = {"단어", "어휘", "vocabulary", "word", "words"}
+    # 분석 결과에 영향을 주지 않는 요청 표현 (이것만 남으면 규칙으로 충분히 해석된 것으로 본다)
+    FILLER_KEYWORDS = {
+        "문제", "문항", "퀴즈", "시험", "연습", "수준", "레벨", "난이도", "관련", "대한", "대해", "관한",
+        "만들어", "만들어줘", "만들어주세요", "만들어 줘", "생성", "생성해줘", "생성해주세요", "출제", "출제해줘",
+        "내줘", "주세요", "해줘", "해주세요", "한국어", "학습", "공부", "용", "들",
+        "create", "make", "generate", "give", "me", "some", "a", "an", "the", "of", "for", "about",
+        "on", "with", "and", "in", "to", "level", "korean", "practice", "question", "questions",
+        "quiz", "quizzes", "test", "exercise", "exercises", "please", "by", "from",
+    }
+    # 토큰 끝에 붙는 조사 (개체/키워드 제거 후 남은 조사는 설명된 것으로 처리)
+    PARTICLES = (
+        "에게서", "으로", "에서", "에게", "한테", "이랑", "하고", "까지", "부터", "처럼",
+        "의", "을", "를", "은", "는", "이", "가", "와", "과", "로", "도", "만", "랑", "에",
+    )
+    # K-pop 근거가 약한 언급(별칭/영문 멤버명)뿐일 때의 신뢰도 상한 (기본 fast path 임계값 0.8 미만)
+    ALIAS_ONLY_MAX_CONFIDENCE = 0.5
+    # 어절 경계를 확인하는 키워드 종류 ("노래방"의 "노래", "그룹화"의 "그룹" 제외)
+    BOUNDED_KINDS = {"kpop", "role", "group_type"}
+    DEBUT_YEAR_PATTERN = re.compile(r"((?:19|20)\d{2})\s*(?:년|년도)?")
+    
+    def __init__(self, gazetteer=None):
+        self.gazetteer = gazetteer
+        self._matcher = AhoCorasick()
+        keyword_tables = [
+            ("difficulty", {**self.EXTRA_DIFFICULTY_KEYWORDS,
+                            **{kw: level for level, kws in DIFFICULTY_KEYWORDS for kw in kws}}),
+            ("kpop", {kw: kw for kw in self.KPOP_KEYWORDS}),
+            ("role", self.ROLE_KEYWORDS),
+            ("group_type", self.GROUP_TYPE_KEYWORDS),
+            ("grammar", {kw: kw for kw in self.GRAMMAR_KEYWORDS}),
+            ("vocabulary", {kw: kw for kw in self.VOCABULARY_KEYWORDS}),
+            ("filler", {kw: kw for kw in self.FILLER_KEYWORDS}),
+        ]
+        for kind, table in keyword_tables:
+            for kw, value in table.items():
+                self._matcher.add(kw.lower(), (kind, value))
+        self._matcher.build()
+    
+    @staticmethod
+    def _is_word_char(ch: str) -> bool:
+        return ch.isascii() and ch.isalnum()
+    
+    def _keyword_spans(self, text: str) -> List[Tuple[int, int, str, str]]:
+        """키워드 매칭 (영문 키워드는 단어 경계 확인, 겹치면 긴 매칭 우선)"""
+        candidates = []
+        for start, end, pattern, (kind, value) in self._matcher.iter_matches(text):
+            if self._is_word_char(pattern[0]) and start > 0 and self._is_word_char(text[start - 1]):
+                continue
+            if self._is_word_char(pattern[-1]) and end < len(text) and self._is_word_char(text[end]):
+                continue
+            if kind in self.BOUNDED_KINDS and not hangul_boundary(text, start, end):
+                continue
+            candidates.append((start, end, kind, value))
+        candidates.sort(key=lambda x: (x[0], -(x[1] - x[0])))
+        spans, last_end = [], -1
+        for span in candidates:
+            if span[0] >= last_end:
+                spans.append(span)
+                last_end = span[1]
+        return spans
+    
+    def _strip_particles(self, token: str) -> str:
+        for particle in self.PARTICLES:
+            if token.endswith(particle):
+                return token[:-len(particle)]
+        return token
+    
+    def analyze(self, query: str) -> Tuple[Dict[str, Any], float]:
+        """
+        Returns:
+            (분석 결과, 신뢰도 0~1) - 결과 구조는 QueryAnalysisAgent.analyze와 동일
+        """
+        text = unicodedata.normalize("NFC", query or "")
+        lower = text.lower()
+        covered = [False] * len(text)
+        
+        filters = {
+            "groups": [], "members": [], "member_roles": [], "agencies": [], "fandoms": [],
+            "concepts": [], "debut_year": None, "group_type": None,
+        }
+        field_of = {"group": "groups", "member": "members", "agency": "agencies",
+                    "fandom": "fandoms", "concept": "concepts"}
+        needs_kpop = False
+        kpop_context = False  # 약한 언급(별칭/영문 멤버명) 외의 K-pop 근거 (그룹/소속사/팬덤 DB 표기, K-pop/역할/그룹 타입 키워드)
+        flags = set()
+        extra_difficulty = None
+        
+        def apply_mention(m):
+            field = filters[field_of[m.entity_type]]
+            if m.canonical not in field:
+                field.append(m.canonical)
+            covered[m.start:m.end] = [True] * (m.end - m.start)
+        
+        mentions = self.gazetteer.find_all(text) if self.gazetteer is not None else []
+        named = [m for m in mentions if m.entity_type in NAMED_ENTITY_TYPES]
+        for m in named:
+            apply_mention(m)
+            needs_kpop = True
+            kpop_context = kpop_context or not m.is_weak
+        
+        for start, end, kind, value in self._keyword_spans(lower):
+            if any(covered[start:end]):
+                continue
+            covered[start:end] = [True] * (end - start)
+            if kind == "role":
+                if value not in filters["member_roles"]:
+                    filters["member_roles"].append(value)
+                needs_kpop = kpop_context = True
+            elif kind == "group_type":
+                filters["group_type"] = value
+                needs_kpop = kpop_context = True
+            elif kind == "kpop":
+                needs_kpop = kpop_context = True
+            elif kind in ("grammar", "vocabulary"):
+                flags.add(kind)
+            elif kind == "difficulty" and extra_difficulty is None:
+                extra_difficulty = value
+        
+        for match in self.DEBUT_YEAR_PATTERN.finditer(text):
+            start, end = match.span()
+            if any(covered[start:end]):
+                continue
+            covered[start:end] = [True] * (end - start)
+            filters["debut_year"] = int(match.group(1))
+            needs_kpop = True
+        
+        # 컨셉은 다른 K-pop 근거가 있을 때만 필터로 사용 (없으면 주제 단어로 남김)
+        if needs_kpop:
+            for m in mentions:
+                if m.entity_type == "concept" and not any(covered[m.start:m.end]):
+                    apply_mention(m)
+        
+        # 규칙으로 설명되지 않은 토큰 = 남은 글자에서 조사/문장부호를 뗀 나머지
+        residual_text = "".join(" " if covered[i] else ch for i, ch in enumerate(text))
+        residual = []
+        for match in re.finditer(r"[^\s,.!?;:'\"()\[\]]+", residual_text):
+            token = self._strip_particles(match.group())
+            if not token or token.lower() in self.FILLER_KEYWORDS:
+                continue
+            start, end = match.span()
+            attached = (start > 0 and covered[start - 1]) or (end < len(text) and covered[end])
+            if attached and len(token) == 1:
+                continue  # 설명된 단어에 붙은 한 글자 어미 조각 ("만들어줘요"의 "요") - 주제로 쓰지 않음
+            residual.append(token)
+        total_tokens = len(text.split())
+        # 남은 내용어가 하나뿐이면 그대로 주제가 되므로 설명된 것으로 본다 ("음식 관련 중급 단어"의 "음식")
+        unexplained = 0 if len(residual) == 1 and len(residual[0]) >= 2 else len(residual)
+        confidence = 1.0 - unexplained / total_tokens if total_tokens else 0.0
+        if named and not kpop_context:
+            confidence = min(confidence, self.ALIAS_ONLY_MAX_CONFIDENCE)
+        
+        if residual:
+            topic = " ".join(residual)
+        elif needs_kpop:
+            topic = "K-pop"
+        elif "grammar" in flags:
+            topic = "grammar"
+        elif "vocabulary" in flags:
+            topic = "vocabulary"
+        else:
+            topic = "general"
+        
+        result = {
+            "difficulty": find_difficulty_keyword(text) or extra_difficulty or "basic",
+            "topic": topic,
+            "needs_kpop": needs_kpop,
+            "kpop_filters": filters,
+        }
+        return result, max(confidence, 0.0)
+
+
+class AnalysisResultCache:
+    """
+    쿼리 분석 결과 캐시
+    - 키: 정규화된 쿼리 (NFC + 공백 정리 + casefold)
+    - 크기 제한 LRU + TTL, persist_path를 주면 JSON 파일로 저장/복원
+      (저장 시각을 함께 기록해 재시작 후에도 원래 시각 기준으로 만료, 파일 쓰기는 flush_every개 변경마다 + 종료 시)
+    - K-pop 데이터 지문(fingerprint)이 바뀌면 전체 무효화 (프롬프트에 그룹 목록이 들어가므로)
+    """
+    
+    FORMAT_VERSION = 1
+    
+    def __init__(self, maxsize: int = 1024, ttl_seconds: Optional[float] = None,
+                 persist_path: Optional[str] = None, flush_every: int = 16):
+        self.ttl_seconds = ttl_seconds or None
+        self.persist_path = persist_path
+        self.flush_every = max(1, flush_every)
+        self.fingerprint: Optional[str] = None
+        self._cache = LRUCache(maxsize=maxsize, ttl_seconds=ttl_seconds)  # key -> (결과, 저장 시각 time.time())
+        self._lock = threading.Lock()
+        self._dirty = 0  # 마지막 파일 저장 이후 변경 수
+        self.stats = {"invalidations": 0, "saves": 0}
+        self._load()
+        if persist_path:
+            atexit.register(self.flush)
+    
+    @staticmethod
+    def normalize_key(query: str) -> str:
+        return " ".join(unicodedata.normalize("NFC", query or "").split()).casefold()
+    
+    def validate(self, fingerprint: str):
+        """데이터 지문이 달라졌으면 캐시 비우기"""
+        if fingerprint == self.fingerprint:
+            return
+        with self._lock:
+            if fingerprint == self.fingerprint:
+                return
+            if self.fingerprint is not None and len(self._cache):
+                self.stats["invalidations"] += 1
+                print("   ♻️ K-pop 데이터 변경 감지 - 쿼리 분석 캐시 초기화")
+            self._cache.clear()
+            self.fingerprint = fingerprint
+            self._dirty += 1
+    
+    def get(self, query: str) -> Optional[Dict[str, Any]]:
+        item = self._cache.get(self.normalize_key(query))
+        return copy.deepcopy(item[0]) if item is not None else None
+    
+    def put(self, query: str, result: Dict[str, Any]):
+        self._cache.put(self.normalize_key(query), (copy.deepcopy(result), time.time()))
+        with self._lock:
+            self._dirty += 1
+            due = self._dirty >= self.flush_every
+        if due:
+            self.flush()
+    
+    def flush(self):
+        """변경 사항이 있으면 파일에 저장"""
+        if self._dirty:
+            self._save()
+    
+    def snapshot_stats(self) -> Dict[str, Any]:
+        stats = self._cache.snapshot_stats()
+        stats.update(self.stats)
+        return stats
+    
+    def _load(self):
+        if not self.persist_path or not os.path.exists(self.persist_path):
+            return
+        try:
+            with open(self.persist_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("format_version") != self.FORMAT_VERSION:
+                return
+            now = time.time()
+            self.fingerprint = data.get("fingerprint")
+            for key, entry in data.get("entries", []):
+                # 파일에 저장된 시각 기준으로 이미 만료된 항목은 버린다
+                if self.ttl_seconds and now - entry["stored_at"] > self.ttl_seconds:
+                    continue
+                self._cache.put(key, (entry["result"], entry["stored_at"]),
+                                age_seconds=max(0.0, now - entry["stored_at"]))
+            print(f"   ✅ 쿼리 분석 캐시 로드: {len(self._cache)}개")
+        except Exception as e:
+            print(f"   ⚠️ 쿼리 분석 캐시 로드 실패 ({self.persist_path}): {e}")
+    
+    def _save(self):
+        if not self.persist_path:
+            return
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.persist_path)), exist_ok=True)
+            tmp_path = self.persist_path + ".tmp"
+            with self._lock:
+                # 스냅샷과 변경 수 초기화를 같은 락 안에서 (저장 중 들어온 변경은 다음 flush 대상)
+                entries = [
+                    [key, {"result": result, "stored_at": stored_at}]
+                    for key, (result, stored_at) in self._cache.items()
+                ]
+                data = {"format_version": self.FORMAT_VERSION, "fingerprint": self.fingerprint, "entries": entries}
+                self._dirty = 0
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(data, f, ensure_ascii=False)
+                os.replace(tmp_path, self.persist_path)
+                self.stats["saves"] += 1
+        except Exception as e:
+            print(f"   ⚠️ 쿼리 분석 캐시 저장 실패 ({self.persist_path}): {e}")
 
 
 class QueryAnalysisAgent:
@@ -16,9 +332,103 @@ class QueryAnalysisAgent:
     임베딩 기반 그룹명 자동 매칭 지원
     """
     
-    def __init__(self, llm=None, kpop_retriever=None):
+    def __init__(self, llm=None, kpop_retriever=None, fast_path: bool = True,
+                 fast_path_min_confidence: float = 0.8, cache_size: int = 1024,
+                 cache_ttl_seconds: Optional[float] = None, cache_path: Optional[str] = None,
+                 cache_flush_every: int = 16):
         self.llm = llm or ChatOpenAI(model="gpt-5", temperature=0)
         self.kpop_retriever = kpop_retriever  # 임베딩 기반 매칭을 위해 필요
+        # 규칙 기반 분석 신뢰도가 이 값 이상이면 LLM 호출 생략
+        self.rule_analyzer = (
+            RuleBasedQueryAnalyzer(getattr(kpop_retriever, 'gazetteer', None)) if fast_path else None
+        )
+        self.fast_path_min_confidence = fast_path_min_confidence
+        self.stats = {"fast_path": 0, "llm_path": 0, "cache_hits": 0}
+        # 같은 쿼리 반복 시 LLM 호출 + 표준화 과정 생략 (cache_size 0이면 비활성화)
+        self.result_cache = (
+            AnalysisResultCache(cache_size, cache_ttl_seconds, cache_path, cache_flush_every) if cache_size else None
+        )
+        # 소문자 → DB 표기 표준화 사전 (K-pop 데이터 지문이 바뀔 때만 재구축)
+        self._canonical_maps: Dict[str, Dict[str, str]] = {}
+        self._canonical_fingerprint: Optional[str] = None
+        self._ensure_canonical_maps()
+    
+    def _ensure_canonical_maps(self) -> Dict[str, Dict[str, str]]:
+        """K-pop 데이터가 다시 로드되었으면(지문 변경) 표준화 사전과 규칙 분석기의 개체 사전 갱신"""
+        fingerprint = getattr(self.kpop_retriever, 'data_fingerprint', '')
+        if self._canonical_fingerprint != fingerprint or not self._canonical_maps:
+            self._canonical_maps = self._build_canonical_maps()
+            self._canonical_fingerprint = fingerprint
+            if self.rule_analyzer is not None:
+                self.rule_analyzer.gazetteer = getattr(self.kpop_retriever, 'gazetteer', None)
+        return self._canonical_maps
+    
+    def _build_canonical_maps(self) -> Dict[str, Dict[str, str]]:
+        """
+        소문자 표기/별칭 → DB 표기 사전
+        - members: 멤버명 + 한글 별칭
+        - agencies: 소속사명 + 첫 단어("YG", "JYP") + 소속사 별칭
+        - fandoms / concepts: 이름 + 별칭 (컨셉은 한국어 표현 포함)
+        """
+        maps = {"members": {}, "agencies": {}, "agency_names": {}, "fandoms": {}, "concepts": {}}
+        if not self.kpop_retriever or not hasattr(self.kpop_retriever, 'kpop_data'):
+            return maps
+        
+        def add(table: str, surface: str, canonical: str):
+            key = unicodedata.normalize("NFC", surface or "").strip().lower()
+            if key:
+                maps[table].setdefault(key, canonical)
+        
+        first_tokens: Dict[str, set] = {}
+        for doc in self.kpop_retriever.kpop_data:
+            meta = doc.metadata
+            for m in meta.get('members', []) or []:
+                if isinstance(m, dict) and m.get('name'):
+                    add("members", m['name'], m['name'])
+                    for alias in m.get('aliases', []) or []:
+                        add("members", alias, m['name'])
+            agency = meta.get('agency', '')
+            if agency:
+                add("agencies", agency, agency)
+                add("agency_names", agency, agency)
+                for alias in meta.get('agency_aliases', []) or []:
+                    add("agencies", alias, agency)
+                first_tokens.setdefault(agency.split()[0].lower(), set()).add(agency)
+            fandom = meta.get('fandom', '')
+            if fandom:
+                add("fandoms", fandom, fandom)
+                for alias in meta.get('fandom_aliases', []) or []:
+                    add("fandoms", alias, fandom)
+            for c in meta.get('concepts', []) or []:
+                if isinstance(c, str) and c:
+                    add("concepts", c, c)
+        
+        # 첫 단어가 한 소속사에만 해당할 때만 별칭으로 사용 (모호하면 제외)
+        for token, agencies in first_tokens.items():
+            if len(agencies) == 1:
+                add("agencies", token, next(iter(agencies)))
+        for alias, concept in CONCEPT_ALIASES.items():
+            if concept in maps["concepts"]:
+                add("concepts", alias, maps["concepts"][concept])
+        return maps
+    
+    @staticmethod
+    def _canonicalize(table: Dict[str, str], value: str) -> str:
+        """사전에 있으면 DB 표기, 없으면 원본 (LLM이 이미 표준 이름으로 추출했을 수 있음)"""
+        value = value.strip()
+        return table.get(unicodedata.normalize("NFC", value).lower(), value)
+    
+    @staticmethod
+    def _canonicalize_agency(maps: Dict[str, Dict[str, str]], value: str) -> str:
+        """소속사: 사전 조회 후 실패하면 서로 다른 소속사명에 대해서만 부분 일치 확인"""
+        value = value.strip()
+        key = unicodedata.normalize("NFC", value).lower()
+        if key in maps["agencies"]:
+            return maps["agencies"][key]
+        for name_lower, name in maps["agency_names"].items():
+            if key in name_lower or name_lower in key:
+                return name
+        return value
     
     def analyze(self, query: str) -> Dict[str, Any]:
         """
@@ -34,6 +444,37 @@ class QueryAnalysisAgent:
             - needs_kpop: Whether K-pop content is relevant (true/false)
             - kpop_groups: List of specific K-pop groups mentioned 
         """
+        if self.result_cache is not None:
+            self.result_cache.validate(getattr(self.kpop_retriever, 'data_fingerprint', ''))
+            cached = self.result_cache.get(query)
+            if cached is not None:
+                self.stats["cache_hits"] += 1
+                print("   ⚡ 쿼리 분석 캐시 적중")
+                return cached
+        
+        result = None
+        if self.rule_analyzer is not None:
+            result, confidence = self.rule_analyzer.analyze(query)
+            if confidence >= self.fast_path_min_confidence:
+                self.stats["fast_path"] += 1
+                print(f"   ⚡ 규칙 기반 분석 사용 (신뢰도 {confidence:.2f}, LLM 호출 생략)")
+            else:
+                result = None
+        if result is None:
+            self.stats["llm_path"] += 1
+            result, parsed = self._analyze_with_llm(query)
+            if not parsed:
+                return result  # 파싱 실패한 기본값은 캐시하지 않는다
+        
+        if self.result_cache is not None:
+            self.result_cache.put(query, result)
+        return result
+    
+    def _analyze_with_llm(self, query: str) -> Tuple[Dict[str, Any], bool]:
+        """
+        LLM으로 쿼리 분석 후 그룹/멤버/소속사/컨셉을 DB 표기로 표준화
+        Returns: (분석 결과, JSON 파싱 성공 여부)
+        """
         # DB에서 실제 그룹명 리스트 가져오기 (프롬프트 개선용)
         available_groups_list = []
         if self.kpop_retriever and hasattr(self.kpop_retriever, 'kpop_data'):
@@ -173,114 +614,24 @@ Respond ONLY with valid JSON, no additional text.
             
             filters['groups'] = list(normalized_groups)
             
-            # 멤버 이름 표준화 (K-pop 데이터에서 동적 추출)
+            # 멤버/소속사/팬덤/컨셉 표준화 (생성 시 한 번 만든 소문자 → DB 표기 사전 조회)
+            maps = self._ensure_canonical_maps()
+            
             if 'members' not in filters:
                 filters['members'] = []
-            normalized_members = []
-            if self.kpop_retriever and hasattr(self.kpop_retriever, 'kpop_data'):
-                # K-pop 데이터에서 모든 멤버 이름 추출
-                all_member_names = set()
-                for doc in self.kpop_retriever.kpop_data:
-                    member_names = doc.metadata.get('member_names', [])
-                    all_member_names.update([name.lower() for name in member_names if name])
-                
-                # 쿼리에서 추출한 멤버명을 실제 데이터와 매칭
-                for m in filters.get('members', []):
-                    m_lower = m.lower().strip()
-                    # 정확히 일치하는 경우
-                    if m_lower in all_member_names:
-                        # 원본 대소문자 찾기
-                        for doc in self.kpop_retriever.kpop_data:
-                            member_names = doc.metadata.get('member_names', [])
-                            for name in member_names:
-                                if name.lower() == m_lower:
-                                    normalized_members.append(name)
-                                    break
-                            if normalized_members and normalized_members[-1].lower() == m_lower:
-                                break
-                    else:
-                        # 일치하지 않으면 원본 사용 (LLM이 이미 표준 이름으로 추출했을 수 있음)
-                        normalized_members.append(m)
-            else:
-                # kpop_retriever가 없으면 원본 사용
-                normalized_members = filters.get('members', [])
-            filters['members'] = list(set(normalized_members))
+            filters['members'] = list({self._canonicalize(maps['members'], m) for m in filters['members'] if m.strip()})
             
-            # 소속사 표준화 (K-pop 데이터에서 동적 추출)
             if 'agencies' not in filters:
                 filters['agencies'] = []
-            normalized_agencies = []
-            if self.kpop_retriever and hasattr(self.kpop_retriever, 'kpop_data'):
-                # K-pop 데이터에서 모든 소속사 추출
-                all_agencies = set()
-                for doc in self.kpop_retriever.kpop_data:
-                    agency = doc.metadata.get('agency', '')
-                    if agency:
-                        all_agencies.add(agency.lower())
-                
-                # 쿼리에서 추출한 소속사를 실제 데이터와 매칭
-                for a in filters.get('agencies', []):
-                    a_lower = a.lower().strip()
-                    # 부분 일치 검색
-                    matched = False
-                    for agency_lower in all_agencies:
-                        if a_lower in agency_lower or agency_lower in a_lower:
-                            # 원본 대소문자 찾기
-                            for doc in self.kpop_retriever.kpop_data:
-                                agency = doc.metadata.get('agency', '')
-                                if agency and agency.lower() == agency_lower:
-                                    normalized_agencies.append(agency)
-                                    matched = True
-                                    break
-                            if matched:
-                                break
-                    if not matched:
-                        # 일치하지 않으면 원본 사용
-                        normalized_agencies.append(a)
-            else:
-                # kpop_retriever가 없으면 원본 사용
-                normalized_agencies = filters.get('agencies', [])
-            filters['agencies'] = list(set(normalized_agencies))
+            filters['agencies'] = list({self._canonicalize_agency(maps, a) for a in filters['agencies'] if a.strip()})
             
-            # 팬덤 표준화
             if 'fandoms' not in filters:
                 filters['fandoms'] = []
-            filters['fandoms'] = [f.strip() for f in filters.get('fandoms', []) if f.strip()]
+            filters['fandoms'] = list({self._canonicalize(maps['fandoms'], f) for f in filters['fandoms'] if f.strip()})
             
-            # 컨셉 표준화 (K-pop 데이터에서 동적 추출)
             if 'concepts' not in filters:
                 filters['concepts'] = []
-            normalized_concepts = []
-            if self.kpop_retriever and hasattr(self.kpop_retriever, 'kpop_data'):
-                # K-pop 데이터에서 모든 컨셉 추출
-                all_concepts = set()
-                for doc in self.kpop_retriever.kpop_data:
-                    concepts = doc.metadata.get('concepts', [])
-                    if isinstance(concepts, list):
-                        all_concepts.update([c.lower() for c in concepts if isinstance(c, str)])
-                
-                # 쿼리에서 추출한 컨셉을 실제 데이터와 매칭
-                for concept in filters.get('concepts', []):
-                    concept_lower = concept.lower().strip()
-                    # 정확히 일치하는 경우
-                    if concept_lower in all_concepts:
-                        # 원본 대소문자 찾기
-                        for doc in self.kpop_retriever.kpop_data:
-                            concepts = doc.metadata.get('concepts', [])
-                            if isinstance(concepts, list):
-                                for c in concepts:
-                                    if isinstance(c, str) and c.lower() == concept_lower:
-                                        normalized_concepts.append(c)
-                                        break
-                            if normalized_concepts and normalized_concepts[-1].lower() == concept_lower:
-                                break
-                    else:
-                        # 일치하지 않으면 원본 사용 (LLM이 이미 표준 이름으로 추출했을 수 있음)
-                        normalized_concepts.append(concept)
-            else:
-                # kpop_retriever가 없으면 원본 사용
-                normalized_concepts = filters.get('concepts', [])
-            filters['concepts'] = list(set(normalized_concepts))
+            filters['concepts'] = list({self._canonicalize(maps['concepts'], c) for c in filters['concepts'] if c.strip()})
             
             # 데뷔 연도 정수 변환
             if 'debut_year' not in filters:
@@ -295,16 +646,10 @@ Respond ONLY with valid JSON, no additional text.
             if 'group_type' not in filters:
                 filters['group_type'] = None
             if filters.get('group_type'):
-                gt = filters['group_type'].lower().strip()
-                if gt in ['girl_group', 'girl group', '걸그룹']:
-                    filters['group_type'] = 'girl_group'
-                elif gt in ['boy_group', 'boy group', '보이그룹']:
-                    filters['group_type'] = 'boy_group'
-                else:
-                    filters['group_type'] = None
+                filters['group_type'] = normalize_group_type(filters['group_type'])
             
             result['kpop_filters'] = filters
-            return result
+            return result, True
         except json.JSONDecodeError:
             # Default fallback
             return {
@@ -320,7 +665,7 @@ Respond ONLY with valid JSON, no additional text.
                     "debut_year": None,
                     "group_type": None
                 }
-            }
+            }, False
     
     def _normalize_group_name(self, group_name: str) -> str | None:
         """
@@ -0,0 +1,167 @@
+"""
+Reranker 백엔드 벤치마크 CLI
+TOPIK 어휘 / 문법 코퍼스에서 실제 앙상블 후보를 뽑아 같은 (질의, 후보) 쌍을
+PyTorch fp32 백엔드와 ONNX int8 CPU 백엔드로 각각 점수 매기고
+지연 시간(평균/p50/p95)과 top-k 일치도를 비교한다.
+
+사용 예:
+    python benchmark_reranker.py
+    python benchmark_reranker.py --top-k 10 --repeat 3
+    python benchmark_reranker.py --bundle bundles/20250301-ab12cd34
+
+일치도 지표:
+- overlap@k: fp32 상위 k개와 int8 상위 k개의 교집합 비율
+- top1: 1위 후보가 같은 비율
+- spearman: 후보 전체 순위의 스피어만 상관계수
+- 캐스케이드: CASCADE_CONFIG의 1단계로 남긴 N개만 fp32로 재정렬했을 때의 overlap@k와 쌍 감소율
+"""
+
+import time
+import argparse
+import numpy as np
+from dotenv import load_dotenv
+from Retriever.vocabulary_retriever import TOPIKVocabularyRetriever
+from Retriever.grammar_retriever import GrammarRetriever
+from Retriever.reranker import create_scorer, reranker_available
+from Retriever.cascade import first_stage_order
+from Retriever.embeddings import configure_embeddings
+from config import (
+    TOPIK_PATHS, GRAMMAR_PATHS, INDEX_CACHE_DIR, EMBEDDING_CONFIG, RERANKER_CONFIG, RETRIEVAL_BUNDLE_DIR,
+    CASCADE_CONFIG
+)
+
+load_dotenv()
+
+# 실제 파이프라인에서 자주 나오는 형태의 주제 질의
+DEFAULT_QUERIES = {
+    "vocabulary": ["음식", "여행", "학교 생활", "가족", "날씨", "쇼핑", "병원", "취미", "콘서트", "회사 생활"],
+    "grammar": ["이유", "추측", "조건", "경험", "목적", "대조", "희망", "의무", "인용", "시간 순서"],
+}
+
+
+def collect_candidates(retriever, queries, candidates: int):
+    """레벨별 앙상블 후보 수집 → (코퍼스 내 레벨, 질의, 후보 텍스트) 목록"""
+    cases = []
+    for level in retriever.retrievers:
+        for query in queries:
+            docs = retriever.retrievers[level].get_relevant_documents(query)[:candidates]
+            if len(docs) >= 2:
+                cases.append((level, query, [d.page_content for d in docs]))
+    return cases
+
+
+def _ranks(scores: np.ndarray) -> np.ndarray:
+    ranks = np.empty(len(scores))
+    ranks[np.argsort(-scores, kind="stable")] = np.arange(len(scores))
+    return ranks
+
+
+def agreement(ref: list, test: list, k: int) -> dict:
+    ref, test = np.asarray(ref, dtype=np.float64), np.asarray(test, dtype=np.float64)
+    k = min(k, len(ref))
+    ref_top = set(np.argsort(-ref, kind="stable")[:k].tolist())
+    test_top = set(np.argsort(-test, kind="stable")[:k].tolist())
+    spearman = float(np.corrcoef(_ranks(ref), _ranks(test))[0, 1]) if len(ref) > 2 else 1.0
+    return {
+        "overlap": len(ref_top & test_top) / k,
+        "top1": float(np.argmax(ref) == np.argmax(test)),
+        "spearman": spearman,
+    }
+
+
+def time_scorer(scorer, cases, repeat: int):
+    """케이스별 (마지막 점수, 반복 중 최소 지연) - 최소값으로 일시적 노이즈 제거"""
+    scores, latencies = [], []
+    for _, query, texts in cases:
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = scorer.score(query, texts)
+            best = min(best, time.perf_counter() - start)
+        scores.append(result)
+        latencies.append(best)
+    return scores, latencies
+
+
+def cascade_agreement(cases, ref_scores, cascade: dict, k: int):
+    """1단계로 남긴 후보 안에서의 fp32 상위 k vs 전체 후보 fp32 상위 k → (평균 overlap@k, 쌍 감소율)"""
+    overlaps, total, heavy = [], 0, 0
+    for (level, query, texts), scores in zip(cases, ref_scores):
+        keep = cascade.get("keep", {}).get(level) or len(texts)
+        kept = first_stage_order(query, texts, cascade.get("rank_weight", 0.7))[:keep]
+        top = min(k, len(kept))
+        full_top = set(np.argsort(-np.asarray(scores), kind="stable")[:top].tolist())
+        cascade_top = set(sorted(kept, key=lambda i: scores[i], reverse=True)[:top])
+        overlaps.append(len(full_top & cascade_top) / top)
+        total += len(texts)
+        heavy += len(kept)
+    return float(np.mean(overlaps)), total / max(heavy, 1)
+
+
+def summarize(name: str, cases, ref_scores, ref_lat, test_scores, test_lat, k: int, cascade: dict = None):
+    ref_lat, test_lat = np.asarray(ref_lat) * 1000, np.asarray(test_lat) * 1000
+    metrics = [agreement(r, t, k) for r, t in zip(ref_scores, test_scores)]
+    pairs = sum(len(texts) for _, _, texts in cases)
+    print(f"\n📊 [{name}] 케이스 {len(cases)}개 / 쌍 {pairs}개")
+    print(f"   {'백엔드':<10}{'평균(ms)':>10}{'p50(ms)':>10}{'p95(ms)':>10}")
+    for label, lat in (("fp32", ref_lat), ("onnx_int8", test_lat)):
+        print(f"   {label:<10}{lat.mean():>10.1f}{np.percentile(lat, 50):>10.1f}{np.percentile(lat, 95):>10.1f}")
+    print(f"   속도 향상: {ref_lat.mean() / max(test_lat.mean(), 1e-9):.2f}x")
+    print(f"   overlap@{k}: {np.mean([m['overlap'] for m in metrics]):.3f} | "
+          f"top1: {np.mean([m['top1'] for m in metrics]):.3f} | "
+          f"spearman: {np.mean([m['spearman'] for m in metrics]):.3f}")
+    by_level = {}
+    for (level, _, _), m in zip(cases, metrics):
+        by_level.setdefault(level, []).append(m["overlap"])
+    for level, values in by_level.items():
+        print(f"     └─ {level}: overlap@{k} {np.mean(values):.3f}")
+    if cascade:
+        overlap, reduction = cascade_agreement(cases, ref_scores, cascade, k)
+        print(f"   캐스케이드 (fp32): overlap@{k} {overlap:.3f} | cross-encoder 쌍 {reduction:.2f}x 감소")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reranker fp32 vs ONNX int8 지연/일치도 벤치마크")
+    parser.add_argument("--candidates", type=int, default=80, help="질의당 재정렬할 앙상블 후보 수")
+    parser.add_argument("--top-k", type=int, default=5, help="일치도를 비교할 상위 k")
+    parser.add_argument("--repeat", type=int, default=1, help="케이스별 반복 횟수 (최소 지연 사용)")
+    parser.add_argument("--bundle", default=RETRIEVAL_BUNDLE_DIR, help="오프라인 빌드 번들 경로 (없으면 원본 데이터로 빌드)")
+    args = parser.parse_args()
+
+    for backend in ("torch", "onnx_int8"):
+        if not reranker_available(backend):
+            raise SystemExit(f"❌ '{backend}' 백엔드에 필요한 패키지가 설치되지 않았습니다.")
+
+    configure_embeddings(**EMBEDDING_CONFIG)
+    print("\n📚 후보 수집 중...")
+    corpora = {
+        "TOPIK 어휘": (collect_candidates(
+            TOPIKVocabularyRetriever(TOPIK_PATHS, cache_dir=INDEX_CACHE_DIR, bundle_dir=args.bundle),
+            DEFAULT_QUERIES["vocabulary"], args.candidates), CASCADE_CONFIG.get("vocabulary")),
+        "문법": (collect_candidates(
+            GrammarRetriever(GRAMMAR_PATHS, use_reranker=False, bundle_dir=args.bundle),
+            DEFAULT_QUERIES["grammar"], args.candidates), CASCADE_CONFIG.get("grammar")),
+    }
+
+    options = dict(batch_size=RERANKER_CONFIG.get("batch_size", 16),
+                   max_length=RERANKER_CONFIG.get("max_length", 256))
+    print("\n🔧 Reranker 로드 중...")
+    fp32 = create_scorer(RERANKER_CONFIG["model_name"], "torch", **options)
+    int8 = create_scorer(RERANKER_CONFIG["model_name"], "onnx_int8", **options,
+                         onnx_dir=RERANKER_CONFIG.get("onnx_dir"),
+                         quantization=RERANKER_CONFIG.get("quantization", "avx2"))
+
+    for name, (cases, cascade) in corpora.items():
+        if not cases:
+            print(f"\n⚠️ [{name}] 후보가 없어 건너뜀")
+            continue
+        # 워밍업 (첫 호출의 그래프 초기화/메모리 할당 제외)
+        fp32.score(cases[0][1], cases[0][2])
+        int8.score(cases[0][1], cases[0][2])
+        ref_scores, ref_lat = time_scorer(fp32, cases, args.repeat)
+        test_scores, test_lat = time_scorer(int8, cases, args.repeat)
+        summarize(name, cases, ref_scores, ref_lat, test_scores, test_lat, args.top_k, cascade)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+오프라인 인덱스 빌드 CLI
+TOPIK 어휘 / 문법 / K-pop 데이터를 읽어 모든 벡터 인덱스, BM25 통계,
+그룹명 인덱스를 만들고 버전이 붙은 번들 디렉토리 하나로 저장한다.
+
+사용 예:
+    python build_bundle.py --out bundles
+    python build_bundle.py --out bundles --version 2025-03-release
+
+서빙 노드에서는 config.RETRIEVAL_BUNDLE_DIR에 번들 경로를 지정하면
+임베딩 호출 없이 리트리버가 생성된다.
+"""
+
+import os
+import shutil
+import argparse
+from datetime import datetime, timezone
+from dotenv import load_dotenv
+from Retriever.vocabulary_retriever import TOPIKVocabularyRetriever
+from Retriever.grammar_retriever import GrammarRetriever
+from Retriever.kpop_retriever import KpopSentenceRetriever
+from Retriever.index_cache import compute_data_hash
+from Retriever.bundle import write_manifest, BUNDLE_FORMAT_VERSION
+from Retriever.embeddings import configure_embeddings, embedding_cache_stats
+from config import TOPIK_PATHS, GRAMMAR_PATHS, KPOP_JSON_PATH, INDEX_CACHE_DIR, EMBEDDING_CONFIG
+
+load_dotenv()
+
+
+def default_version() -> str:
+    """날짜 + 전체 데이터 해시 기반 기본 버전명"""
+    all_paths = [p for paths in TOPIK_PATHS.values() for p in paths]
+    all_paths += list(GRAMMAR_PATHS.values()) + [KPOP_JSON_PATH]
+    date = datetime.now(timezone.utc).strftime("%Y%m%d")
+    return f"{date}-{compute_data_hash(all_paths)[:8]}"
+
+
+def build_bundle(out_dir: str, version: str, force: bool = False) -> str:
+    """세 리트리버를 빌드하여 <out_dir>/<version> 번들로 저장"""
+    bundle_dir = os.path.join(out_dir, version)
+    if os.path.exists(bundle_dir):
+        if not force:
+            raise FileExistsError(f"번들이 이미 존재합니다: {bundle_dir} (--force로 덮어쓰기)")
+        shutil.rmtree(bundle_dir)
+
+    # 임시 디렉토리에 먼저 쓰고 완료 후 이름 변경 (부분 번들 배포 방지)
+    staging_dir = bundle_dir + ".tmp"
+    if os.path.exists(staging_dir):
+        shutil.rmtree(staging_dir)
+    os.makedirs(staging_dir)
+
+    print("\n📚 인덱스 빌드 중...")
+    print("   ├─ TOPIK 어휘 데이터베이스")
+    topik_retriever = TOPIKVocabularyRetriever(TOPIK_PATHS, cache_dir=INDEX_CACHE_DIR)
+    print("   ├─ 문법 패턴 데이터베이스")
+    grammar_retriever = GrammarRetriever(GRAMMAR_PATHS, use_reranker=False)
+    print("   └─ K-pop 학습 자료 데이터베이스")
+    kpop_retriever = KpopSentenceRetriever(KPOP_JSON_PATH)
+
+    print("\n💾 번들 저장 중...")
+    components = {
+        "vocabulary": topik_retriever.export_to_bundle(staging_dir),
+        "grammar": grammar_retriever.export_to_bundle(staging_dir),
+        "kpop": kpop_retriever.export_to_bundle(staging_dir),
+    }
+    write_manifest(staging_dir, {
+        "format_version": BUNDLE_FORMAT_VERSION,
+        "version": version,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "sources": {
+            "topik": TOPIK_PATHS,
+            "grammar": GRAMMAR_PATHS,
+            "kpop": KPOP_JSON_PATH,
+        },
+        "components": components,
+    })
+    os.rename(staging_dir, bundle_dir)
+    return bundle_dir
+
+
+def main():
+    parser = argparse.ArgumentParser(description="검색 번들(벡터 인덱스 + BM25 + 그룹명 인덱스) 오프라인 빌드")
+    parser.add_argument("--out", default="bundles", help="번들을 저장할 상위 디렉토리")
+    parser.add_argument("--version", default=None, help="번들 버전명 (기본: 날짜-데이터해시)")
+    parser.add_argument("--force", action="store_true", help="같은 버전 번들이 있으면 덮어쓰기")
+    args = parser.parse_args()
+
+    # 이전 빌드에서 임베딩한 텍스트는 캐시에서 재사용 (변경된 행만 새로 임베딩)
+    configure_embeddings(**EMBEDDING_CONFIG)
+    version = args.version or default_version()
+    bundle_dir = build_bundle(args.out, version, force=args.force)
+    print(f"\n✅ 번들 빌드 완료: {bundle_dir}")
+    for model, stats in embedding_cache_stats().items():
+        print(f"   임베딩 캐시 [{model}]: 적중 {stats['hits']}회 / 미스 {stats['misses']}회")
+
+
+if __name__ == "__main__":
+    main()
@@ -21,5 +21,67 @@ LLM_CONFIG = {
     'max_completion_tokens': 1000,
 }
 
+# 쿼리 분석 설정 (규칙 기반 분석 신뢰도가 임계값 이상이면 LLM 호출 생략)
+QUERY_ANALYSIS_CONFIG = {
+    'fast_path': True,
+    'fast_path_min_confidence': 0.8,   # 쿼리 토큰 중 규칙(난이도/개체 사전/키워드)으로 설명된 비율 (주제 명사 하나는 설명된 것으로 봄)
+    'cache_size': 1024,                # 분석 결과 캐시 크기 (0이면 비활성화)
+    'cache_ttl_seconds': 86400,        # 분석 결과 유효 시간 (None이면 만료 없음)
+    'cache_path': r'cache\query_analysis.json',  # 분석 결과 캐시 파일 (None이면 메모리만 사용)
+    'cache_flush_every': 16,           # 캐시 파일 저장 주기 (변경 N건마다 + 종료 시)
+}
+
 # Kpop 데이터 설정
-KPOP_JSON_PATH = r'data\kpop\kpop_db.json'
\ No newline at end of file
+KPOP_JSON_PATH = r'data\kpop\kpop_db.json'
+
+# FAISS 인덱스 캐시 디렉토리 (데이터 내용 해시 + 임베딩 모델명으로 구분)
+INDEX_CACHE_DIR = r'cache\faiss'
+
+# 임베딩 설정 (인덱스 빌드와 쿼리 임베딩에 공통 적용)
+EMBEDDING_CONFIG = {
+    'backend': 'openai',       # 'openai' | 'sentence_transformers' (CPU 로컬) | 'hashed' (해시 n-gram, 오프라인)
+    'model': None,             # 로컬 백엔드 모델명 (None이면 기본값)
+    'dimensions': 512,         # hashed 백엔드 벡터 차원
+    'cache_path': r'cache\embeddings.sqlite',  # 임베딩 캐시 파일 (None이면 메모리 캐시)
+}
+
+# 오프라인 빌드 번들 경로 (build_bundle.py 산출물, None이면 서빙 시 직접 인덱스 생성)
+RETRIEVAL_BUNDLE_DIR = None
+
+# Reranker 설정
+RERANKER_CONFIG = {
+    'model_name': 'BAAI/bge-reranker-v2-m3',
+    'warmup_on_startup': False,   # 시작 직후 백그라운드 스레드에서 더미 배치로 워밍업
+    'idle_unload_seconds': 0,     # 이 시간(초) 동안 미사용 시 모델 언로드 (0이면 비활성화)
+    'batch_size': 16,             # 길이순 정렬 후 mini-batch 크기
+    'max_length': 256,            # (질의, 문서) 쌍 최대 토큰 수 (TOPIK/문법 문서는 짧아 512 불필요)
+    'score_cache_size': 50000,    # (모델, 질의, 문서) 점수 캐시 크기 (0이면 비활성화)
+    'backend': 'torch',           # 'torch' (fp32, GPU 가능) | 'onnx_int8' (ONNX int8 CPU, optimum 필요)
+    'onnx_dir': r'cache\onnx',     # onnx_int8 변환/양자화 모델 저장 위치 (최초 1회 생성)
+    'quantization': 'avx2',       # int8 양자화 프리셋: avx2 / avx512 / avx512_vnni / arm64
+    'doc_token_cache_size': 100000,   # 문서 토큰 id 캐시 크기 (코퍼스가 고정이라 질의만 토크나이즈)
+    'pretokenize_on_startup': False,  # 리트리버 초기화 직후 어휘/문법 문서 토큰 캐시 미리 채우기 (모델 로드 포함)
+}
+
+# 중복 방지용 최근 항목 기록 (최근 단어/문법)
+RECENCY_CONFIG = {
+    'backend': 'memory',               # 'memory' (프로세스) | 'sqlite' (로컬 파일, 워커 간 공유) | 'kv' (키-값 서버)
+    'max_tracked_queries': 10000,      # 추적할 최대 쿼리 수 (LRU, 초과 시 오래된 쿼리 기록 제거)
+    'sqlite_path': r'cache\recency.sqlite',
+    'kv_namespace': 'kfl:recency',     # kv 백엔드 키 접두사
+    'kv_ttl_seconds': 30 * 86400,      # kv 백엔드 키 만료 (키 수 제한 대신 서버 TTL 사용)
+}
+
+# 2단계 캐스케이드 재정렬: 경량 1단계 점수(앙상블 순위 + 글자 bigram 겹침)로
+# 레벨별 상위 N개만 cross-encoder에 보냄 (어휘 80개 → 24개, 문법 최대 100개 → 15개)
+CASCADE_CONFIG = {
+    'vocabulary': {
+        'keep': {'basic': 24, 'intermediate': 24, 'advanced': 24},
+        'rank_weight': 0.7,   # 앙상블 순위 점수 비중 (나머지는 질의-문서 bigram 겹침)
+    },
+    'grammar': {
+        # 재정렬 top_k(30)보다 작아야 실제로 쌍이 줄어듦 (샘플링 10개 이상 유지)
+        'keep': {'basic': 15, 'intermediate': 15, 'advanced': 15},
+        'rank_weight': 0.7,
+    },
+}
\ No newline at end of file
@@ -9,9 +9,15 @@ from langchain_core.runnables import RunnableConfig
 from Retriever.vocabulary_retriever import TOPIKVocabularyRetriever
 from Retriever.grammar_retriever import GrammarRetriever
 from Retriever.kpop_retriever import KpopSentenceRetriever
+from Retriever.reranker import configure_reranker, get_reranker, reranker_available
+from Retriever.recency_store import create_recency_store
+from Retriever.embeddings import configure_embeddings, embedding_cache_stats
 
 from Ragsystem.graph_agentic_router import RouterAgenticGraph
-from config import TOPIK_PATHS, GRAMMAR_PATHS, KPOP_JSON_PATH
+from config import (
+    TOPIK_PATHS, GRAMMAR_PATHS, KPOP_JSON_PATH, INDEX_CACHE_DIR, RETRIEVAL_BUNDLE_DIR, RERANKER_CONFIG,
+    EMBEDDING_CONFIG, CASCADE_CONFIG, RECENCY_CONFIG
+)
 from test_maker import create_korean_test_set
 
 load_dotenv()
@@ -25,15 +31,55 @@ def main():
     print("   KFL-AQGen-AI with Intelligent Router")
     print("="*80)
     
+    # 임베딩 캐시 설정 (모든 리트리버가 같은 캐시를 공유)
+    configure_embeddings(**EMBEDDING_CONFIG)
+
+    # Reranker 수명주기 설정 (모델은 첫 사용 시 또는 워밍업 시 로드)
+    configure_reranker(
+        RERANKER_CONFIG['model_name'],
+        idle_unload_seconds=RERANKER_CONFIG.get('idle_unload_seconds', 0),
+        batch_size=RERANKER_CONFIG.get('batch_size', 16),
+        max_length=RERANKER_CONFIG.get('max_length', 256),
+        score_cache_size=RERANKER_CONFIG.get('score_cache_size', 50000),
+        backend=RERANKER_CONFIG.get('backend', 'torch'),
+        onnx_dir=RERANKER_CONFIG.get('onnx_dir'),
+        quantization=RERANKER_CONFIG.get('quantization', 'avx2'),
+        doc_token_cache_size=RERANKER_CONFIG.get('doc_token_cache_size', 100000),
+    )
+    if reranker_available() and RERANKER_CONFIG.get('warmup_on_startup'):
+        get_reranker().warmup(background=True)
+
+    # 중복 방지용 최근 단어/문법 저장소 (어휘/문법 리트리버가 공유)
+    recency_store = create_recency_store(
+        RECENCY_CONFIG.get('backend', 'memory'),
+        max_keys=RECENCY_CONFIG['max_tracked_queries'],
+        sqlite_path=RECENCY_CONFIG.get('sqlite_path'),
+        kv_namespace=RECENCY_CONFIG.get('kv_namespace', 'recency'),
+        kv_ttl_seconds=RECENCY_CONFIG.get('kv_ttl_seconds'),
+    )
+
     # 리트리버 초기화
     print("\n📚 데이터베이스 초기화 중...")
+    if RETRIEVAL_BUNDLE_DIR:
+        print(f"   (번들 로드: {RETRIEVAL_BUNDLE_DIR})")
     print("   ├─ TOPIK 어휘 데이터베이스")
-    topik_retriever = TOPIKVocabularyRetriever(TOPIK_PATHS)
+    topik_retriever = TOPIKVocabularyRetriever(TOPIK_PATHS, cache_dir=INDEX_CACHE_DIR,
+                                               bundle_dir=RETRIEVAL_BUNDLE_DIR,
+                                               cascade=CASCADE_CONFIG.get('vocabulary'),
+                                               max_tracked_queries=RECENCY_CONFIG['max_tracked_queries'],
+                                               recency_store=recency_store)
     print("   ├─ 문법 패턴 데이터베이스")
-    grammar_retriever = GrammarRetriever(GRAMMAR_PATHS)
+    grammar_retriever = GrammarRetriever(GRAMMAR_PATHS, bundle_dir=RETRIEVAL_BUNDLE_DIR,
+                                         cascade=CASCADE_CONFIG.get('grammar'),
+                                         max_tracked_queries=RECENCY_CONFIG['max_tracked_queries'],
+                                         recency_store=recency_store)
     print("   └─ K-pop 학습 자료 데이터베이스")
-    kpop_retriever = KpopSentenceRetriever(KPOP_JSON_PATH)
+    kpop_retriever = KpopSentenceRetriever(KPOP_JSON_PATH, bundle_dir=RETRIEVAL_BUNDLE_DIR)
     print("   ✅ 모든 데이터베이스 초기화 완료")
+    if reranker_available() and RERANKER_CONFIG.get('pretokenize_on_startup'):
+        corpus = [d for docs in topik_retriever.level_docs_flat.values() for d in docs]
+        corpus += [d for docs in grammar_retriever.grammar_data.values() for d in docs]
+        get_reranker().pretokenize(corpus)
     
     # 라우터 통합 Agentic RAG 그래프 구축
     print("\n🔧 지능형 라우터 기반 Agentic RAG 그래프 구축 중...")
@@ -196,6 +242,27 @@ def main():
     print(f"{'='*80}")
     print(f"   생성된 문제 수: {len(all_generated_questions)}개")
     print(f"   저장 파일명: {output_filename}")
+    for model, stats in embedding_cache_stats().items():
+        print(f"   임베딩 캐시 [{model}]: 적중 {stats['hits']}회 / 미스 {stats['misses']}회")
+    if reranker_available():
+        score_stats = get_reranker().score_cache_stats()
+        if score_stats:
+            print(f"   Reranker 점수 캐시: 적중률 {score_stats['hit_rate']:.1%} "
+                  f"(적중 {score_stats['hits']} / 미스 {score_stats['misses']} / 제거 {score_stats['evictions']})")
+        reranker_stats = get_reranker().stats
+        print(f"   Reranker 쌍: 요청 {reranker_stats['pairs_requested']}개 / "
+              f"모델 forward {reranker_stats['pairs_forwarded']}개")
+        token_stats = get_reranker().doc_token_cache_stats()
+        print(f"   Reranker 토크나이저: 누적 {reranker_stats['tokenize_seconds_total'] * 1000:.1f}ms / "
+              f"문서 토큰 캐시 적중률 {token_stats['hit_rate']:.1%} ({token_stats['size']}개)")
+    for name, retriever in (("어휘", topik_retriever), ("문법", grammar_retriever)):
+        cascade_stats = retriever.cascade_stats
+        if cascade_stats["requests"]:
+            print(f"   캐스케이드 [{name}]: 요청당 후보 {cascade_stats['candidates'] / cascade_stats['requests']:.1f}개 → "
+                  f"재정렬 {cascade_stats['heavy_pairs'] / cascade_stats['requests']:.1f}개")
+    analysis_stats = graph.nodes.query_agent.stats
+    print(f"   쿼리 분석: 캐시 {analysis_stats['cache_hits']}회 / 규칙 기반 {analysis_stats['fast_path']}회 / "
+          f"LLM {analysis_stats['llm_path']}회")
 
     try:
         with open(output_filename, 'w', encoding='utf-8') as f:
@@ -0,0 +1,10 @@
+"""
+테스트 공통 설정
+저장소 루트를 import 경로에 추가 (Retriever/, agents.py 등을 루트 기준으로 import)
+"""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
@@ -0,0 +1,51 @@
+"""
+2단계 캐스케이드 재정렬: 경량 1단계 점수로 후보를 줄인 뒤 reranker 호출
+"""
+import pytest
+
+pytest.importorskip("langchain")
+
+from langchain.schema import Document
+from Retriever.cascade import char_bigrams, first_stage_order, cascade_rerank
+
+
+class RecordingReranker:
+    """받은 후보를 기록하고 순서 그대로 top_k 반환"""
+    def __init__(self):
+        self.seen = []
+
+    def rerank(self, query, docs, top_k):
+        self.seen.append(list(docs))
+        return docs[:top_k]
+
+
+def test_char_bigrams():
+    assert char_bigrams("학교 생활") == {"학교", "생활"}
+    assert char_bigrams("밥 먹다") == {"밥", "먹다"}
+    assert char_bigrams("") == frozenset()
+
+
+def test_first_stage_prefers_rank_and_lexical_overlap():
+    texts = ["날씨가 맑다", "학교 생활 어휘", "회사", "학교 급식"]
+    order = first_stage_order("학교 생활", texts, rank_weight=0.5)
+    assert order[0] == 1
+    assert sorted(order) == list(range(len(texts)))
+    assert first_stage_order("학교", []) == []
+
+
+def test_cascade_prunes_to_keep_and_preserves_ensemble_order():
+    docs = [Document(page_content=f"후보 {i}") for i in range(80)]
+    reranker, stats = RecordingReranker(), {}
+    result = cascade_rerank(reranker, "후보", docs, top_k=30, keep=24, stats=stats)
+    kept = reranker.seen[0]
+    assert len(kept) == 24 and len(result) == 24
+    assert [docs.index(d) for d in kept] == sorted(docs.index(d) for d in kept)
+    assert stats == {"requests": 1, "candidates": 80, "heavy_pairs": 24}
+
+
+def test_cascade_without_keep_reranks_everything():
+    docs = [Document(page_content=f"후보 {i}") for i in range(10)]
+    reranker = RecordingReranker()
+    cascade_rerank(reranker, "후보", docs, top_k=5, keep=None)
+    assert len(reranker.seen[0]) == 10
+    assert cascade_rerank(reranker, "후보", [], top_k=5, keep=3) == []
@@ -0,0 +1,38 @@
+"""
+임베딩 백엔드 해석: 인덱스에 기록된 모델명은 설정된 백엔드로 대체되지 않는지 확인
+"""
+import pytest
+
+pytest.importorskip("langchain_core")
+pytest.importorskip("langchain_openai")
+
+from Retriever.embeddings import configure_embeddings, _resolve
+
+ST_MODEL = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+
+
+@pytest.fixture(autouse=True)
+def reset_config():
+    yield
+    configure_embeddings("openai")
+
+
+def test_local_backend_replaces_default_openai_model():
+    configure_embeddings("sentence_transformers", model=ST_MODEL)
+    assert _resolve("text-embedding-3-large", None) == ("sentence_transformers", ST_MODEL, 0)
+
+
+def test_recorded_openai_model_is_kept_under_local_backend():
+    configure_embeddings("sentence_transformers", model=ST_MODEL)
+    assert _resolve("text-embedding-3-large", None, exact=True) == ("openai", "text-embedding-3-large", 0)
+
+
+def test_sentence_transformer_name_never_reaches_openai():
+    configure_embeddings("openai")
+    assert _resolve(ST_MODEL, None)[0] == "sentence_transformers"
+    assert _resolve(ST_MODEL, None, exact=True)[0] == "sentence_transformers"
+
+
+def test_recorded_hashed_model_keeps_its_dimensions():
+    configure_embeddings("sentence_transformers", model=ST_MODEL)
+    assert _resolve("hashed-char-ngram-d256", None, exact=True) == ("hashed", "hashed-char-ngram-d256", 256)
@@ -0,0 +1,87 @@
+"""
+K-pop 개체 사전: Aho-Corasick 매칭과 한글/라틴 별칭 경계
+"""
+import os
+import json
+import pytest
+
+pytest.importorskip("langchain")
+
+from langchain.schema import Document
+from Retriever.gazetteer import AhoCorasick, KpopGazetteer
+
+KPOP_JSON = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "kpop", "kpop_db.json")
+
+
+@pytest.fixture(scope="module")
+def gazetteer():
+    with open(KPOP_JSON, "r", encoding="utf-8") as f:
+        items = json.load(f)
+    return KpopGazetteer.from_documents([Document(page_content=item["group"], metadata=item) for item in items])
+
+
+def _mentions(gazetteer, text):
+    return [(m.entity_type, m.canonical) for m in gazetteer.find_all(text)]
+
+
+def test_aho_corasick_finds_overlapping_patterns():
+    automaton = AhoCorasick()
+    for p in ("he", "she", "hers"):
+        automaton.add(p, p)
+    found = sorted((s, e, p) for s, e, p, _ in automaton.iter_matches("ushers"))
+    assert found == [(1, 4, "she"), (2, 4, "he"), (2, 6, "hers")]
+
+
+@pytest.mark.parametrize("text", [
+    "중급 레벨 단어 문제",   # 일반 명사 별칭 제거
+    "경제 지수",
+    "공부하니까",            # 하니: 더 긴 단어의 일부
+    "하니까 좋다",
+    "둘이서",                # 이서: 앞에 한글
+    "미나리",
+])
+def test_hangul_alias_inside_longer_word_is_ignored(gazetteer, text):
+    assert gazetteer.find_all(text) == []
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("블랙핑크의 노래", [("group", "BLACKPINK")]),
+    ("방탄소년단에서는", [("group", "BTS")]),
+    ("하니가 좋아", [("member", "Hanni")]),
+    ("이서랑 원영", [("member", "Leeseo"), ("member", "Wonyoung")]),
+    ("하니, 민지!", [("member", "Hanni"), ("member", "Minji")]),
+    ("레드 벨벳 노래", [("group", "Red Velvet")]),
+])
+def test_hangul_alias_with_particles_matches(gazetteer, text, expected):
+    assert _mentions(gazetteer, text) == expected
+
+
+def test_latin_word_boundary_and_case_sensitive_fandom(gazetteer):
+    assert _mentions(gazetteer, "give me IVE songs") == [("group", "IVE")]
+    assert _mentions(gazetteer, "BLACKPINK의 제니") == [("group", "BLACKPINK"), ("member", "Jennie")]
+    assert ("fandom", "ARMY") in _mentions(gazetteer, "ARMY 응원")
+    assert ("fandom", "ARMY") not in _mentions(gazetteer, "army of words")
+
+
+def test_longest_match_wins(gazetteer):
+    mentions = gazetteer.find_all("방탄소년단 노래")
+    assert [(m.canonical, m.surface) for m in mentions] == [("BTS", "방탄소년단")]
+
+
+def test_find_groups_dedupes_in_mention_order(gazetteer):
+    assert gazetteer.find_groups("TWICE랑 블핑, 그리고 트와이스") == ["TWICE", "BLACKPINK"]
+
+
+def test_alias_mentions_are_flagged(gazetteer):
+    hanni, newjeans = gazetteer.find_all("하니 NewJeans")
+    assert hanni.canonical == "Hanni" and hanni.is_alias
+    assert newjeans.canonical == "NewJeans" and not newjeans.is_alias
+
+
+def test_latin_member_names_are_case_sensitive_and_weak(gazetteer):
+    assert _mentions(gazetteer, "joy vocabulary") == []
+    assert _mentions(gazetteer, "jin and tonic") == []
+    (wendy,) = gazetteer.find_all("Wendy words")
+    assert wendy.canonical == "Wendy" and wendy.is_latin_member and wendy.is_weak
+    (group,) = gazetteer.find_all("Red Velvet")
+    assert not group.is_weak
@@ -0,0 +1,136 @@
+"""
+K-pop 리트리버: 원본 JSON 로드와 번들 로드의 필터 결과 일치 확인
+임베딩은 API 호출 없는 해시 기반 가짜 임베딩으로 대체
+"""
+import json
+import hashlib
+import numpy as np
+import pytest
+
+pytest.importorskip("langchain")
+pytest.importorskip("langchain_community")
+pytest.importorskip("faiss")
+
+import Retriever.kpop_retriever as kpop_module
+from Retriever.kpop_retriever import KpopSentenceRetriever
+from Retriever.bundle import write_manifest, read_manifest, BundleMismatchError
+
+KPOP_ITEMS = [
+    {
+        "group": "BLACKPINK", "group_type": "girl_group", "aliases": ["블랙핑크"],
+        "members": [{"name": "Jennie", "role": "rapper", "debut": "2016-08-08", "aliases": ["제니"]}],
+        "agency": "YG Entertainment", "agency_aliases": ["YG"],
+        "fandom": "BLINK", "fandom_aliases": ["블링크"], "concepts": ["girl crush"],
+    },
+    {
+        "group": "BTS", "group_type": "boy_group", "aliases": ["방탄소년단"],
+        "members": [{"name": "Jimin", "role": "vocal", "debut": "2013-06-13", "aliases": ["지민"]}],
+        "agency": "BIGHIT MUSIC", "agency_aliases": ["빅히트"],
+        "fandom": "ARMY", "fandom_aliases": ["아미"], "concepts": ["hip-hop"],
+    },
+    {
+        "group": "NewJeans", "group_type": "girl_group", "aliases": ["뉴진스"],
+        "members": [{"name": "Hanni", "role": "vocal", "debut": "2022-07-22", "aliases": ["하니"]}],
+        "agency": "ADOR", "agency_aliases": ["어도어"],
+        "fandom": "Bunnies", "fandom_aliases": ["버니즈"], "concepts": ["y2k"],
+    },
+]
+
+
+class HashEmbeddings:
+    """텍스트 md5로 시드한 고정 벡터 (같은 텍스트 → 같은 벡터)"""
+    model = "test-hash-embedding"
+
+    def _vector(self, text):
+        seed = int(hashlib.md5(text.encode("utf-8")).hexdigest(), 16) & 0xFFFFFFFF
+        return np.random.default_rng(seed).normal(size=16).tolist()
+
+    def embed_documents(self, texts):
+        return [self._vector(t) for t in texts]
+
+    def embed_query(self, text):
+        return self._vector(text)
+
+    def __call__(self, text):
+        return self.embed_query(text)
+
+
+@pytest.fixture
+def kpop_pair(tmp_path, monkeypatch):
+    """(원본 JSON으로 빌드한 리트리버, 그 번들에서 로드한 리트리버)"""
+    monkeypatch.setattr(kpop_module, "get_embeddings", lambda *args, **kwargs: HashEmbeddings())
+    json_path = tmp_path / "kpop_db.json"
+    json_path.write_text(json.dumps(KPOP_ITEMS, ensure_ascii=False), encoding="utf-8")
+    bundle_dir = tmp_path / "bundle"
+    bundle_dir.mkdir()
+
+    built = KpopSentenceRetriever(str(json_path))
+    write_manifest(str(bundle_dir), {"components": {"kpop": built.export_to_bundle(str(bundle_dir))}})
+    loaded = KpopSentenceRetriever(str(json_path), bundle_dir=str(bundle_dir))
+    return built, loaded
+
+
+@pytest.mark.parametrize("filters", [
+    {"groups": ["BLACKPINK"]},
+    {"agencies": ["YG"]},
+    {"concepts": ["hip-hop"]},
+    {"debut_year": [2022]},
+    {"group_type": ["girl_group"]},
+    {"group_type": ["girl_group"], "member_roles": ["rapper"]},
+])
+def test_bundle_filter_matches_json_load(kpop_pair, filters):
+    built, loaded = kpop_pair
+    assert len(loaded.kpop_data) == len(KPOP_ITEMS)
+    expected = built.filter_docs(filters)
+    result = loaded.filter_docs(filters)
+    assert result is not None and result.mask
+    assert result.mask == expected.mask
+    assert result.reasons == expected.reasons
+
+
+def test_bundle_filtered_search_returns_only_allowed_docs(kpop_pair):
+    _, loaded = kpop_pair
+    docs = loaded.invoke("걸그룹 문장", filters={"group_type": ["girl_group"]}, seed=0)
+    assert docs
+    assert {d.metadata["group"] for d in docs} <= {"BLACKPINK", "NewJeans"}
+
+
+def test_group_type_lookup_in_both_load_paths(kpop_pair):
+    for retriever in kpop_pair:
+        assert retriever.get_group_type("blackpink") == "girl_group"
+        assert retriever.get_group_type(" BTS ") == "boy_group"
+        assert retriever.get_group_type("unknown") is None
+
+
+def test_group_type_falls_back_to_json_for_old_bundles(kpop_pair):
+    _, loaded = kpop_pair
+    for doc in loaded.kpop_data:
+        doc.metadata.pop("group_type", None)  # group_type 메타데이터 도입 이전 번들
+    loaded._build_group_types()
+    assert loaded.get_group_type("NewJeans") == "girl_group"
+    assert loaded.get_group_type("BTS") == "boy_group"
+
+
+def test_data_fingerprint_matches_between_load_paths(kpop_pair):
+    built, loaded = kpop_pair
+    assert built.data_fingerprint
+    assert loaded.data_fingerprint == built.data_fingerprint
+
+
+def test_manifest_records_index_dimension(kpop_pair, tmp_path):
+    info = read_manifest(str(tmp_path / "bundle"))["components"]["kpop"]
+    assert info["embedding_model"] == HashEmbeddings.model
+    assert info["index_dimension"] == 16
+
+
+@pytest.mark.parametrize("field,value", [
+    ("embedding_model", "text-embedding-3-large"),
+    ("index_dimension", 8),
+])
+def test_bundle_embedding_mismatch_fails_loudly(kpop_pair, tmp_path, field, value):
+    bundle_dir = str(tmp_path / "bundle")
+    manifest = read_manifest(bundle_dir)
+    manifest["components"]["kpop"][field] = value
+    write_manifest(bundle_dir, manifest)
+    with pytest.raises(BundleMismatchError):
+        KpopSentenceRetriever(str(tmp_path / "kpop_db.json"), bundle_dir=bundle_dir)
@@ -0,0 +1,72 @@
+"""
+K-pop 메타데이터 비트맵 필터 엔진
+"""
+import pytest
+
+pytest.importorskip("langchain")
+
+from langchain.schema import Document
+from Retriever.kpop_filter import KpopFilterEngine, FilterResult, iter_bits, mask_has
+
+
+def _doc(group, members, agency, fandom, concepts, group_type):
+    return Document(page_content=group, metadata={
+        "group": group, "members": members, "agency": agency, "fandom": fandom,
+        "concepts": concepts, "group_type": group_type,
+    })
+
+
+@pytest.fixture
+def engine():
+    return KpopFilterEngine([
+        _doc("BLACKPINK", [{"name": "Jennie", "role": "rapper", "debut": "2016-08-08"}],
+             "YG Entertainment", "BLINK", ["girl crush"], "girl_group"),
+        _doc("BTS", [{"name": "Jimin", "role": "vocal", "debut": "2013-06-13"}],
+             "BIGHIT MUSIC", "ARMY", ["hip-hop"], "boy_group"),
+        _doc("NewJeans", [{"name": "Hanni", "role": "vocal", "debut": "2022-07-22"}],
+             "ADOR", "Bunnies", ["y2k", "girl crush"], "girl_group"),
+    ])
+
+
+def test_iter_bits_and_mask_has():
+    assert list(iter_bits(0b10110)) == [1, 2, 4]
+    assert mask_has(0b100, 2)
+    assert not mask_has(0b100, 1)
+    # doc_id가 없는 문서는 시프트 오류 없이 제외
+    assert not mask_has(0b1, None)
+    assert not mask_has(0b1, -1)
+
+
+def test_and_across_fields_or_within_field(engine):
+    result = engine.evaluate({"group_type": ["girl_group"], "member_roles": ["vocal"]})
+    assert result.ids() == [2]
+    result = engine.evaluate({"groups": ["bts", "NewJeans"]})
+    assert result.ids() == [1, 2]
+
+
+def test_substring_fields_and_debut_year(engine):
+    assert engine.evaluate({"agencies": ["YG"]}).ids() == [0]
+    assert engine.evaluate({"debut_year": ["2013"]}).ids() == [1]
+    assert engine.evaluate({"debut_year": ["unknown"]}).ids() == []
+
+
+def test_reasons_only_cover_matched_docs(engine):
+    result = engine.evaluate({"concepts": ["girl crush", "hip-hop"], "group_type": "girl_group"})
+    assert result.ids() == [0, 2]
+    assert result.reasons == {"concept": ["girl crush"], "group_type": ["girl_group"]}
+    assert "컨셉: girl crush" in result.reason_strings()
+
+
+def test_within_and_empty_filters(engine):
+    assert engine.evaluate({}) is None
+    assert engine.evaluate({"groups": [""]}).mask == 0
+    result = engine.evaluate({"group_type": ["girl_group"]}, within=engine.mask_of([1, 2, None, 99]))
+    assert result.ids() == [2]
+    assert 2 in result and None not in result
+    assert isinstance(result, FilterResult)
+
+
+def test_describe(engine):
+    described = engine.describe(engine.mask_of([0, 1]))
+    assert described["group"] == {"BLACKPINK", "BTS"}
+    assert described["debut_year"] == {"2016", "2013"}
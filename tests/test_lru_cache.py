@@ -0,0 +1,36 @@
+"""
+공용 LRU 캐시 (크기 제한 + TTL)
+"""
+import time
+from Retriever.lru_cache import LRUCache
+
+
+def test_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert [k for k, _ in cache.items()] == ["a", "c"]
+    assert cache.stats["evictions"] == 1
+
+
+def test_ttl_counts_from_original_age(monkeypatch):
+    cache = LRUCache(maxsize=4, ttl_seconds=60)
+    cache.put("restored", "x", age_seconds=50)
+    cache.put("new", "y")
+    real_monotonic = time.monotonic
+    monkeypatch.setattr(time, "monotonic", lambda: real_monotonic() + 20)
+    assert cache.get("restored") is None
+    assert cache.get("new") == "y"
+    assert cache.stats["expirations"] == 1
+
+
+def test_get_or_compute_caches_result():
+    cache = LRUCache(maxsize=4)
+    calls = []
+    assert cache.get_or_compute("k", lambda: calls.append(1) or 42) == 42
+    assert cache.get_or_compute("k", lambda: calls.append(1) or 0) == 42
+    assert len(calls) == 1
+    assert cache.hit_rate() == 0.5
@@ -0,0 +1,163 @@
+"""
+규칙 기반 쿼리 분석기 (LLM 호출 없는 fast path)
+"""
+import os
+import json
+import pytest
+
+pytest.importorskip("langchain")
+pytest.importorskip("langchain_openai")
+
+from langchain.schema import Document
+from Retriever.gazetteer import KpopGazetteer
+from agents import RuleBasedQueryAnalyzer
+from utils import detect_difficulty_from_text
+
+KPOP_JSON = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "kpop", "kpop_db.json")
+
+
+@pytest.fixture(scope="module")
+def analyzer():
+    with open(KPOP_JSON, "r", encoding="utf-8") as f:
+        items = json.load(f)
+    return RuleBasedQueryAnalyzer(
+        KpopGazetteer.from_documents([Document(page_content=item["group"], metadata=item) for item in items])
+    )
+
+
+def test_shared_difficulty_detection_ignores_rule_only_keywords():
+    assert detect_difficulty_from_text("middle school vocabulary") == "basic"
+    assert detect_difficulty_from_text("중급 어휘") == "intermediate"
+
+
+@pytest.mark.parametrize("query, difficulty", [
+    ("middle level vocabulary quiz", "intermediate"),
+    ("beginner grammar", "basic"),
+    ("고급 beginner 문법", "advanced"),   # 공용 키워드가 우선
+])
+def test_rule_analyzer_difficulty(analyzer, query, difficulty):
+    result, _ = analyzer.analyze(query)
+    assert result["difficulty"] == difficulty
+
+
+def test_named_entities_fill_filters_with_full_confidence(analyzer):
+    result, confidence = analyzer.analyze("뉴진스 하니 노래 가사로 문제")
+    assert confidence == 1.0
+    assert result["needs_kpop"]
+    assert result["kpop_filters"]["groups"] == ["NewJeans"]
+    assert result["kpop_filters"]["members"] == ["Hanni"]
+
+
+@pytest.mark.parametrize("query,topic,difficulty", [
+    ("음식 관련 중급 단어", "음식", "intermediate"),
+    ("고급 여행 어휘 문제", "여행", "advanced"),
+])
+def test_topic_and_level_query_takes_fast_path(analyzer, query, topic, difficulty):
+    result, confidence = analyzer.analyze(query)
+    assert confidence >= 0.8
+    assert result["topic"] == topic
+    assert result["difficulty"] == difficulty
+    assert not result["needs_kpop"]
+
+
+def test_several_unexplained_words_fall_through_to_llm(analyzer):
+    _, confidence = analyzer.analyze("경제 지수 어휘")
+    assert confidence < 0.8
+
+
+@pytest.mark.parametrize("query", ["하니 관련 단어 문제", "정국 관련 문제"])
+def test_alias_only_hits_fall_through_to_llm(analyzer, query):
+    result, confidence = analyzer.analyze(query)
+    assert result["needs_kpop"]
+    assert confidence < 0.8
+
+
+@pytest.mark.parametrize("query", ["중급 레벨 단어 문제", "경제 지수 어휘", "공부하니까"])
+def test_generic_words_are_not_kpop(analyzer, query):
+    result, _ = analyzer.analyze(query)
+    assert not result["needs_kpop"]
+    assert not any(result["kpop_filters"].values())
+
+
+def test_concepts_need_other_kpop_evidence(analyzer):
+    result, _ = analyzer.analyze("밝은 분위기 어휘")
+    assert not result["needs_kpop"] and result["kpop_filters"]["concepts"] == []
+    result, _ = analyzer.analyze("블랙핑크 밝은 컨셉 문장")
+    assert result["kpop_filters"]["concepts"] == ["bright"]
+
+
+def test_attached_endings_are_not_topics(analyzer):
+    result, confidence = analyzer.analyze("NewJeans 단어 문제 만들어줘요")
+    assert confidence == 1.0
+    assert result["topic"] == "K-pop"
+
+
+def _write_cache_file(path, entries, fingerprint="fp"):
+    from agents import AnalysisResultCache
+    data = {"format_version": AnalysisResultCache.FORMAT_VERSION, "fingerprint": fingerprint,
+            "entries": [[key, {"result": {"topic": key}, "stored_at": stored_at}] for key, stored_at in entries]}
+    path.write_text(json.dumps(data), encoding="utf-8")
+
+
+def test_analysis_cache_round_trip_and_batched_saves(tmp_path):
+    from agents import AnalysisResultCache
+    path = tmp_path / "analysis.json"
+    cache = AnalysisResultCache(maxsize=8, ttl_seconds=3600, persist_path=str(path), flush_every=4)
+    cache.validate("fp")
+    cache.put("BTS 단어", {"topic": "K-pop"})
+    cache.put("여행 어휘", {"topic": "여행"})
+    assert not path.exists()          # 변경(지문 설정 + put) flush_every 미만이면 파일 쓰기 없음
+    cache.put("음식 어휘", {"topic": "음식"})
+    assert cache.stats["saves"] == 1
+    cache.put("날씨 어휘", {"topic": "날씨"})
+    cache.flush()
+    assert cache.stats["saves"] == 2
+
+    reloaded = AnalysisResultCache(maxsize=8, ttl_seconds=3600, persist_path=str(path))
+    reloaded.validate("fp")
+    assert reloaded.get("  bts   단어 ") == {"topic": "K-pop"}
+    assert reloaded.get("날씨 어휘") == {"topic": "날씨"}
+
+
+def test_analysis_cache_honors_original_timestamps(tmp_path, monkeypatch):
+    import time
+    from agents import AnalysisResultCache
+    path = tmp_path / "analysis.json"
+    now = time.time()
+    _write_cache_file(path, [("old", now - 7200), ("aging", now - 3500), ("fresh", now)])
+    cache = AnalysisResultCache(maxsize=8, ttl_seconds=3600, persist_path=str(path))
+    cache.validate("fp")
+    assert cache.get("old") is None                 # 저장 시각 기준으로 이미 만료
+    assert cache.get("aging") == {"topic": "aging"}
+    # 재시작으로 TTL이 갱신되지 않음: 원래 저장 시각 + TTL이 지나면 만료
+    real_monotonic = time.monotonic
+    monkeypatch.setattr(time, "monotonic", lambda: real_monotonic() + 200)
+    assert cache.get("aging") is None
+    assert cache.get("fresh") == {"topic": "fresh"}
+
+
+def test_analysis_cache_invalidates_on_fingerprint_change(tmp_path):
+    from agents import AnalysisResultCache
+    path = tmp_path / "analysis.json"
+    _write_cache_file(path, [("bts", __import__("time").time())], fingerprint="old")
+    cache = AnalysisResultCache(maxsize=8, persist_path=str(path))
+    cache.validate("new")
+    assert cache.get("bts") is None
+    assert cache.stats["invalidations"] == 1
+
+
+@pytest.mark.parametrize("query", [
+    "intermediate vocabulary about joy", "joy vocabulary", "kai", "Wendy words", "Han river travel vocabulary",
+])
+def test_english_member_names_do_not_take_fast_path_as_kpop(analyzer, query):
+    result, confidence = analyzer.analyze(query)
+    # 소문자 일반 단어는 멤버로 잡히지 않고, 대문자 멤버명만 있으면 LLM으로 넘김
+    assert not (confidence >= 0.8 and result["needs_kpop"])
+    if query.islower():
+        assert result["kpop_filters"]["members"] == []
+
+
+def test_english_member_name_with_group_context_is_trusted(analyzer):
+    result, confidence = analyzer.analyze("Red Velvet Wendy words")
+    assert confidence == 1.0
+    assert result["kpop_filters"]["members"] == ["Wendy"]
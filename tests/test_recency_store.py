@@ -0,0 +1,129 @@
+"""
+최근 항목 저장소: memory / sqlite / kv 백엔드 공통 동작과 세션 읽기·쓰기 횟수
+"""
+import threading
+import pytest
+from Retriever.recency_store import (
+    InMemoryRecencyStore, SQLiteRecencyStore, KeyValueRecencyStore, DictKeyValueClient,
+    BoundedCounter, RecentWindow, create_recency_store,
+)
+
+
+@pytest.fixture(params=["memory", "sqlite", "kv"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return InMemoryRecencyStore()
+    if request.param == "sqlite":
+        return SQLiteRecencyStore(str(tmp_path / "recency.sqlite"))
+    return KeyValueRecencyStore(DictKeyValueClient())
+
+
+def test_session_commit_and_capacity(store):
+    session = store.session(["vocab:global", "vocab:q:음식"])
+    assert session.recent("vocab:global") == frozenset()
+    session.add("vocab:global", ["사과", "", "바나나"], capacity=3)
+    session.add("vocab:q:음식", ["사과"], capacity=2)
+    assert session.recent("vocab:global") == {"사과", "바나나"}   # 커밋 전에도 세션 안에서 보임
+    assert store.snapshot("vocab:global") == frozenset()
+    session.commit()
+    assert store.snapshot("vocab:global") == {"사과", "바나나"}
+
+    session = store.session(["vocab:global"])
+    session.add("vocab:global", ["포도", "딸기"], capacity=3)
+    session.commit()
+    assert store.get_many(["vocab:global"])["vocab:global"] == ["바나나", "포도", "딸기"]
+
+
+def test_clear_then_add_in_one_session(store):
+    store.add("grammar:q:이유", ["-아서", "-니까"], capacity=50)
+    session = store.session(["grammar:q:이유"])
+    session.clear("grammar:q:이유")
+    assert session.recent("grammar:q:이유") == frozenset()
+    session.add("grammar:q:이유", ["-기 때문에"], capacity=50)
+    session.commit()
+    assert store.snapshot("grammar:q:이유") == {"-기 때문에"}
+
+    store.clear("grammar:q:이유")
+    assert store.get_many(["grammar:q:이유"]) == {}
+
+
+def test_missing_keys_are_omitted(store):
+    store.add("a", ["x"], capacity=5)
+    assert store.get_many(["a", "b"]) == {"a": ["x"]}
+    assert store.get_many([]) == {}
+
+
+def test_memory_store_bounds_tracked_keys():
+    store = InMemoryRecencyStore(max_keys=2)
+    store.add("a", ["1"], capacity=5)
+    store.add("b", ["2"], capacity=5)
+    store.get_many(["a"])             # a를 최근 사용으로
+    store.add("c", ["3"], capacity=5)
+    assert len(store) == 2
+    assert store.get_many(["a", "b", "c"]) == {"a": ["1"], "c": ["3"]}
+    assert store.stats["evicted_keys"] == 1
+
+
+def test_recent_window_counts_duplicates():
+    window = RecentWindow(3)
+    for item in ("a", "b", "a", "c"):
+        window.add(item)
+    assert window.items() == ["b", "a", "c"]
+    assert "a" in window
+    window.add("d")
+    window.add("e")
+    assert "a" not in window and window.items() == ["c", "d", "e"]
+
+
+def test_sqlite_prunes_oldest_keys(tmp_path):
+    store = SQLiteRecencyStore(str(tmp_path / "recency.sqlite"), max_keys=2, prune_every=1)
+    for key in ("a", "b", "c"):
+        store.add(key, ["x"], capacity=5)
+    assert len(store) == 2
+    assert "a" not in store.get_many(["a", "b", "c"])
+
+
+def test_sqlite_concurrent_workers_do_not_lose_updates(tmp_path):
+    path = str(tmp_path / "shared.sqlite")
+    workers = [SQLiteRecencyStore(path), SQLiteRecencyStore(path)]
+
+    def write(store, prefix):
+        for i in range(25):
+            session = store.session(["shared"])
+            session.add("shared", [f"{prefix}{i}"], capacity=1000)
+            session.commit()
+
+    threads = [threading.Thread(target=write, args=(w, p)) for w, p in zip(workers, ("a", "b"))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(workers[0].get_many(["shared"])["shared"]) == 50
+
+
+def test_kv_session_is_one_read_and_one_write():
+    client = DictKeyValueClient()
+    store = KeyValueRecencyStore(client, namespace="test")
+    session = store.session(["vocab:global", "vocab:q:음식"])
+    session.add("vocab:global", ["사과"], capacity=10)
+    session.add("vocab:q:음식", ["사과"], capacity=10)
+    session.commit()
+    assert client.round_trips == 2
+    assert store.snapshot("vocab:q:음식") == {"사과"}
+
+
+def test_bounded_counter():
+    counter = BoundedCounter(max_keys=2)
+    assert [counter.increment("a") for _ in range(3)] == [1, 2, 3]
+    counter.increment("b")
+    counter.increment("c")              # a 제거
+    assert len(counter) == 2
+    assert counter.get("a") == 0 and counter.increment("a") == 1
+
+
+def test_create_recency_store(tmp_path):
+    assert isinstance(create_recency_store("memory"), InMemoryRecencyStore)
+    assert isinstance(create_recency_store("sqlite", sqlite_path=str(tmp_path / "r.sqlite")), SQLiteRecencyStore)
+    assert isinstance(create_recency_store("kv", kv_client=DictKeyValueClient()), KeyValueRecencyStore)
+    with pytest.raises(ValueError):
+        create_recency_store("redis")
@@ -0,0 +1,47 @@
+"""
+라우터 K-pop 활성화: 개체 사전의 고유 개체(그룹/멤버/소속사/팬덤)만 근거로 사용
+"""
+import os
+import json
+import pytest
+
+pytest.importorskip("langchain")
+pytest.importorskip("langchain_openai")
+
+from langchain.schema import Document
+from Retriever.gazetteer import KpopGazetteer
+from Ragsystem.router import IntelligentRouter
+
+KPOP_JSON = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "kpop", "kpop_db.json")
+
+
+@pytest.fixture(scope="module")
+def router():
+    with open(KPOP_JSON, "r", encoding="utf-8") as f:
+        items = json.load(f)
+    gazetteer = KpopGazetteer.from_documents([Document(page_content=item["group"], metadata=item) for item in items])
+    return IntelligentRouter(llm=object(), gazetteer=gazetteer)
+
+
+@pytest.mark.parametrize("query", ["밝은 분위기의 어휘 문제", "에너지 관련 단어", "귀여운 동물 어휘", "중급 레벨 단어 문제"])
+def test_concept_words_do_not_activate_kpop(router, query):
+    assert not router._should_activate_kpop(query, "")
+
+
+@pytest.mark.parametrize("query", ["하니가 나오는 예문", "원스가 좋아하는 어휘", "와이지 소속 가수 문제"])
+def test_named_entities_activate_kpop(router, query):
+    assert router._should_activate_kpop(query, "")
+
+
+@pytest.mark.parametrize("query", [
+    "joy vocabulary", "Han river travel vocabulary", "jin and tonic", "Wendy words", "give me travel words",
+])
+def test_plain_english_requests_do_not_activate_kpop(router, query):
+    assert not router._should_activate_kpop(query, "")
+
+
+def test_route_uses_original_case_query(router):
+    decision = router.route("Red Velvet Wendy words", "basic", topic="")
+    assert any(s.retriever_type.value == "kpop" for s in decision.strategies)
+    decision = router.route("Han river travel vocabulary", "basic", topic="travel")
+    assert all(s.retriever_type.value != "kpop" for s in decision.strategies)
@@ -0,0 +1,56 @@
+"""
+요청 단위 시드 + 순위 가중 비복원 샘플링 (Gumbel-top-k)
+"""
+import numpy as np
+import pytest
+from Retriever.sampling import (
+    stable_seed, request_rng, rank_weights, rank_weighted_sample, batch_rank_weighted_sample,
+)
+
+
+def test_stable_seed_is_deterministic_and_part_sensitive():
+    assert stable_seed("음식", 1) == stable_seed("음식", 1)
+    assert stable_seed("음식", 1) != stable_seed("음식", 2)
+    assert 0 <= stable_seed("음식") <= 0xFFFFFFFF
+    assert request_rng("음식", 3).random() == request_rng("음식", 3).random()
+
+
+def test_sample_is_distinct_reproducible_and_bounded():
+    picked = rank_weighted_sample(20, 5, seed=7)
+    assert len(picked) == len(set(picked)) == 5
+    assert all(0 <= i < 20 for i in picked)
+    assert picked == rank_weighted_sample(20, 5, seed=7)
+    assert rank_weighted_sample(3, 10, seed=7) and len(rank_weighted_sample(3, 10, seed=7)) == 3
+    assert rank_weighted_sample(0, 5, seed=7) == []
+    assert rank_weighted_sample(5, 0, seed=7) == []
+
+
+def test_repeated_calls_with_count_seeds_vary():
+    # 같은 쿼리도 실행 횟수 시드가 다르면 다른 후보 조합
+    picks = {tuple(rank_weighted_sample(30, 5, stable_seed("여행", count))) for count in range(1, 11)}
+    assert len(picks) > 1
+
+
+def test_batch_matches_single():
+    sizes, ks, seeds = [10, 3, 0, 25], [4, 5, 2, 6], [1, 2, 3, 4]
+    batch = batch_rank_weighted_sample(sizes, ks, seeds)
+    assert batch == [rank_weighted_sample(n, k, s) for n, k, s in zip(sizes, ks, seeds)]
+    assert batch_rank_weighted_sample([], 3, []) == []
+
+
+def test_first_pick_follows_rank_weights():
+    n, trials = 5, 20000
+    counts = np.bincount([rank_weighted_sample(n, 1, seed)[0] for seed in range(trials)], minlength=n)
+    expected = rank_weights(n) / rank_weights(n).sum()
+    assert counts / trials == pytest.approx(expected, abs=0.015)
+
+
+def test_vocabulary_retriever_seed_changes_per_call():
+    pytest.importorskip("langchain")
+    from Retriever.vocabulary_retriever import TOPIKVocabularyRetriever
+    from Retriever.recency_store import BoundedCounter
+    retriever = TOPIKVocabularyRetriever.__new__(TOPIKVocabularyRetriever)
+    retriever.query_call_count = BoundedCounter(max_keys=8)
+    seeds = [retriever._seeds_from_query("음식") for _ in range(3)]
+    assert seeds == [(stable_seed("음식", count), stable_seed("음식", count, "near")) for count in (1, 2, 3)]
+    assert len({seed for pair in seeds for seed in pair}) == 6  # 정확/근접 레벨 추첨 시드도 서로 다름
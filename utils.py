@@ -5,10 +5,23 @@
 from typing import List, Dict, Optional
 from langchain.schema import Document
 
+GROUP_TYPE_ALIASES = {
+    'girl_group': 'girl_group', 'girl group': 'girl_group', 'girlgroup': 'girl_group', '걸그룹': 'girl_group',
+    'boy_group': 'boy_group', 'boy group': 'boy_group', 'boygroup': 'boy_group', '보이그룹': 'boy_group',
+}
+
+
+def normalize_group_type(value) -> Optional[str]:
+    """그룹 타입 표기 표준화 ('girl_group', 'boy_group', 또는 None)"""
+    if not isinstance(value, str):
+        return None
+    return GROUP_TYPE_ALIASES.get(value.strip().lower())
+
+
 def get_group_type(group_name: str, kpop_retriever=None) -> Optional[str]:
     """
     그룹명으로 그룹 타입 판단 (girl_group, boy_group, None)
-    K-pop 데이터에서 동적으로 추출 (하드코딩 제거)
+    kpop_db.json의 group_type 필드를 로드 시 색인해 둔 리트리버에서 O(1) 조회
     
     Args:
         group_name: 그룹명 (대소문자 무관)
@@ -17,20 +30,29 @@ def get_group_type(group_name: str, kpop_retriever=None) -> Optional[str]:
     Returns:
         'girl_group', 'boy_group', 또는 None
     """
-    if not kpop_retriever or not hasattr(kpop_retriever, 'kpop_data'):
+    if not kpop_retriever or not hasattr(kpop_retriever, 'get_group_type'):
         return None
+    return kpop_retriever.get_group_type(group_name)
+
+
+DIFFICULTY_KEYWORDS = [
+    ('basic', ('basic', '초급', '기초')),
+    ('intermediate', ('intermediate', '중급')),
+    ('advanced', ('advanced', '고급', '상급')),
+]
+
+
+def find_difficulty_keyword(text: str) -> Optional[str]:
+    """
+    텍스트에 명시된 난이도 키워드 감지 (없으면 None)
     
-    group_upper = (group_name or '').upper()
-    
-    # K-pop 데이터에서 해당 그룹 찾기
-    for doc in kpop_retriever.kpop_data:
-        doc_group = doc.metadata.get('group', '')
-        if doc_group and doc_group.upper() == group_upper:
-            # 멤버 정보에서 role로 판단 (보통 걸그룹은 여성, 보이그룹은 남성)
-            # 하지만 더 정확한 방법은 DB에 group_type 필드 추가
-            # 현재는 임시로 None 반환 (필터링은 다른 방식으로 처리)
-            return None
-    
+    Returns:
+        'basic', 'intermediate', 'advanced', 또는 None
+    """
+    text_lower = (text or '').lower()
+    for level, keywords in DIFFICULTY_KEYWORDS:
+        if any(kw in text_lower for kw in keywords):
+            return level
     return None
 
 
@@ -44,16 +66,7 @@ def detect_difficulty_from_text(text: str) -> str:
     Returns:
         'basic', 'intermediate', 또는 'advanced'
     """
-    text_lower = text.lower()
-    
-    if 'basic' in text_lower or '초급' in text_lower or '기초' in text_lower:
-        return 'basic'
-    elif 'intermediate' in text_lower or '중급' in text_lower:
-        return 'intermediate'
-    elif 'advanced' in text_lower or '고급' in text_lower or '상급' in text_lower:
-        return 'advanced'
-    else:
-        return 'basic'  # 기본값
+    return find_difficulty_keyword(text) or 'basic'  # 기본값
 
 
 def extract_words_from_docs(docs: List[Document], limit: int = 10) -> List[tuple]: